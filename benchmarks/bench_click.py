@@ -0,0 +1,123 @@
+#!/usr/bin/env python3
+"""
+点击播放方式的WebDriver往返次数基准测试
+用模拟driver（每次往返有固定延迟，页面中有大量候选元素但没有一个能触发签名地址，即最坏情况）
+对比旧的逐元素查询的点击循环和页面内一次评分的 kbs_tier_click，往返次数由 count_webdriver_rpcs 统计
+
+用法: python benchmarks/bench_click.py [--rpc-latency 0.005] [--elements 12]
+"""
+
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import update_playlist  # noqa: E402
+
+class FakeElement:
+    """每次读取文本或属性都是一次WebDriver往返"""
+
+    def __init__(self, driver, index):
+        self.driver = driver
+        self.index = index
+
+    @property
+    def text(self):
+        return self.driver.execute('getElementText', {'id': self.index})['value']
+
+    def get_attribute(self, name):
+        return self.driver.execute('getElementAttribute', {'id': self.index, 'name': name})['value']
+
+class FakeDriver:
+    """所有命令都经过 execute（和真实的 WebDriver 一样），页面中每个选择器匹配 elements 个元素"""
+
+    def __init__(self, latency, elements, limit):
+        self.latency = latency
+        self.elements = elements
+        self.limit = limit
+
+    def execute(self, command, params=None):
+        time.sleep(self.latency)
+        if command == 'getElementText':
+            return {'value': 'Play'}
+        if command == 'getElementAttribute':
+            return {'value': 'btn-play' if params['name'] == 'class' else ''}
+        if command == 'findElements':
+            return {'value': [FakeElement(self, i) for i in range(self.elements)]}
+        if command == 'executeScript':
+            if params['script'] == update_playlist.PLAY_CONTROL_FINDER_SCRIPT:
+                return {'value': [{'index': i, 'score': 9 - i, 'label': 'play'}
+                                  for i in range(min(self.limit, self.elements))]}
+            return {'value': True}
+        if command == 'getLog':
+            return {'value': []}
+        return {'value': None}
+
+    def find_elements(self, by, value):
+        return self.execute('findElements', {'using': by, 'value': value})['value']
+
+    def execute_script(self, script, *args):
+        return self.execute('executeScript', {'script': script, 'args': list(args)})['value']
+
+    def get_log(self, log_type):
+        return self.execute('getLog', {'type': log_type})['value']
+
+def legacy_click(driver, deadline=None):
+    """旧实现：9个选择器 × 前5个元素，每个元素分别读取文本、class和id，再分两次滚动和点击"""
+    from selenium.webdriver.common.by import By
+
+    click_selectors = ["button", ".btn-play", ".play-button", "[class*='play']", "[onclick*='play']",
+                       "[onclick*='video']", "a[href*='javascript']", "div[class*='player']", "div[class*='video']"]
+    for selector in click_selectors:
+        for element in driver.find_elements(By.CSS_SELECTOR, selector)[:5]:
+            text = element.text.lower()
+            element_class = element.get_attribute('class') or ''
+            element_id = element.get_attribute('id') or ''
+            if any(keyword in text for keyword in ['play', '재생', '시작', '보기', '시청']) or \
+               any(keyword in element_class for keyword in ['play', 'video', 'player']) or \
+               any(keyword in element_id for keyword in ['play', 'video', 'player']):
+                driver.execute_script("arguments[0].scrollIntoView();", element)
+                driver.execute_script("arguments[0].click();", element)
+                if update_playlist.wait_for_signed_kbs_url(driver, 0, deadline):
+                    return True
+    return None
+
+def main():
+    parser = argparse.ArgumentParser(description="点击播放方式的往返次数基准测试")
+    parser.add_argument('--rpc-latency', type=float, default=0.005, help='模拟每次WebDriver往返的延迟（秒）')
+    parser.add_argument('--elements', type=int, default=12, help='每个选择器匹配的元素数')
+    parser.add_argument('--click-wait', type=float, default=3, help='实际运行中每次点击后的等待时间（秒），用于估算')
+    args = parser.parse_args()
+
+    update_playlist.PLAY_CLICK_WAIT = 0
+    limit = update_playlist.PLAY_CLICK_LIMIT
+    legacy_clicks = 9 * min(5, args.elements)
+    new_clicks = min(limit, args.elements)
+
+    with open(os.devnull, 'w') as devnull:
+        stdout = sys.stdout
+        sys.stdout = devnull
+        try:
+            results = []
+            for name, func, clicks in [
+                ('旧的逐元素点击循环', legacy_click, legacy_clicks),
+                ('页面内评分 kbs_tier_click', lambda d: update_playlist.kbs_tier_click(d, 'KBS1'), new_clicks),
+            ]:
+                driver = update_playlist.count_webdriver_rpcs(FakeDriver(args.rpc_latency, args.elements, limit))
+                update_playlist.TRACER.reset()
+                start = time.perf_counter()
+                func(driver)
+                elapsed = time.perf_counter() - start
+                results.append((name, update_playlist.TRACER.counters.get('webdriver_rpcs', 0), elapsed, clicks))
+        finally:
+            sys.stdout = stdout
+
+    print(f"📊 点击播放（最坏情况：没有控件能触发签名地址，每次往返 {args.rpc_latency * 1000:.0f}ms）")
+    print(f"{'实现':<26} {'往返次数':>8} {'往返耗时(秒)':>12} {'点击次数':>8} {'含点击等待估算(秒)':>18}")
+    for name, rpcs, elapsed, clicks in results:
+        print(f"{name:<26} {rpcs:>8} {elapsed:>12.2f} {clicks:>8} {elapsed + clicks * args.click_wait:>18.1f}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,61 @@
+#!/usr/bin/env python3
+"""
+健康检查并发基准测试
+本地HLS替身每个请求有固定延迟，直播源数量多于 HEALTH_CHECK_WORKERS（默认频道表约20个源）；
+断言所有正常源都判为可播放，并且所有检查同时进行，整个阶段不超过一个超时时间
+
+用法: python benchmarks/bench_health.py [--streams 40] [--delay 0.5] [--timeout 3]
+"""
+
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import update_playlist  # noqa: E402
+from replay import HlsStandInHandler, mount_stand_in, start_server  # noqa: E402
+
+class SlowHlsHandler(HlsStandInHandler):
+    """每个请求先等待固定时间再响应（一个检查需要三个请求）"""
+
+    delay = 0.0
+
+    def respond(self, head):
+        time.sleep(self.delay)
+        super().respond(head)
+
+def main():
+    parser = argparse.ArgumentParser(description="健康检查并发基准测试")
+    parser.add_argument('--streams', type=int, default=40, help='直播源数量（应多于 HEALTH_CHECK_WORKERS）')
+    parser.add_argument('--delay', type=float, default=0.5, help='替身服务器每个请求的延迟（秒）')
+    parser.add_argument('--timeout', type=float, default=3, help='每个检查的超时时间（秒）')
+    args = parser.parse_args()
+
+    workers = update_playlist.HEALTH_CHECK_WORKERS
+    assert args.streams > workers, f"直播源数量需要多于 HEALTH_CHECK_WORKERS={workers}"
+    assert args.delay * 3 < args.timeout, '单个检查的耗时需要小于超时时间'
+
+    SlowHlsHandler.delay = args.delay
+    server = start_server(SlowHlsHandler)
+    mount_stand_in(server)
+    base = f"http://127.0.0.1:{server.server_port}/live"
+    targets = [(f"{base}/ch{i}/master.m3u8", {}) for i in range(args.streams)]
+
+    start = time.perf_counter()
+    results = update_playlist.check_streams(targets, timeout=args.timeout)
+    elapsed = time.perf_counter() - start
+    server.shutdown()
+
+    ok = sum(1 for result in results.values() if result['ok'])
+    print(f"📊 健康检查（{args.streams} 个源，每个请求延迟 {args.delay * 1000:.0f}ms，超时 {args.timeout:.0f}秒）")
+    print(f"  可播放: {ok}/{args.streams}")
+    print(f"  阶段耗时 {elapsed:.2f}秒（单个检查约 {args.delay * 3:.1f}秒）")
+    failed = {url: result['error'] for url, result in results.items() if not result['ok']}
+    assert not failed, f"检查被判为失败: {failed}"
+    assert elapsed <= args.timeout, f"阶段耗时 {elapsed:.2f}秒 超过一个超时时间，检查没有同时进行"
+    print("✅ 所有检查同时进行，整个阶段不超过一个超时时间")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+"""
+性能日志解析基准测试
+对比旧的 extract_m3u8_from_network_logs（每条消息都做JSON解析）和增量的 NetworkLogReader
+
+用法: python benchmarks/bench_network_logs.py [--entries 20000] [--fixture recorded_log.json]
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import update_playlist  # noqa: E402
+from fixtures import FakeLogDriver, load_performance_log, make_performance_log, split_batches  # noqa: E402
+
+def legacy_extract_m3u8_from_network_logs(driver, target_domains=None):
+    """旧实现：取出全部日志，逐条JSON解析，最后用set去重"""
+    m3u8_urls = []
+    for log in driver.get_log('performance'):
+        try:
+            message = json.loads(log['message'])['message']
+            if message.get('method') in ['Network.responseReceived', 'Network.requestWillBeSent']:
+                request = message['params'].get('request', {})
+                response = message['params'].get('response', {})
+                for url in [request.get('url', ''), response.get('url', '')]:
+                    if url and '.m3u8' in url:
+                        if not target_domains or any(domain in url for domain in target_domains):
+                            m3u8_urls.append(url)
+        except Exception:
+            continue
+    return list(set(m3u8_urls))
+
+def best_of(func, repeats):
+    """运行多次取最快一次（秒）"""
+    best = float('inf')
+    for _ in range(repeats):
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+def main():
+    parser = argparse.ArgumentParser(description="性能日志解析基准测试")
+    parser.add_argument('--entries', type=int, default=20000, help='合成日志条目数')
+    parser.add_argument('--fixture', help='使用录制的性能日志JSON代替合成数据')
+    parser.add_argument('--batches', type=int, default=10, help='点击循环场景中的轮询次数')
+    parser.add_argument('--repeats', type=int, default=5)
+    args = parser.parse_args()
+
+    entries = load_performance_log(args.fixture) if args.fixture else make_performance_log(args.entries)
+    size_mb = sum(len(entry['message']) for entry in entries) / 1024 / 1024
+    domains = [update_playlist.KBS_SIGNED_DOMAIN]
+    print(f"📄 日志: {len(entries)} 条，{size_mb:.1f} MB")
+
+    def legacy_full():
+        legacy_extract_m3u8_from_network_logs(FakeLogDriver([entries]), domains)
+
+    def reader_full():
+        update_playlist.NetworkLogReader(FakeLogDriver([entries])).collect(domains)
+
+    def legacy_first_signed():
+        # 旧流程：取出全部地址后再过滤签名地址
+        urls = legacy_extract_m3u8_from_network_logs(FakeLogDriver([entries]), domains)
+        return [url for url in urls if update_playlist.is_signed_kbs_url(url)]
+
+    def reader_first_signed():
+        update_playlist.NetworkLogReader(FakeLogDriver([entries])).next_match(update_playlist.is_signed_kbs_url)
+
+    batches = split_batches(entries, args.batches)
+
+    def legacy_polling():
+        driver = FakeLogDriver(batches)
+        for _ in batches:
+            legacy_extract_m3u8_from_network_logs(driver, domains)
+
+    def reader_polling():
+        reader = update_playlist.NetworkLogReader(FakeLogDriver(batches))
+        for _ in batches:
+            reader.next_match(update_playlist.is_signed_kbs_url)
+
+    scenarios = [
+        ("全量提取", legacy_full, reader_full),
+        ("找到第一个签名地址", legacy_first_signed, reader_first_signed),
+        (f"轮询 {len(batches)} 批", legacy_polling, reader_polling),
+    ]
+    print(f"{'场景':<20} {'旧实现(ms)':>12} {'增量读取(ms)':>14} {'加速':>8}")
+    for name, legacy, incremental in scenarios:
+        legacy_time = best_of(legacy, args.repeats)
+        reader_time = best_of(incremental, args.repeats)
+        print(f"{name:<20} {legacy_time * 1000:>12.1f} {reader_time * 1000:>14.1f} {legacy_time / reader_time:>7.1f}x")
+
+if __name__ == "__main__":
+    main()
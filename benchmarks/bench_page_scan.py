@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+"""
+页面地址提取基准测试
+对比 deep_analyze_kbs_page 旧的八个 re.findall + 最终参数拼接时的整页重扫，
+与合并后的单次扫描器 scan_stream_candidates
+
+用法: python benchmarks/bench_page_scan.py [--sizes 1 3 6] [--page saved_page.html]
+"""
+
+import argparse
+import os
+import re
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import update_playlist  # noqa: E402
+from fixtures import make_kbs_page  # noqa: E402
+
+LEGACY_PATTERNS = [
+    r'(https?://[^\s"\']*\.m3u8\?[^\s"\']*Policy=[^\s"\']*Signature=[^\s"\']*)',
+    r'["\'](https?://[^"\']*\.m3u8\?[^"\']*Policy=[^"\']*Signature=[^"\']*)["\']',
+    r'Policy=([A-Za-z0-9_\-~]+)',
+    r'Signature=([A-Za-z0-9_\-~]+)',
+    r'"url"\s*:\s*"([^"]*\.m3u8[^"]*)"',
+    r'"src"\s*:\s*"([^"]*\.m3u8[^"]*)"',
+    r'"streamUrl"\s*:\s*"([^"]*\.m3u8[^"]*)"',
+    r'"source"\s*:\s*"([^"]*\.m3u8[^"]*)"',
+]
+
+def legacy_extract(page_source):
+    """旧实现：八个模式各扫描一遍，再为参数拼接重新扫描Policy和Signature"""
+    found = []
+    for pattern in LEGACY_PATTERNS:
+        for match in re.findall(pattern, page_source):
+            if isinstance(match, str) and 'gscdn.kbs.co.kr' in match and 'Policy=' in match and 'Signature=' in match:
+                found.append(match)
+    re.search(r'Policy=([A-Za-z0-9_\-~]+)', page_source)
+    re.search(r'Signature=([A-Za-z0-9_\-~]+)', page_source)
+    return found
+
+def combined_extract(page_source):
+    """新实现：一次扫描得到候选地址和签名参数"""
+    page_scan = update_playlist.scan_stream_candidates(page_source)
+    page_scan.signing_params()
+    return page_scan.signed_kbs_urls()
+
+def best_of(func, arg, repeats):
+    best = float('inf')
+    for _ in range(repeats):
+        start = time.perf_counter()
+        func(arg)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+def main():
+    parser = argparse.ArgumentParser(description="页面地址提取基准测试")
+    parser.add_argument('--sizes', type=float, nargs='+', default=[1, 3, 6], help='合成页面大小（MB）')
+    parser.add_argument('--page', action='append', default=[], help='保存的真实页面HTML（可多次指定）')
+    parser.add_argument('--repeats', type=int, default=3)
+    args = parser.parse_args()
+
+    pages = [(f"合成页面 {size:g}MB", make_kbs_page(size)) for size in args.sizes]
+    for path in args.page:
+        with open(path, 'r', encoding='utf-8') as f:
+            pages.append((os.path.basename(path), f.read()))
+
+    print(f"{'页面':<24} {'旧实现(ms)':>12} {'单次扫描(ms)':>14} {'加速':>8} {'吞吐(MB/s)':>12}")
+    for name, page in pages:
+        legacy_urls = set(legacy_extract(page))
+        combined_urls = set(combined_extract(page))
+        if not combined_urls >= legacy_urls:
+            print(f"⚠️ {name}: 单次扫描漏掉了 {legacy_urls - combined_urls}")
+        legacy_time = best_of(legacy_extract, page, args.repeats)
+        combined_time = best_of(combined_extract, page, args.repeats)
+        size_mb = len(page) / 1024 / 1024
+        print(f"{name:<24} {legacy_time * 1000:>12.1f} {combined_time * 1000:>14.1f} "
+              f"{legacy_time / combined_time:>7.1f}x {size_mb / combined_time:>12.1f}")
+
+if __name__ == "__main__":
+    main()
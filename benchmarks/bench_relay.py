@@ -0,0 +1,124 @@
+#!/usr/bin/env python3
+"""
+HLS中转基准测试
+本地模拟HLS源站（统计请求数、模拟上游延迟，其中一个频道要求Referer），多个客户端同时
+通过 --relay 中转观看，对比上游实际下载的分片数和客户端请求的分片数
+
+用法: python benchmarks/bench_relay.py [--viewers 20] [--rounds 3] [--upstream-delay 0.05]
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urljoin
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import requests  # noqa: E402
+
+import update_playlist  # noqa: E402
+from replay import HlsStandInHandler, start_server  # noqa: E402
+
+class CountingOriginHandler(HlsStandInHandler):
+    """统计请求次数并模拟上游延迟；路径中包含 referer 的频道没有正确Referer时返回403"""
+
+    lock = threading.Lock()
+    counts = {'playlists': 0, 'segments': 0, 'forbidden': 0}
+    delay = 0.0
+
+    def respond(self, head):
+        time.sleep(self.delay)
+        cls = type(self)
+        with cls.lock:
+            if 'referer' in self.path and self.headers.get('Referer') != 'http://example.com/onair':
+                cls.counts['forbidden'] += 1
+                forbidden = True
+            else:
+                forbidden = False
+                cls.counts['playlists' if self.path.endswith('.m3u8') else 'segments'] += 1
+        if forbidden:
+            self.send_response(403)
+            self.send_header('Content-Length', '0')
+            self.end_headers()
+            return
+        super().respond(head)
+
+def watch(session, relay_base, rounds):
+    """一个客户端：读取播放列表，对每个频道按轮次刷新媒体播放列表并下载全部分片"""
+    requested = 0
+    playlist = session.get(f"{relay_base}/playlist.m3u", timeout=10).text
+    lines = playlist.splitlines()
+    first = next(i for i, line in enumerate(lines) if line.startswith('#EXTINF'))
+    for entry in update_playlist.parse_m3u_entries(lines[first:]):
+        master_url = entry['url']
+        for _ in range(rounds):
+            master = session.get(master_url, timeout=10)
+            master.raise_for_status()
+            variant, _ = update_playlist.find_first_variant(master.text)
+            variant_url = urljoin(master_url, variant)
+            media = session.get(variant_url, timeout=10).text
+            for line in media.splitlines():
+                if line and not line.startswith('#'):
+                    segment = session.get(urljoin(variant_url, line), timeout=10)
+                    segment.raise_for_status()
+                    requested += 1
+    return requested
+
+def main():
+    parser = argparse.ArgumentParser(description="HLS中转基准测试")
+    parser.add_argument('--viewers', type=int, default=20, help='同时观看的客户端数')
+    parser.add_argument('--rounds', type=int, default=3, help='每个客户端刷新播放列表的轮数')
+    parser.add_argument('--upstream-delay', type=float, default=0.05, help='模拟上游每个请求的延迟（秒）')
+    args = parser.parse_args()
+
+    CountingOriginHandler.delay = args.upstream_delay
+    origin = start_server(CountingOriginHandler)
+    origin_base = f"http://127.0.0.1:{origin.server_port}/live"
+
+    directory = tempfile.mkdtemp()
+    playlist_path = os.path.join(directory, 'korean_tv.m3u')
+    with open(playlist_path, 'w', encoding='utf-8') as f:
+        f.write('\n'.join([
+            '#EXTM3U',
+            '',
+            '#EXTINF:-1 tvg-id="KBS1.kr",KBS1',
+            f'{origin_base}/kbs1/master.m3u8',
+            '',
+            '#EXTINF:-1 tvg-id="TVChosun.kr",TV Chosun',
+            '#EXTVLCOPT:http-referrer=http://example.com/onair',
+            f'{origin_base}/referer/master.m3u8',
+        ]) + '\n')
+
+    with open(os.devnull, 'w') as devnull:
+        stdout = sys.stdout
+        sys.stdout = devnull
+        try:
+            relay = update_playlist.start_relay_server(playlist_path, '127.0.0.1', 0)
+            relay_base = f"http://127.0.0.1:{relay.server_port}"
+            session = requests.Session()
+            session.mount('http://', requests.adapters.HTTPAdapter(pool_maxsize=args.viewers))
+            start = time.perf_counter()
+            with ThreadPoolExecutor(max_workers=args.viewers) as executor:
+                requested = sum(executor.map(lambda _: watch(session, relay_base, args.rounds),
+                                             range(args.viewers)))
+            elapsed = time.perf_counter() - start
+            stats = relay.relay.cache.snapshot()
+            relay.shutdown()
+        finally:
+            sys.stdout = stdout
+
+    counts = CountingOriginHandler.counts
+    print(f"📊 HLS中转（{args.viewers} 个客户端 × {args.rounds} 轮，上游延迟 {args.upstream_delay * 1000:.0f}ms）")
+    print(f"  客户端请求分片: {requested}")
+    print(f"  上游下载分片:   {counts['segments']}（直连时为 {requested}，节省 {(1 - counts['segments'] / requested) * 100:.1f}%）")
+    print(f"  上游请求播放列表: {counts['playlists']}，被拒绝的请求: {counts['forbidden']}")
+    print(f"  缓存命中 {stats['hits']}、合并等待 {stats['coalesced']}、未命中 {stats['misses']}，"
+          f"上游流量 {stats['upstream_bytes'] / 1024:.0f}KB")
+    print(f"  总耗时 {elapsed:.2f}秒")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+"""
+线路测速基准测试
+本地HLS替身同时充当源站和各条代理线路（fast 低延迟、slow 高延迟、dead 返回404），
+另有一个转发代理替身作为测速出口；地址 × 线路 × 出口的测速数量多于 HEALTH_CHECK_WORKERS。
+断言 probe_route 经过测速出口、rank_routes 只去掉失效线路并把慢线路排在最后
+
+用法: python benchmarks/bench_routes.py [--urls 16] [--delay 0.1] [--slow-delay 0.4] [--timeout 3]
+"""
+
+import argparse
+import os
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import requests  # noqa: E402
+
+import update_playlist  # noqa: E402
+from replay import HlsStandInHandler, mount_stand_in, start_server  # noqa: E402
+
+class RouteStandInHandler(HlsStandInHandler):
+    """按路径模拟线路延迟：包含 slow 的路径使用 slow_delay，其余使用 delay"""
+
+    delay = 0.0
+    slow_delay = 0.0
+
+    def respond(self, head):
+        time.sleep(self.slow_delay if '/slow/' in self.path else self.delay)
+        super().respond(head)
+
+class ForwardProxyHandler(HlsStandInHandler):
+    """转发代理替身：按请求行中的绝对地址向上游转发，并统计经过的请求数"""
+
+    lock = threading.Lock()
+    forwarded = 0
+
+    def respond(self, head):
+        cls = type(self)
+        with cls.lock:
+            cls.forwarded += 1
+        upstream = requests.request('HEAD' if head else 'GET', self.path, timeout=10)
+        body = upstream.content
+        self.send_response(upstream.status_code)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        if not head:
+            self.wfile.write(body)
+
+def main():
+    parser = argparse.ArgumentParser(description="线路测速基准测试")
+    parser.add_argument('--urls', type=int, default=16, help='测速的地址数')
+    parser.add_argument('--delay', type=float, default=0.1, help='源站和 fast 线路每个请求的延迟（秒）')
+    parser.add_argument('--slow-delay', type=float, default=0.4, help='slow 线路每个请求的延迟（秒）')
+    parser.add_argument('--timeout', type=float, default=3, help='每条线路的测速超时（秒）')
+    args = parser.parse_args()
+
+    RouteStandInHandler.delay = args.delay
+    RouteStandInHandler.slow_delay = args.slow_delay
+    server = start_server(RouteStandInHandler)
+    proxy = start_server(ForwardProxyHandler)
+    mount_stand_in(server)
+    route_base = f"http://127.0.0.1:{server.server_port}"
+    update_playlist.PROXY_ROUTES = [
+        ['fast', f"{route_base}/fast/{{url}}"],
+        ['slow', f"{route_base}/slow/{{url}}"],
+        ['dead', f"{route_base}/dead/{{url}}"],
+    ]
+    origins = [None, f"http://127.0.0.1:{proxy.server_port}"]
+    urls = [f"{route_base}/live/ch{i}/master.m3u8" for i in range(args.urls)]
+    tasks = len(urls) * (len(update_playlist.PROXY_ROUTES) + 1) * len(origins)
+    workers = update_playlist.HEALTH_CHECK_WORKERS
+    assert tasks > workers, f"测速数量需要多于 HEALTH_CHECK_WORKERS={workers}"
+
+    # 单条线路经过测速出口
+    probe = update_playlist.probe_route(urls[0], origins[1], args.timeout)
+    assert probe['ok'] and ForwardProxyHandler.forwarded == 3, (probe, ForwardProxyHandler.forwarded)
+    dead = update_playlist.probe_route(f"{route_base}/dead/{urls[0]}", None, args.timeout)
+    assert not dead['ok'] and dead['error'] == 'HTTP 404', dead
+
+    with open(os.devnull, 'w') as devnull:
+        stdout = sys.stdout
+        sys.stdout = devnull
+        try:
+            start = time.perf_counter()
+            rankings = update_playlist.rank_routes(urls, origins, timeout=args.timeout)
+            elapsed = time.perf_counter() - start
+        finally:
+            sys.stdout = stdout
+    server.shutdown()
+    proxy.shutdown()
+
+    print(f"📊 线路测速（{len(urls)} 个地址 × {len(update_playlist.PROXY_ROUTES) + 1} 条线路 × {len(origins)} 个出口 = "
+          f"{tasks} 次测速，{workers} 个线程，超时 {args.timeout:.0f}秒）")
+    print(f"  经过测速出口的请求: {ForwardProxyHandler.forwarded}")
+    print(f"  阶段耗时 {elapsed:.2f}秒")
+    for url in urls:
+        labels = [label for label, _ in rankings[url]]
+        assert sorted(labels) == sorted(['主线路', 'fast', 'slow']), f"{url} 的可用线路被错误剔除: {labels}"
+        assert labels[-1] == 'slow', f"{url} 的慢线路没有排在最后: {labels}"
+    print(f"  排序示例: {' > '.join(label for label, _ in rankings[urls[-1]])}")
+    print("✅ 所有地址只去掉了失效线路，慢线路排在最后")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,75 @@
+#!/usr/bin/env python3
+"""
+启动耗时基准测试
+对比延迟加载与旧的模块级导入 selenium/webdriver_manager 的启动时间，
+以及无浏览器运行路径（缓存重新生成、仅静态频道）的端到端耗时
+
+用法: python benchmarks/bench_startup.py [--runs 10]
+"""
+
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# 旧版本在模块加载时执行的浏览器相关导入
+EAGER_IMPORTS = (
+    "from selenium import webdriver; "
+    "from selenium.webdriver.common.by import By; "
+    "from selenium.webdriver.chrome.options import Options; "
+    "from selenium.webdriver.chrome.service import Service; "
+    "from selenium.webdriver.support.ui import WebDriverWait; "
+    "from selenium.webdriver.support import expected_conditions as EC; "
+    "from webdriver_manager.chrome import ChromeDriverManager"
+)
+
+def time_command(args, runs):
+    """多次运行命令，返回每次的耗时（毫秒）"""
+    samples = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        subprocess.run(args, cwd=REPO_ROOT, check=True,
+                       stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        samples.append((time.perf_counter() - start) * 1000)
+    return samples
+
+def main():
+    parser = argparse.ArgumentParser(description="启动耗时基准测试")
+    parser.add_argument('--runs', type=int, default=10, help='每个场景运行次数')
+    args = parser.parse_args()
+
+    output_dir = tempfile.mkdtemp()
+    output = os.path.join(output_dir, 'korean_tv.m3u')
+    china_output = os.path.join(output_dir, 'korean_tv_china_optimized.m3u')
+    python = sys.executable
+    cases = [
+        ("Python解释器启动", [python, '-c', 'pass']),
+        ("导入 update_playlist（延迟加载）",
+         [python, '-c', "import sys, update_playlist; assert 'selenium' not in sys.modules"]),
+        ("导入 update_playlist + 浏览器依赖（旧的模块级导入）",
+         [python, '-c', f"import update_playlist; {EAGER_IMPORTS}"]),
+        ("--static-only 端到端", [python, 'update_playlist.py', '--static-only',
+                                '--output', output, '--china-output', china_output]),
+        ("--from-cache 端到端", [python, 'update_playlist.py', '--from-cache',
+                               '--output', output, '--china-output', china_output]),
+    ]
+
+    print(f"📊 启动耗时（{args.runs} 次运行，单位毫秒）")
+    print(f"{'场景':<40} {'中位数':>10} {'最小':>10} {'最大':>10}")
+    results = {}
+    for name, command in cases:
+        samples = time_command(command, args.runs)
+        results[name] = statistics.median(samples)
+        print(f"{name:<40} {statistics.median(samples):>10.1f} {min(samples):>10.1f} {max(samples):>10.1f}")
+
+    lazy = results["导入 update_playlist（延迟加载）"]
+    eager = results["导入 update_playlist + 浏览器依赖（旧的模块级导入）"]
+    print(f"\n⚡ 延迟加载每次运行节省约 {eager - lazy:.1f} 毫秒（{(eager - lazy) / eager * 100:.0f}%）")
+
+if __name__ == "__main__":
+    main()
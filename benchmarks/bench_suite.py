@@ -0,0 +1,181 @@
+#!/usr/bin/env python3
+"""
+离线基准测试套件
+用录制（或合成）数据和本地替身服务器运行抓取流程的各个阶段，报告每个阶段的延迟和吞吐量，
+在没有网络、没有Chrome的机器上也能重复测量性能变化
+
+用法: python benchmarks/bench_suite.py [--recording recording.json] [--iterations 20] [--json results.json]
+"""
+
+import argparse
+import json
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import update_playlist  # noqa: E402
+from fixtures import SIGNED_KBS_URL, make_kbs_page, make_performance_log  # noqa: E402
+from replay import (GitDataStandInHandler, HlsStandInHandler, ReplayDriver, install_replay_adapter,  # noqa: E402
+                    isolate_state, load_recording, mount_stand_in, replay_browser_pool, start_server)
+
+def measure(func, iterations):
+    """运行多次，返回每次的耗时（秒）"""
+    samples = []
+    for _ in range(iterations):
+        start = time.perf_counter()
+        func()
+        samples.append(time.perf_counter() - start)
+    return samples
+
+def summarize(name, samples, units=1, unit_name='次', size_bytes=0):
+    """延迟的中位数/p95，以及按中位数计算的吞吐量"""
+    ordered = sorted(samples)
+    median = statistics.median(ordered)
+    p95 = ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))]
+    result = {
+        'stage': name,
+        'iterations': len(samples),
+        'median_ms': round(median * 1000, 3),
+        'p95_ms': round(p95 * 1000, 3),
+        'throughput': round(units / median, 1) if median else None,
+        'throughput_unit': f"{unit_name}/秒"
+    }
+    if size_bytes:
+        result['mb_per_s'] = round(size_bytes / 1024 / 1024 / median, 1) if median else None
+    return result
+
+def bench_network_logs(iterations):
+    """性能日志中查找签名地址（extract_m3u8_from_network_logs）"""
+    entries = make_performance_log(20000)
+    size = sum(len(entry['message']) for entry in entries)
+
+    def run():
+        driver = ReplayDriver({'performance_log': [entries], 'page_sources': [], 'scripts': {}})
+        urls = update_playlist.extract_m3u8_from_network_logs(driver, [update_playlist.KBS_SIGNED_DOMAIN])
+        assert SIGNED_KBS_URL in urls
+
+    return summarize('网络日志提取', measure(run, iterations), len(entries), '条', size)
+
+def bench_page_extraction(iterations):
+    """页面分析：page_scan 和 stitch 方式在大页面上的扫描"""
+    page = make_kbs_page(3.0)
+
+    def run():
+        driver = ReplayDriver({'performance_log': [], 'page_sources': [page], 'scripts': {}})
+        assert update_playlist.kbs_tier_page_scan(driver, 'KBS1') == SIGNED_KBS_URL
+        assert update_playlist.kbs_tier_stitch(driver, 'KBS1') == SIGNED_KBS_URL
+
+    return summarize('页面分析', measure(run, iterations), 2, '页', len(page) * 2)
+
+def bench_resolve(recording, iterations):
+    """完整解析流程回放：HTTP批量解析 + 浏览器方式层级（回放driver）"""
+    install_replay_adapter(recording)
+    update_playlist.scrape_channels_parallel = replay_browser_pool(recording)
+    with tempfile.TemporaryDirectory() as directory:
+        isolate_state(directory)
+
+        def run():
+            cache = update_playlist.SignedUrlCache(os.path.join(directory, 'url_cache.json'))
+            cache.entries = {}
+            assert update_playlist.resolve_channels(update_playlist.CHANNELS, cache)
+
+        samples = measure(run, iterations)
+    return summarize('解析回放', samples, len(update_playlist.CHANNELS), '频道')
+
+def bench_generate(dynamic_channels, iterations):
+    """生成标准版和中国优化版播放列表并写入（条目不变时跳过写入）"""
+    with tempfile.TemporaryDirectory() as directory:
+        output = os.path.join(directory, 'korean_tv.m3u')
+
+        def run():
+            standard = update_playlist.generate_playlist(dynamic_channels)
+            update_playlist.generate_china_playlist(dynamic_channels)
+            update_playlist.write_playlist_if_changed(output, standard)
+
+        samples = measure(run, iterations)
+    return summarize('生成播放列表', samples, 1, '次')
+
+def bench_validation(iterations, streams=40):
+    """健康检查：并发检查本地HLS替身上的直播源（其中四分之一失效）"""
+    server = start_server(HlsStandInHandler)
+    mount_stand_in(server)
+    base = f"http://127.0.0.1:{server.server_port}/live"
+    targets = [(f"{base}/{'dead' if i % 4 == 0 else 'ch'}{i}/master.m3u8", {}) for i in range(streams)]
+
+    def run():
+        results = update_playlist.check_streams(targets, timeout=5)
+        assert sum(1 for result in results.values() if result['ok']) == streams - streams // 4
+
+    samples = measure(run, iterations)
+    server.shutdown()
+    return summarize('健康检查', samples, streams, '个源')
+
+def bench_publish(iterations):
+    """发布：通过本地Git Data API替身提交两个播放列表（一次有变化、一次无变化）"""
+    server = start_server(GitDataStandInHandler)
+    mount_stand_in(server)
+    GitDataStandInHandler.reset()
+    publisher = update_playlist.GitDataPublisher('owner', 'repo', 'token',
+                                                 api_base=f"http://127.0.0.1:{server.server_port}")
+    counter = [0]
+
+    def run():
+        counter[0] += 1
+        files = {
+            'korean_tv.m3u': f"#EXTM3U\n# {counter[0]}\n",
+            'korean_tv_china_optimized.m3u': "#EXTM3U\n"
+        }
+        assert publisher.publish(files, 'bench') is not None
+        assert publisher.publish(files, 'bench') is None
+
+    samples = measure(run, iterations)
+    server.shutdown()
+    return summarize('发布提交', samples, 2, '次发布')
+
+def main():
+    parser = argparse.ArgumentParser(description="离线基准测试套件")
+    parser.add_argument('--recording', help='录制文件（benchmarks/replay.py record 生成），默认使用合成录制')
+    parser.add_argument('--iterations', type=int, default=20)
+    parser.add_argument('--json', help='把结果写入JSON文件，便于对比不同版本')
+    args = parser.parse_args()
+
+    recording = load_recording(args.recording)
+    # 基准测试只关心耗时，关闭各阶段的打印
+    with open(os.devnull, 'w') as devnull:
+        stdout = sys.stdout
+        sys.stdout = devnull
+        try:
+            results = [
+                bench_network_logs(args.iterations),
+                bench_page_extraction(args.iterations),
+                bench_resolve(recording, args.iterations),
+            ]
+            dynamic_channels = update_playlist.resolve_channels(
+                update_playlist.CHANNELS,
+                isolate_state(tempfile.mkdtemp()))
+            results.extend([
+                bench_generate(dynamic_channels, args.iterations),
+                bench_validation(args.iterations),
+                bench_publish(args.iterations),
+            ])
+        finally:
+            sys.stdout = stdout
+
+    print(f"📊 离线基准测试（每个阶段 {args.iterations} 次，{'录制: ' + args.recording if args.recording else '合成录制'}）")
+    print(f"{'阶段':<14} {'中位数(ms)':>12} {'p95(ms)':>10} {'吞吐量':>18} {'MB/秒':>8}")
+    for result in results:
+        throughput = f"{result['throughput']} {result['throughput_unit']}"
+        print(f"{result['stage']:<14} {result['median_ms']:>12.2f} {result['p95_ms']:>10.2f} "
+              f"{throughput:>18} {result.get('mb_per_s', ''):>8}")
+
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump({'recording': args.recording, 'results': results}, f, ensure_ascii=False, indent=2)
+        print(f"💾 结果已写入 {args.json}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+#!/usr/bin/env python3
+"""
+浏览器冷启动/热启动基准测试（需要Chrome和网络）
+冷启动：空的缓存目录（需要下载chromedriver、全新的浏览器配置）；
+热启动：复用固定的chromedriver和持久配置目录（播放器脚本和HTTP缓存已经存在）。
+分别测量获取驱动、启动浏览器和打开频道页面到捕获第一个签名地址的耗时
+
+用法: python benchmarks/bench_warm_start.py [--channel KBS1] [--warm-runs 3] [--timeout 60]
+"""
+
+import argparse
+import os
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import update_playlist  # noqa: E402
+
+def first_capture(channel, timeout):
+    """启动浏览器并打开频道页面，返回各阶段耗时（秒），没有捕获到签名地址时 capture 为None"""
+    timings = {}
+    start = time.perf_counter()
+    update_playlist.resolve_chromedriver()
+    timings['driver'] = time.perf_counter() - start
+
+    driver = update_playlist.setup_driver(profile='bench')
+    timings['launch'] = time.perf_counter() - start - timings['driver']
+    try:
+        update_playlist.enable_request_blocking(driver, channel['url'])
+        page_start = time.perf_counter()
+        driver.get(channel['url'])
+        url = update_playlist.wait_for_signed_kbs_url(driver, timeout)
+        timings['capture'] = time.perf_counter() - page_start if url else None
+        timings['total'] = time.perf_counter() - start if url else None
+    finally:
+        update_playlist.quit_driver(driver)
+    return timings
+
+def main():
+    parser = argparse.ArgumentParser(description="浏览器冷启动/热启动基准测试")
+    parser.add_argument('--channel', default='KBS1', help='用于测量的KBS频道名称')
+    parser.add_argument('--warm-runs', type=int, default=3, help='热启动运行次数')
+    parser.add_argument('--timeout', type=float, default=60, help='等待签名地址的最长时间（秒）')
+    args = parser.parse_args()
+
+    channel = update_playlist.CHANNELS_BY_NAME[args.channel]
+    cache_dir = tempfile.mkdtemp()
+    update_playlist.CHROME_CACHE_DIR = cache_dir
+    update_playlist.CHROMEDRIVER_PATH = ''
+    update_playlist.CHROME_PERSISTENT_PROFILE = True
+
+    results = []
+    try:
+        update_playlist._chromedriver_path = None
+        results.append(('冷启动', first_capture(channel, args.timeout)))
+        for run in range(args.warm_runs):
+            # 模拟新的进程：只保留磁盘上的固定驱动和配置目录
+            update_playlist._chromedriver_path = None
+            results.append((f'热启动 #{run + 1}', first_capture(channel, args.timeout)))
+    finally:
+        shutil.rmtree(cache_dir, ignore_errors=True)
+
+    def fmt(value):
+        return f"{value:.2f}" if value is not None else '未捕获'
+
+    print(f"\n📊 {args.channel} 首个签名地址耗时（秒）")
+    print(f"{'场景':<10} {'获取驱动':>10} {'启动浏览器':>10} {'页面到捕获':>10} {'合计':>10}")
+    for name, timings in results:
+        print(f"{name:<10} {fmt(timings['driver']):>10} {fmt(timings['launch']):>10} "
+              f"{fmt(timings['capture']):>10} {fmt(timings['total']):>10}")
+
+    warm_totals = [timings['total'] for _, timings in results[1:] if timings['total'] is not None]
+    cold_total = results[0][1]['total']
+    if cold_total and warm_totals:
+        warm = statistics.median(warm_totals)
+        print(f"\n⚡ 热启动中位数 {warm:.2f} 秒，比冷启动快 {cold_total - warm:.2f} 秒（{(cold_total - warm) / cold_total * 100:.0f}%）")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,111 @@
+"""
+基准测试使用的合成数据
+按真实Chrome性能日志和KBS页面的结构生成，保证不同机器上结果可复现
+"""
+
+import json
+import random
+
+SIGNED_KBS_URL = (
+    "https://1tv.gscdn.kbs.co.kr/1tv_3.m3u8?Policy=eyJTdGF0ZW1lbnQiOlt7IlJlc291cmNlIjoiaHR0cHM6Ly8xdHYuZ3NjZG4ua2JzLmNvLmtyLyoiLCJDb25kaXRpb24iOnsiRGF0ZUxlc3NUaGFuIjp7IkFXUzpFcG9jaFRpbWUiOjE3NjMyOTQ2MzJ9fX1dfQ__"
+    "&Key-Pair-Id=APKAICDSGT3Y7IXGJ3TA&Signature=WeWxBFv075Dbk3ml-F-Rdw54Hz2~HNBHW~GvxreHNTEL-pcO8BzfAW4p4M55feWbMuYbfBPDPcA-W6~j616yF8o4K"
+)
+
+class FakeLogDriver:
+    """按批次返回性能日志的假driver（get_log 和真实driver一样会清空已读日志）"""
+
+    def __init__(self, batches):
+        self.batches = list(batches)
+
+    def get_log(self, log_type):
+        return self.batches.pop(0) if self.batches else []
+
+def _entry(method, params, webview="WEBVIEW0"):
+    message = json.dumps({"message": {"method": method, "params": params}, "webview": webview},
+                         separators=(',', ':'))
+    return {"level": "INFO", "message": message, "timestamp": 0}
+
+def make_performance_log(count=20000, signed_position=0.9, seed=1):
+    """生成一段性能日志：大量 dataReceived/Page 事件、带大量头部的资源请求，以及少量m3u8请求"""
+    rng = random.Random(seed)
+    headers = {f"x-header-{i}": "v" * 40 for i in range(20)}
+    extra_headers = {"set-cookie": "c=" + "x" * 4000, "content-security-policy": "default-src " + "a " * 1500}
+    entries = []
+    for i in range(count):
+        roll = rng.random()
+        request_id = f"{i}.{rng.randint(1, 999)}"
+        if roll < 0.55:
+            entries.append(_entry("Network.dataReceived",
+                                  {"requestId": request_id, "dataLength": rng.randint(100, 65536),
+                                   "encodedDataLength": rng.randint(100, 65536), "timestamp": i}))
+        elif roll < 0.65:
+            entries.append(_entry("Page.frameStartedLoading", {"frameId": "F" * 32}))
+        elif roll < 0.8:
+            entries.append(_entry("Network.requestWillBeSent", {
+                "requestId": request_id,
+                "request": {"url": f"https://static.kbs.co.kr/assets/{i}.js", "headers": headers},
+                "type": "Script"}))
+        elif roll < 0.9:
+            entries.append(_entry("Network.responseReceived", {
+                "requestId": request_id,
+                "response": {"url": f"https://static.kbs.co.kr/img/{i}.png", "headers": headers,
+                             "status": 200, "mimeType": "image/png"}}))
+        elif roll < 0.95:
+            entries.append(_entry("Network.responseReceivedExtraInfo",
+                                  {"requestId": request_id, "headers": extra_headers}))
+        elif roll < 0.99:
+            entries.append(_entry("Network.loadingFinished",
+                                  {"requestId": request_id, "encodedDataLength": rng.randint(100, 65536)}))
+        else:
+            entries.append(_entry("Network.requestWillBeSent", {
+                "requestId": request_id,
+                "request": {"url": f"https://1tv.gscdn.kbs.co.kr/1tv_3/chunklist_{i}.m3u8", "headers": headers},
+                "type": "XHR"}))
+    entries.insert(int(count * signed_position), _entry("Network.requestWillBeSent", {
+        "requestId": "signed", "request": {"url": SIGNED_KBS_URL, "headers": headers}, "type": "XHR"}))
+    return entries
+
+def load_performance_log(path):
+    """读取录制的性能日志（driver.get_log('performance') 的JSON转储）"""
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+def split_batches(entries, batches):
+    """把日志切成若干批，模拟点击循环中日志逐步增长"""
+    size = max(1, len(entries) // batches)
+    return [entries[i:i + size] for i in range(0, len(entries), size)]
+
+def make_kbs_page(size_mb=3.0, seed=2, include_signed=True):
+    """生成接近真实KBS直播页面大小的HTML：长的压缩JS行、JSON配置、大量资源链接"""
+    rng = random.Random(seed)
+    target = int(size_mb * 1024 * 1024)
+    chunks = ["<!DOCTYPE html><html><head><title>KBS onAir</title>"]
+    length = len(chunks[0])
+    i = 0
+    while length < target:
+        roll = rng.random()
+        if roll < 0.4:
+            # 压缩后的JS：很长且没有空白，夹杂URL片段和引号
+            body = ";".join(
+                f"var a{i}_{j}=function(e){{return e.url||\"https://static.kbs.co.kr/lib/{j}.js?v={rng.randint(1, 9999)}\"}}"
+                for j in range(200))
+            chunk = f"<script>{body}</script>"
+        elif roll < 0.6:
+            chunk = "".join(
+                f'<li class="item"><a href="https://program.kbs.co.kr/p/{i}/{j}"><img src="https://img.kbs.co.kr/{j}.jpg"></a></li>'
+                for j in range(50))
+        elif roll < 0.8:
+            items = ",".join(
+                f'{{"id":{j},"title":"프로그램 {j}","url":"https://vod.kbs.co.kr/index.html?source=episode&pid={j}","thumb":"https://img.kbs.co.kr/t/{j}.png"}}'
+                for j in range(40))
+            chunk = f'<script type="application/json">{{"list":[{items}]}}</script>'
+        else:
+            chunk = "<div>" + "한국방송공사 편성표 " * 200 + "</div>"
+        chunks.append(chunk)
+        length += len(chunk)
+        i += 1
+    if include_signed:
+        chunks.insert(len(chunks) * 3 // 4,
+                      f'<script>var player={{"source":"{SIGNED_KBS_URL}","type":"hls"}};</script>')
+    chunks.append("</body></html>")
+    return "".join(chunks)
@@ -0,0 +1,436 @@
+#!/usr/bin/env python3
+"""
+录制/回放工具
+录制: 真实抓取时保存每个频道标签页的页面源码、性能日志批次、JS执行结果以及所有HTTP响应
+回放: 用 ReplayDriver 和 ReplayAdapter 代替浏览器和网络，在没有网络的机器上重现一次抓取
+
+用法: python benchmarks/replay.py record --output recording.json [--channels KBS1,MBN]
+     python benchmarks/replay.py replay recording.json
+"""
+
+import argparse
+import base64
+import hashlib
+import json
+import os
+import sys
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import requests
+from requests.adapters import BaseAdapter, HTTPAdapter
+from requests.structures import CaseInsensitiveDict
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import update_playlist  # noqa: E402
+
+RECORDING_VERSION = 1
+MAX_RECORDED_BODY = 1024 * 1024  # 超过该大小的HTTP响应体不录制
+
+def script_key(script):
+    """JS脚本的稳定标识（脚本文本的SHA1前12位）"""
+    return hashlib.sha1(script.encode('utf-8')).hexdigest()[:12]
+
+class Recorder:
+    """收集录制数据：按频道保存浏览器交互，HTTP响应按 (方法, 地址) 保存"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.pages = {}
+        self.http = {}
+
+    def page(self, channel_name):
+        with self.lock:
+            return self.pages.setdefault(channel_name, {
+                'navigations': [], 'page_sources': [], 'performance_log': [], 'scripts': {}
+            })
+
+    def record_response(self, response, *args, **kwargs):
+        """requests 的 response 钩子"""
+        body = response.content if len(response.content) <= MAX_RECORDED_BODY else b''
+        with self.lock:
+            self.http[f"{response.request.method} {response.url}"] = {
+                'status': response.status_code,
+                'headers': {key: value for key, value in response.headers.items()
+                            if key.lower() not in ('content-encoding', 'transfer-encoding', 'content-length')},
+                'body': base64.b64encode(body).decode('ascii')
+            }
+
+    def to_json(self):
+        return {
+            'version': RECORDING_VERSION,
+            'recorded_at': int(time.time()),
+            'pages': self.pages,
+            'http': self.http
+        }
+
+class RecordingDriver:
+    """包装标签页（或driver），把抓取过程中的浏览器交互写入录制"""
+
+    def __init__(self, driver, page):
+        self.driver = driver
+        self.record = page
+
+    def get(self, url):
+        self.record['navigations'].append(url)
+        return self.driver.get(url)
+
+    def refresh(self):
+        self.record['navigations'].append('refresh')
+        return self.driver.refresh()
+
+    def get_log(self, log_type):
+        entries = self.driver.get_log(log_type)
+        self.record['performance_log'].append(entries)
+        return entries
+
+    @property
+    def page_source(self):
+        source = self.driver.page_source
+        self.record['page_sources'].append(source)
+        return source
+
+    def execute_script(self, script, *args):
+        result = self.driver.execute_script(script, *args)
+        if not args:  # 带元素参数的脚本（点击）无法回放
+            try:
+                json.dumps(result)
+                self.record['scripts'].setdefault(script_key(script), []).append(result)
+            except TypeError:
+                pass
+        return result
+
+    def __getattr__(self, name):
+        if name.startswith('_'):
+            raise AttributeError(name)
+        return getattr(self.driver, name)
+
+class ReplayDriver:
+    """按录制顺序返回页面源码、性能日志批次和JS结果；元素查找返回空列表（点击方式不回放）"""
+
+    def __init__(self, page):
+        self.page = page
+        self.log_index = 0
+        self.source_index = 0
+        self.script_calls = {}
+
+    def get(self, url):
+        pass
+
+    def refresh(self):
+        pass
+
+    def get_log(self, log_type):
+        batches = self.page['performance_log']
+        if self.log_index >= len(batches):
+            return []
+        self.log_index += 1
+        return batches[self.log_index - 1]
+
+    @property
+    def page_source(self):
+        sources = self.page['page_sources'] or ['']
+        source = sources[min(self.source_index, len(sources) - 1)]
+        self.source_index += 1
+        return source
+
+    def execute_script(self, script, *args):
+        results = self.page['scripts'].get(script_key(script))
+        if not results:
+            return None
+        index = self.script_calls.get(script_key(script), 0)
+        self.script_calls[script_key(script)] = index + 1
+        return results[min(index, len(results) - 1)]
+
+    def execute_cdp_cmd(self, command, params):
+        return {}
+
+    def find_elements(self, *args):
+        return []
+
+class ReplayAdapter(BaseAdapter):
+    """用录制的响应代替网络；没有录制的地址返回404"""
+
+    def __init__(self, http):
+        super().__init__()
+        self.http = http
+        self.misses = []
+
+    def send(self, request, stream=False, timeout=None, verify=True, cert=None, proxies=None):
+        recorded = self.http.get(f"{request.method} {request.url}")
+        if recorded is None and request.method == 'HEAD':
+            recorded = self.http.get(f"GET {request.url}")
+        if recorded is None:
+            self.misses.append(f"{request.method} {request.url}")
+            recorded = {'status': 404, 'headers': {}, 'body': ''}
+
+        body = base64.b64decode(recorded['body'])
+        response = requests.Response()
+        response.status_code = recorded['status']
+        response.headers = CaseInsensitiveDict(recorded['headers'])
+        response.headers['Content-Length'] = str(len(body))
+        response._content = b'' if request.method == 'HEAD' else body
+        response.url = request.url
+        response.request = request
+        response.reason = 'OK' if recorded['status'] < 400 else 'Error'
+        return response
+
+    def close(self):
+        pass
+
+def install_replay_adapter(recording):
+    """把录制的HTTP响应挂到全局HTTP会话上，返回适配器（可查看未命中的请求）"""
+    adapter = ReplayAdapter(recording['http'])
+    session = update_playlist.get_http_session()
+    session.mount('http://', adapter)
+    session.mount('https://', adapter)
+    return adapter
+
+def mount_stand_in(server):
+    """本地替身服务器的地址走真实网络（前缀更长的适配器优先）"""
+    session = update_playlist.get_http_session()
+    session.mount(f"http://127.0.0.1:{server.server_port}", HTTPAdapter(pool_maxsize=64))
+
+def start_server(handler_class):
+    """在本机随机端口启动替身HTTP服务器"""
+    server = ThreadingHTTPServer(('127.0.0.1', 0), handler_class)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+class HlsStandInHandler(BaseHTTPRequestHandler):
+    """HLS替身：/live/<名称>/master.m3u8 → 子码流 → 分片，路径中包含 dead 的地址返回404"""
+
+    protocol_version = 'HTTP/1.1'
+
+    def log_message(self, *args):
+        pass
+
+    def do_HEAD(self):
+        self.respond(head=True)
+
+    def do_GET(self):
+        self.respond(head=False)
+
+    def respond(self, head):
+        if 'dead' in self.path:
+            body, status = b'not found', 404
+        elif self.path.endswith('master.m3u8'):
+            body, status = b'#EXTM3U\n#EXT-X-STREAM-INF:BANDWIDTH=2000000\nvariant.m3u8\n', 200
+        elif self.path.endswith('.m3u8'):
+            body, status = b'#EXTM3U\n#EXT-X-TARGETDURATION:6\n' + b''.join(
+                b'#EXTINF:6.0,\nseg%d.ts\n' % i for i in range(5)), 200
+        else:
+            body, status = b'\0' * 188 * 100, 200
+        self.send_response(status)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        if not head:
+            self.wfile.write(body)
+
+class GitDataStandInHandler(BaseHTTPRequestHandler):
+    """Git Data API替身：在内存中保存blob、tree、commit和分支引用"""
+
+    protocol_version = 'HTTP/1.1'
+    lock = threading.Lock()
+    objects = {}
+    head = None
+
+    def log_message(self, *args):
+        pass
+
+    @classmethod
+    def reset(cls):
+        with cls.lock:
+            tree = cls.store({'tree': {}})
+            cls.head = cls.store({'tree': tree, 'parents': []})
+
+    @classmethod
+    def store(cls, obj):
+        sha = hashlib.sha1(json.dumps(obj, sort_keys=True).encode()).hexdigest()
+        cls.objects[sha] = obj
+        return sha
+
+    def reply(self, status, obj):
+        body = json.dumps(obj).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def read_json(self):
+        return json.loads(self.rfile.read(int(self.headers['Content-Length'])))
+
+    def do_GET(self):
+        path = self.path.split('/git/', 1)[1].split('?')[0]
+        cls = type(self)
+        with cls.lock:
+            if path.startswith('ref/'):
+                return self.reply(200, {'object': {'sha': cls.head}})
+            if path.startswith('commits/'):
+                return self.reply(200, {'tree': {'sha': cls.objects[path.split('/')[1]]['tree']}})
+            if path.startswith('trees/'):
+                tree = cls.objects[path.split('/')[1]]['tree']
+                return self.reply(200, {'tree': [{'path': name, 'type': 'blob', 'sha': sha}
+                                                 for name, sha in tree.items()]})
+        self.reply(404, {})
+
+    def do_POST(self):
+        path = self.path.split('/git/', 1)[1]
+        data = self.read_json()
+        cls = type(self)
+        with cls.lock:
+            if path == 'blobs':
+                content = base64.b64decode(data['content'])
+                sha = update_playlist.git_blob_sha(content)
+                cls.objects[sha] = {'blob': len(content)}
+                return self.reply(201, {'sha': sha})
+            if path == 'trees':
+                tree = dict(cls.objects[data['base_tree']]['tree'])
+                tree.update({item['path']: item['sha'] for item in data['tree']})
+                return self.reply(201, {'sha': cls.store({'tree': tree})})
+            if path == 'commits':
+                return self.reply(201, {'sha': cls.store({'tree': data['tree'], 'parents': data['parents']})})
+        self.reply(404, {})
+
+    def do_PATCH(self):
+        data = self.read_json()
+        cls = type(self)
+        with cls.lock:
+            if cls.head not in cls.objects[data['sha']]['parents']:
+                return self.reply(422, {'message': 'Update is not a fast forward'})
+            cls.head = data['sha']
+        self.reply(200, {})
+
+def make_synthetic_recording():
+    """没有真实录制时使用的合成录制：KBS接口不可用（走浏览器），签名地址出现在第二批日志中，MBN认证链接可用"""
+    from fixtures import SIGNED_KBS_URL, make_kbs_page, make_performance_log, split_batches
+
+    pages, http = {}, {}
+    noise = split_batches([entry for entry in make_performance_log(2000, seed=3)
+                           if SIGNED_KBS_URL not in entry['message']], 2)
+    for channel in update_playlist.CHANNELS:
+        if channel['resolver'] == 'kbs':
+            signed = SIGNED_KBS_URL.replace('https://1tv.gscdn.kbs.co.kr/1tv_3.m3u8', channel['base_url'])
+            pages[channel['name']] = {
+                'navigations': [channel['url']],
+                'page_sources': [make_kbs_page(0.5, include_signed=False)],
+                # 第一批在切换频道时被丢弃，第二批中包含签名地址
+                'performance_log': [noise[0], noise[1] + [{
+                    'level': 'INFO', 'timestamp': 0, 'message': json.dumps({'message': {
+                        'method': 'Network.requestWillBeSent',
+                        'params': {'request': {'url': signed}}}})}]],
+                'scripts': {}
+            }
+        elif channel['resolver'] == 'mbn':
+            # 解析后的主播放列表中还有一个 channels.json 没有配置的 1500k 画质
+            template = channel['qualities'][0]
+            extra_url = template['url'].replace(f"/{template['quality']}/", '/1500k/')
+            urls = [quality['url'] for quality in channel['qualities']] + [extra_url]
+            master = '#EXTM3U\n' + ''.join(
+                f"#EXT-X-STREAM-INF:BANDWIDTH={update_playlist.mbn_bandwidth(quality)}\n../{quality}/playlist.m3u8\n"
+                for quality in [*(quality['quality'] for quality in channel['qualities']), '1500k'])
+            for url in urls:
+                auth_url = channel['auth_url'].format(url=url)
+                prepared = requests.Request('GET', auth_url).prepare()
+                http[f"GET {prepared.url}"] = {
+                    'status': 200, 'headers': {'Content-Type': 'text/plain'},
+                    'body': base64.b64encode(f"{url}?token=replay".encode()).decode('ascii')
+                }
+                http[f"GET {url}?token=replay"] = {
+                    'status': 200, 'headers': {'Content-Type': 'application/vnd.apple.mpegurl'},
+                    'body': base64.b64encode(master.encode()).decode('ascii')
+                }
+    return {'version': RECORDING_VERSION, 'recorded_at': 0, 'pages': pages, 'http': http}
+
+def load_recording(path=None):
+    """读取录制文件，没有指定时生成合成录制"""
+    if not path:
+        return make_synthetic_recording()
+    with open(path, 'r', encoding='utf-8') as f:
+        recording = json.load(f)
+    if recording.get('version') != RECORDING_VERSION:
+        raise ValueError(f"不支持的录制版本: {recording.get('version')}")
+    return recording
+
+def replay_browser_pool(recording):
+    """代替 scrape_channels_parallel：每个频道用回放driver依次执行真实的抓取流程"""
+    def scrape_channels(channels, max_workers=None, channel_deadline=update_playlist.CHANNEL_DEADLINE,
+                        on_result=None):
+        results = []
+        for channel in channels:
+            page = recording['pages'].get(channel['name'])
+            if page is None:
+                results.append(update_playlist.get_fallback_channels(channel))
+                continue
+            deadline = time.monotonic() + channel_deadline
+            results.append(update_playlist.scrape_channel(ReplayDriver(page), channel, deadline))
+            if on_result:
+                on_result(channel, results[-1])
+        return results
+    return scrape_channels
+
+def isolate_state(directory):
+    """把缓存、获取方式统计和运行报告写到临时目录，避免回放改动仓库中的文件"""
+    update_playlist.TIER_STATS_FILE = os.path.join(directory, 'tier_stats.json')
+    update_playlist._tier_stats = update_playlist.TierStats(update_playlist.TIER_STATS_FILE)
+    update_playlist.RUN_REPORT_FILE = os.path.join(directory, 'run_report.jsonl')
+    return update_playlist.SignedUrlCache(os.path.join(directory, 'url_cache.json'))
+
+def replay(recording, channels=None):
+    """回放一次完整的解析流程（缓存为空），返回动态频道条目"""
+    adapter = install_replay_adapter(recording)
+    update_playlist.scrape_channels_parallel = replay_browser_pool(recording)
+    with tempfile.TemporaryDirectory() as directory:
+        cache = isolate_state(directory)
+        dynamic_channels = update_playlist.resolve_channels(channels or update_playlist.CHANNELS, cache)
+    return dynamic_channels, adapter.misses
+
+def record(output, channel_names=None):
+    """真实抓取一次并录制（需要Chrome和网络）"""
+    recorder = Recorder()
+    session = update_playlist.get_http_session()
+    session.hooks['response'].append(recorder.record_response)
+
+    scrape_channel = update_playlist.scrape_channel
+
+    def recording_scrape_channel(driver, channel, deadline=None):
+        return scrape_channel(RecordingDriver(driver, recorder.page(channel['name'])), channel, deadline)
+
+    update_playlist.scrape_channel = recording_scrape_channel
+    channels = [channel for channel in update_playlist.CHANNELS
+                if not channel_names or channel['name'] in channel_names]
+    with tempfile.TemporaryDirectory() as directory:
+        update_playlist.resolve_channels(channels, isolate_state(directory))
+
+    with open(output, 'w', encoding='utf-8') as f:
+        json.dump(recorder.to_json(), f, ensure_ascii=False)
+    print(f"💾 已录制 {len(recorder.pages)} 个频道页面、{len(recorder.http)} 个HTTP响应: {output}")
+
+def main():
+    parser = argparse.ArgumentParser(description="录制/回放抓取过程")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+    record_parser = subparsers.add_parser('record', help='真实抓取并录制')
+    record_parser.add_argument('--output', required=True)
+    record_parser.add_argument('--channels', help='只录制这些频道（逗号分隔）')
+    replay_parser = subparsers.add_parser('replay', help='回放录制（不指定文件时使用合成录制）')
+    replay_parser.add_argument('recording', nargs='?')
+    args = parser.parse_args()
+
+    if args.command == 'record':
+        record(args.output, args.channels.split(',') if args.channels else None)
+        return
+
+    dynamic_channels, misses = replay(load_recording(args.recording))
+    print(f"\n📺 回放得到 {len(dynamic_channels)} 个条目")
+    for channel in dynamic_channels:
+        print(f"  {channel['name']}: {channel['url'][:100]}")
+    if misses:
+        print(f"⚠️ {len(misses)} 个HTTP请求没有录制: {', '.join(misses[:5])}")
+
+if __name__ == "__main__":
+    main()
@@ -4,77 +4,172 @@
 全自动方案 - 深度分析KBS页面获取认证参数
 """
 
+import argparse
 import requests
 import re
 import time
 import json
 import os
 import base64
+import copy
+import gzip
+import hashlib
+import heapq
+import queue
+import shutil
+import signal
+import subprocess
+import threading
+import uuid
+import weakref
+from collections import OrderedDict
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, TimeoutError as FutureTimeoutError, wait
+from contextlib import contextmanager
 from datetime import datetime
-from typing import Optional, Dict, List
-from selenium import webdriver
-from selenium.webdriver.common.by import By
-from selenium.webdriver.chrome.options import Options
-from selenium.webdriver.chrome.service import Service
-from selenium.webdriver.support.ui import WebDriverWait
-from selenium.webdriver.support import expected_conditions as EC
-from webdriver_manager.chrome import ChromeDriverManager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Optional, Dict, List, Tuple, Callable, NamedTuple
+from urllib.parse import urlparse, parse_qs, urljoin, unquote, quote
+from requests.adapters import HTTPAdapter
+
+# 注意: selenium 和 webdriver_manager 只在真正需要浏览器时才导入（见 setup_driver 和 resolve_chromedriver），
+# 这样缓存命中或HTTP快速解析成功的运行完全不会加载它们
 
 # 配置信息
 GITHUB_USERNAME = "GoonhoLee"
 STABLE_REPO_NAME = "korean-tv-static"
 FULL_ACCESS_TOKEN = os.getenv('FULL_ACCESS_TOKEN')
+GITHUB_API_BASE = os.getenv('GITHUB_API_BASE', 'https://api.github.com').rstrip('/')  # 可指向本地模拟服务器
+STABLE_REPO_BRANCH = os.getenv('STABLE_REPO_BRANCH', 'main')
+PUBLISH_MAX_ATTEMPTS = int(os.getenv('PUBLISH_MAX_ATTEMPTS', '4'))  # 遇到409/5xx时的最大尝试次数
+PUBLISH_BACKOFF = float(os.getenv('PUBLISH_BACKOFF', '1.0'))  # 重试退避的基准秒数（按2的幂增长）
 
-# 电视台配置
-CHANNELS = [
-    {
-        "name": "KBS1",
-        "url": "https://onair.kbs.co.kr/index.html?sname=onair&stype=live&ch_code=11&ch_type=globalList",
-        "tvg_id": "KBS1.kr"
-    },
-    {
-        "name": "KBS2", 
-        "url": "https://onair.kbs.co.kr/index.html?sname=onair&stype=live&ch_code=12&ch_type=globalList",
-        "tvg_id": "KBS2.kr"
-    },
-    {
-        "name": "KBS 24",
-        "url": "https://onair.kbs.co.kr/index.html?sname=onair&stype=live&ch_code=81&ch_type=globalList",
-        "tvg_id": "KBS24.kr"
-    },
-    {
-        "name": "MBN",
-        "url": "https://www.mbn.co.kr/vod/onair",
-        "tvg_id": "MBN.kr"
-    },
-    # JTBC暂时注释掉，因为可能需要特定网络环境
-    # {
-    #     "name": "JTBC",
-    #     "url": "https://onair.jtbc.co.kr/",
-    #     "tvg_id": "JTBC.kr"
-    # },
-    # 以下频道放在最后面
-    {
-        "name": "KBS DRAMA",
-        "url": "https://onair.kbs.co.kr/index.html?sname=onair&stype=live&ch_code=N91&ch_type=globalList",
-        "tvg_id": "KBSDRAMA.kr"
-    },
-    {
-        "name": "KBS JOY",
-        "url": "https://onair.kbs.co.kr/index.html?sname=onair&stype=live&ch_code=N92&ch_type=globalList",
-        "tvg_id": "KBSJOY.kr"
+# 并发抓取配置
+MAX_WORKERS = int(os.getenv('SCRAPER_WORKERS', '3'))  # 同时运行的浏览器数量
+
+# 浏览器启动加速：固定的chromedriver和持久的浏览器配置目录（跨运行复用播放器脚本和HTTP缓存）
+CHROME_CACHE_DIR = os.getenv('CHROME_CACHE_DIR', os.path.join(os.path.expanduser('~'), '.cache', 'koreaiptv'))
+CHROMEDRIVER_PATH = os.getenv('CHROMEDRIVER_PATH', '')  # 指定后直接使用，不做任何版本检查
+CHROME_PERSISTENT_PROFILE = os.getenv('CHROME_PERSISTENT_PROFILE', '1') == '1'
+CHROME_DISK_CACHE_MB = int(os.getenv('CHROME_DISK_CACHE_MB', '200'))  # 每个配置目录的磁盘缓存上限
+CHANNEL_DEADLINE = int(os.getenv('CHANNEL_DEADLINE', '240'))  # 单个频道最长处理时间（秒）
+
+# 网络日志捕获配置
+KBS_SIGNED_DOMAIN = 'gscdn.kbs.co.kr'
+CAPTURE_POLL_INTERVAL = float(os.getenv('CAPTURE_POLL_INTERVAL', '0.5'))  # 轮询性能日志的间隔（秒）
+STREAM_HOOK = os.getenv('STREAM_HOOK', '1') == '1'  # 在页面脚本之前注入网络钩子，直接记录播放器请求的m3u8地址
+PLAY_CLICK_LIMIT = int(os.getenv('PLAY_CLICK_LIMIT', '5'))  # 点击方式最多依次点击的候选播放控件数
+PLAY_CLICK_WAIT = float(os.getenv('PLAY_CLICK_WAIT', '3'))  # 每次点击后等待签名地址的时间（秒）
+
+# 签名地址缓存配置
+URL_CACHE_FILE = os.getenv('URL_CACHE_FILE', 'url_cache.json')
+CACHE_SAFETY_MARGIN = int(os.getenv('CACHE_SAFETY_MARGIN', '3600'))  # 距离过期少于该秒数时重新抓取
+UNSIGNED_URL_TTL = int(os.getenv('UNSIGNED_URL_TTL', '21600'))  # 无签名地址（如MBN）的缓存有效期（秒）
+
+# 获取方式（层级）统计配置
+TIER_STATS_FILE = os.getenv('TIER_STATS_FILE', 'tier_stats.json')
+TIER_SKIP_AFTER = int(os.getenv('TIER_SKIP_AFTER', '3'))  # 连续失败该次数后延后到最后尝试
+TIER_EXPLORE_EVERY = int(os.getenv('TIER_EXPLORE_EVERY', '5'))  # 每N次按默认顺序完整尝试一次，让失效的方式有机会恢复
+
+# 请求屏蔽配置（CDP Network.setBlockedURLs，支持*通配符）
+BLOCK_REQUESTS = os.getenv('BLOCK_REQUESTS', '1') == '1'
+BLOCK_PROFILES = {
+    # 所有站点通用：图片、字体、统计和广告
+    '*': {
+        'deny': [
+            '*.png*', '*.jpg*', '*.jpeg*', '*.gif*', '*.webp*', '*.svg*', '*.ico*',
+            '*.woff*', '*.ttf*', '*.otf*',
+            '*google-analytics.com*', '*googletagmanager.com*', '*doubleclick.net*',
+            '*googlesyndication.com*', '*adservice.google.*', '*facebook.net*',
+            '*scorecardresearch.com*', '*wcs.naver.net*', '*criteo.*', '*mobon.net*',
+            '*dable.io*', '*taboola.com*'
+        ],
+        'allow': ['.m3u8']
     },
-    {
-        "name": "KBS STORY",
-        "url": "https://onair.kbs.co.kr/index.html?sname=onair&stype=live&ch_code=N94&ch_type=globalList",
-        "tvg_id": "KBSSTORY.kr"
+    'onair.kbs.co.kr': {
+        # 前贴片广告由Google IMA加载，屏蔽后播放器直接请求直播流
+        'deny': ['*imasdk.googleapis.com*', '*pubads.g.doubleclick.net*'],
+        'allow': ['gscdn.kbs.co.kr', 'cfpwwwapi.kbs.co.kr']
     },
-    {
-        "name": "KBS LIFE",
-        "url": "https://onair.kbs.co.kr/index.html?sname=onair&stype=live&ch_code=N93&ch_type=globalList",
-        "tvg_id": "KBSLIFE.kr"
+    'mbn.co.kr': {
+        'deny': ['*imasdk.googleapis.com*'],
+        'allow': ['hls-live.mbn.co.kr', 'mbnStreamAuth']
     }
+}
+
+# 估算被屏蔽请求节省流量时使用的典型大小（字节）
+TYPICAL_RESOURCE_BYTES = {
+    'Image': 30000,
+    'Font': 40000,
+    'Script': 60000,
+    'Stylesheet': 20000,
+    'Media': 500000,
+    'XHR': 5000,
+    'Fetch': 5000,
+    'Other': 5000
+}
+
+# 常驻刷新模式配置
+DAEMON_STATE_FILE = os.getenv('DAEMON_STATE_FILE', 'scheduler_state.json')
+DAEMON_RETRY_INTERVAL = int(os.getenv('DAEMON_RETRY_INTERVAL', '300'))  # 刷新失败后的重试间隔（秒，--serve 模式同样使用）
+DAEMON_BATCH_WINDOW = int(os.getenv('DAEMON_BATCH_WINDOW', '60'))  # 在该时间内到期的频道合并为一次刷新
+
+# 本地HLS中转配置（--relay 模式）
+RELAY_HOST = os.getenv('RELAY_HOST', '0.0.0.0')
+RELAY_PORT = int(os.getenv('RELAY_PORT', '8080'))
+RELAY_PUBLIC_URL = os.getenv('RELAY_PUBLIC_URL', '').rstrip('/')  # 客户端访问中转的地址，为空时使用请求的Host头
+RELAY_CACHE_BYTES = int(os.getenv('RELAY_CACHE_MB', '256')) * 1024 * 1024  # 分片缓存上限
+RELAY_PLAYLIST_TTL = float(os.getenv('RELAY_PLAYLIST_TTL', '1'))  # 直播媒体播放列表的缓存时间（秒）
+
+# 按需播放列表服务配置（--serve 模式）
+SERVE_HOST = os.getenv('SERVE_HOST', '0.0.0.0')
+SERVE_PORT = int(os.getenv('SERVE_PORT', '8000'))
+SERVE_RESOLVE_TIMEOUT = float(os.getenv('SERVE_RESOLVE_TIMEOUT', '60'))  # 没有可用旧地址时请求最多等待重新解析的时间（秒）
+
+# HTTP快速解析配置（不启动浏览器直接请求KBS播放器使用的接口）
+KBS_API_BASE = os.getenv('KBS_API_BASE', 'https://cfpwwwapi.kbs.co.kr')
+HTTP_TIMEOUT = (5, 10)  # (连接超时, 读取超时)
+# 直播源健康检查配置
+HEALTH_CHECK_MODE = os.getenv('HEALTH_CHECK_MODE', 'demote')  # off: 不检查, demote: 失效源排到最后, drop: 删除失效源
+HEALTH_CHECK_TIMEOUT = float(os.getenv('HEALTH_CHECK_TIMEOUT', '8'))  # 单个源的检查总时长上限（秒）
+HEALTH_CHECK_WORKERS = int(os.getenv('HEALTH_CHECK_WORKERS', '16'))  # 线路测速的并发线程数（健康检查每个地址一个线程）
+
+# 中国优化版多线路配置
+CHINA_PLAYLIST_FILE = os.getenv('CHINA_PLAYLIST_FILE', 'korean_tv_china_optimized.m3u')
+# 代理线路模板（{url} 替换为原始地址），可用 PROXY_ROUTES 环境变量（JSON: [[名称, 模板], ...]）覆盖
+PROXY_ROUTES = json.loads(os.getenv('PROXY_ROUTES', 'null')) or [
+    ['代理线路1', 'https://corsproxy.io/?{url}'],
+    ['代理线路2', 'https://api.allorigins.win/raw?url={url}'],
 ]
+# 测速出口（HTTP代理地址，逗号分隔），为空时直接从当前机器测速
+PROBE_ORIGINS = [origin.strip() for origin in os.getenv('PROBE_ORIGINS', '').split(',') if origin.strip()] or [None]
+ROUTE_PROBE = os.getenv('ROUTE_PROBE', '1') == '1'
+ROUTE_PROBE_TIMEOUT = float(os.getenv('ROUTE_PROBE_TIMEOUT', '8'))
+ROUTE_PROBE_BYTES = 512 * 1024  # 测量分片吞吐量时最多下载的字节数
+# 后面的线路得分比前面的好超过该秒数才调整上一次播放列表中的线路顺序，避免测速抖动造成无意义的提交
+ROUTE_REORDER_THRESHOLD = float(os.getenv('ROUTE_REORDER_THRESHOLD', '0.5'))
+
+# 运行报告配置
+RUN_REPORT_FILE = os.getenv('RUN_REPORT_FILE', 'run_report.jsonl')  # 每次运行追加各阶段耗时（JSON行），为空时不写
+METRICS_TEXTFILE = os.getenv('METRICS_TEXTFILE', '')  # Prometheus textfile collector 文件路径，为空时不写
+
+USER_AGENT = 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36'
+
+# 电视台配置（channels.json: 名称、tvg-id、分组、解析器类型、备用地址、画质），新增频道只需修改该文件
+CHANNELS_FILE = os.getenv('CHANNELS_FILE', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'channels.json'))
+
+def load_channel_registry(path: str) -> List[Dict]:
+    """读取频道定义，按文件中的顺序返回启用的频道"""
+    with open(path, 'r', encoding='utf-8') as f:
+        definitions = json.load(f)['channels']
+    for definition in definitions:
+        missing = [key for key in ('name', 'tvg_id', 'resolver', 'url') if key not in definition]
+        if missing:
+            raise ValueError(f"频道定义缺少字段 {', '.join(missing)}: {definition}")
+        definition.setdefault('group', 'main')
+    return [definition for definition in definitions if definition.get('enabled', True)]
+
+CHANNELS = load_channel_registry(CHANNELS_FILE)
+CHANNELS_BY_NAME = {channel['name']: channel for channel in CHANNELS}
 
 # 静态频道列表（更新：添加JTBC静态源）
 STATIC_CHANNELS = [
@@ -114,26 +209,795 @@ STATIC_CHANNELS = [
     'https://jtbclive-cdn.jtbc.co.kr/pcweb/newpcweb.stream/chunklist.m3u8?Policy=eyJTdGF0ZW1lbnQiOiBbeyJSZXNvdXJjZSI6Imh0dHAqOi8vanRiY2xpdmUtY2RuLmp0YmMuY28ua3IvKiIsIkNvbmRpdGlvbiI6eyJEYXRlTGVzc1RoYW4iOnsiQVdTOkVwb2NoVGltZSI6MTc2ODYwNjIzMH0sIklwQWRkcmVzcyI6eyJBV1M6U291cmNlSXAiOiIwLjAuMC4wLzAifX19XX0_&Signature=ZdxxAlLyvlBEJHh6YuT2Ne7bNg0EjrA7XdXyxIX9wytnkCl32y7VoD6~YsEYXjbcWMOfiHUz~pBAXk2ZQYukJAP5ueN9PR~Ju5jfD2ZyaQClq9VWxM-d67ydlmzRxBwEcQzi5uG6kGJ7fnUbcXVrNeXQiQ3JnB174mIMRCCpfB8_&Key-Pair-Id=pub_jtbclive-cdn.jtbc.co.kr'
 ]
 
-# KBS频道基础URL映射
-KBS_BASE_URLS = {
-    "KBS1": "https://1tv.gscdn.kbs.co.kr/1tv_3.m3u8",
-    "KBS2": "https://2tv.gscdn.kbs.co.kr/2tv_1.m3u8",
-    "KBS 24": "https://news24.gscdn.kbs.co.kr/news24-02/news24-02_hd.m3u8",
-    "KBS DRAMA": "https://kbsndrama.gscdn.kbs.co.kr/kbsndrama-02/kbsndrama-02_sd.m3u8",
-    "KBS JOY": "https://kbsnjoy.gscdn.kbs.co.kr/kbsnjoy-02/kbsnjoy-02_sd.m3u8",
-    "KBS STORY": "https://kbsnw.gscdn.kbs.co.kr/kbsnw-02/kbsnw-02_sd.m3u8",
-    "KBS LIFE": "https://kbsnlife.gscdn.kbs.co.kr/kbsnlife-02/kbsnlife-02_sd.m3u8"
-}
+# 播放列表中放在静态频道之后的频道（channels.json 中 group 为 later）
+LATER_CHANNELS = [channel['name'] for channel in CHANNELS if channel['group'] == 'later']
+
+# KBS频道基础URL映射（用于拼接签名参数，也是抓取失败时的备用地址）
+KBS_BASE_URLS = {channel['name']: channel['base_url'] for channel in CHANNELS if channel.get('base_url')}
+
+def decode_policy_expiry(url: str) -> Optional[int]:
+    """解析CloudFront签名地址中Policy的过期时间（DateLessThan.AWS:EpochTime）"""
+    try:
+        policies = parse_qs(urlparse(url).query).get('Policy')
+        if not policies:
+            return None
+        
+        # CloudFront使用URL安全的Base64变体: '-'→'+', '_'→'=', '~'→'/'
+        encoded = policies[0].replace('-', '+').replace('_', '=').replace('~', '/')
+        policy = json.loads(base64.b64decode(encoded))
+        
+        expiries = [
+            int(statement['Condition']['DateLessThan']['AWS:EpochTime'])
+            for statement in policy.get('Statement', [])
+            if 'DateLessThan' in statement.get('Condition', {})
+        ]
+        return min(expiries) if expiries else None
+    except Exception:
+        return None
+
+def atomic_write_text(path: str, content: str):
+    """先写入同目录下的临时文件再原子替换，读者永远不会看到写了一半的文件
+
+    每次写入使用不同的临时文件名，同时写同一个文件的多个线程不会互相截断或移走对方的临时文件
+    """
+    directory = os.path.dirname(os.path.abspath(path))
+    tmp_path = os.path.join(directory, f".{os.path.basename(path)}.{uuid.uuid4().hex[:12]}.tmp")
+    try:
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            f.write(content)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+    except BaseException:
+        try:
+            os.remove(tmp_path)
+        except OSError:
+            pass
+        raise
+
+class Span:
+    """一个计时阶段：名称、属性（如频道、获取方式）和计数器（如下载字节数、重试次数）"""
+    
+    def __init__(self, name: str, parent: Optional["Span"], attrs: Dict):
+        self.name = name
+        self.parent = parent
+        self.path = f"{parent.path}/{name}" if parent else name
+        self.attrs = attrs
+        self.counters: Dict[str, float] = {}
+        self.started_at = time.time()
+        self.start = time.monotonic()
+        self.duration = 0.0
+        self.status = 'ok'
+    
+    def channel(self) -> Optional[str]:
+        """所属频道（向上查找最近的带channel属性的span）"""
+        span = self
+        while span:
+            if 'channel' in span.attrs:
+                return span.attrs['channel']
+            span = span.parent
+        return None
+    
+    def to_record(self) -> Dict:
+        record = {
+            'type': 'span',
+            'span': self.path,
+            'channel': self.channel(),
+            'started_at': round(self.started_at, 3),
+            'duration': round(self.duration, 3),
+            'status': self.status
+        }
+        record.update({key: value for key, value in self.attrs.items() if key != 'channel'})
+        if self.counters:
+            record['counters'] = self.counters
+        return record
+
+class Tracer:
+    """按线程嵌套的阶段计时，运行结束后写出JSON行报告和Prometheus指标"""
+    
+    def __init__(self):
+        self.local = threading.local()
+        self.lock = threading.RLock()
+        self.flush_lock = threading.Lock()
+        self.reset()
+    
+    def reset(self):
+        with self.lock:
+            self.run_id = datetime.now().strftime('%Y%m%dT%H%M%S')
+            self.started_at = time.time()
+            self.spans: List[Span] = []
+            self.counters: Dict[str, float] = {}
+    
+    def stack(self) -> List[Span]:
+        if not hasattr(self.local, 'stack'):
+            self.local.stack = []
+        return self.local.stack
+    
+    @contextmanager
+    def span(self, name: str, **attrs):
+        """计时一个阶段，嵌套在当前线程正在进行的阶段之下"""
+        stack = self.stack()
+        span = Span(name, stack[-1] if stack else None, attrs)
+        stack.append(span)
+        try:
+            yield span
+        except BaseException as e:
+            span.status = 'error'
+            span.attrs['error'] = f"{type(e).__name__}: {e}"
+            raise
+        finally:
+            span.duration = time.monotonic() - span.start
+            stack.pop()
+            with self.lock:
+                self.spans.append(span)
+    
+    def add(self, name: str, value: float = 1):
+        """累加计数器到当前阶段和整次运行"""
+        stack = self.stack()
+        with self.lock:
+            if stack:
+                stack[-1].counters[name] = stack[-1].counters.get(name, 0) + value
+            self.counters[name] = self.counters.get(name, 0) + value
+    
+    def annotate(self, **attrs):
+        """给当前频道的span（最近的带channel属性的span）添加属性，如最终采用的获取方式"""
+        for span in reversed(self.stack()):
+            if 'channel' in span.attrs:
+                span.attrs.update(attrs)
+                return
+    
+    def channel_summary(self) -> Dict[str, Dict]:
+        """每个频道最终的获取层级（cache/fast/browser）、方式和耗时，后执行的层级覆盖先执行的"""
+        summary = {}
+        for span in self.spans:
+            if 'tier' in span.attrs and 'channel' in span.attrs:
+                summary[span.attrs['channel']] = {
+                    key: value for key, value in span.to_record().items()
+                    if key in ('tier', 'method', 'entries', 'duration', 'status')
+                }
+        return summary
+    
+    def stage_totals(self) -> Dict[str, float]:
+        """按阶段路径汇总耗时（不区分频道）"""
+        totals: Dict[str, float] = {}
+        for span in self.spans:
+            totals[span.path] = totals.get(span.path, 0) + span.duration
+        return totals
+    
+    def write_report(self, path: str, mode: str):
+        """追加本次运行的所有阶段和一行汇总，便于长期跟踪回归"""
+        total = time.time() - self.started_at
+        with open(path, 'a', encoding='utf-8') as f:
+            for span in sorted(self.spans, key=lambda item: item.started_at):
+                f.write(json.dumps(dict(span.to_record(), run_id=self.run_id), ensure_ascii=False) + '\n')
+            f.write(json.dumps({
+                'type': 'run',
+                'run_id': self.run_id,
+                'mode': mode,
+                'started_at': round(self.started_at, 3),
+                'duration': round(total, 3),
+                'counters': self.counters,
+                'channels': self.channel_summary()
+            }, ensure_ascii=False) + '\n')
+    
+    def write_prometheus(self, path: str, mode: str):
+        """以Prometheus文本格式写出最近一次运行的指标（原子替换，供node_exporter读取）"""
+        def escape(value):
+            # 文本格式的标签值中反斜杠、双引号和换行需要转义
+            return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+        
+        def labels(**values):
+            return ','.join(f'{key}="{escape(value)}"' for key, value in values.items())
+        
+        lines = [
+            '# HELP iptv_run_duration_seconds 最近一次运行的总耗时',
+            '# TYPE iptv_run_duration_seconds gauge',
+            f'iptv_run_duration_seconds{{{labels(mode=mode)}}} {time.time() - self.started_at:.3f}',
+            '# HELP iptv_run_timestamp_seconds 最近一次运行的开始时间',
+            '# TYPE iptv_run_timestamp_seconds gauge',
+            f'iptv_run_timestamp_seconds{{{labels(mode=mode)}}} {self.started_at:.0f}',
+            '# HELP iptv_stage_duration_seconds 各阶段耗时（同一阶段多次执行时累加）',
+            '# TYPE iptv_stage_duration_seconds gauge'
+        ]
+        stage_durations: Dict[Tuple[str, str], float] = {}
+        for span in self.spans:
+            key = (span.path, span.channel() or '')
+            stage_durations[key] = stage_durations.get(key, 0) + span.duration
+        for (stage, channel), duration in sorted(stage_durations.items()):
+            lines.append(f'iptv_stage_duration_seconds{{{labels(stage=stage, channel=channel)}}} {duration:.3f}')
+        
+        lines.extend([
+            '# HELP iptv_channel_resolved 频道是否获取到地址',
+            '# TYPE iptv_channel_resolved gauge'
+        ])
+        for channel, info in sorted(self.channel_summary().items()):
+            resolved = 1 if info.get('entries') else 0
+            lines.append(f'iptv_channel_resolved{{{labels(channel=channel, tier=info.get("tier", ""), method=info.get("method", ""))}}} {resolved}')
+        
+        lines.extend([
+            '# HELP iptv_run_counter 运行期间的计数（下载字节数、重试次数等）',
+            '# TYPE iptv_run_counter gauge'
+        ])
+        for name, value in sorted(self.counters.items()):
+            lines.append(f'iptv_run_counter{{{labels(name=name)}}} {value}')
+        atomic_write_text(path, '\n'.join(lines) + '\n')
+    
+    def print_summary(self, limit: int = 10):
+        """打印耗时最多的阶段"""
+        totals = sorted(self.stage_totals().items(), key=lambda item: item[1], reverse=True)
+        if not totals:
+            return
+        print("⏱️ 阶段耗时（累计，前{}项）:".format(min(limit, len(totals))))
+        for path, duration in totals[:limit]:
+            print(f"  {duration:8.2f}秒  {path}")
+    
+    def flush(self, mode: str):
+        """写出报告和指标，然后开始新的一次运行
+
+        取出已记录的阶段和开始新的运行是一次原子操作，写出过程串行执行：按需服务中多批解析同时完成时，
+        每个阶段只写出一次，其他批次仍在记录的阶段留到下一次写出
+        """
+        with self.lock:
+            finished = copy.copy(self)
+            self.reset()
+        with self.flush_lock:
+            try:
+                if RUN_REPORT_FILE:
+                    finished.write_report(RUN_REPORT_FILE, mode)
+                if METRICS_TEXTFILE:
+                    finished.write_prometheus(METRICS_TEXTFILE, mode)
+            except OSError as e:
+                print(f"⚠️ 写入运行报告失败: {e}")
+
+TRACER = Tracer()
+
+class SignedUrlCache:
+    """按频道保存上一次成功获取的地址，并根据Policy过期时间判断是否需要重新抓取
+
+    运行中每个频道解析成功后立即追加到结果日志（journal），运行中断后下一次运行
+    读取缓存时会合并日志，只需要重新解析还没有完成的频道；save() 时日志合并进缓存文件。
+    """
+    
+    def __init__(self, path: str = URL_CACHE_FILE, journal_path: Optional[str] = None):
+        self.path = path
+        self.journal_path = journal_path or f"{path}.journal"
+        self.lock = threading.Lock()
+        self.entries: Dict[str, Dict] = {}
+        self.load()
+    
+    def load(self):
+        """从磁盘读取缓存，文件损坏时视为空缓存；然后合并上一次中断运行留下的结果日志"""
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                self.entries = json.load(f).get('channels', {})
+        except FileNotFoundError:
+            self.entries = {}
+        except Exception as e:
+            print(f"⚠️ 读取地址缓存失败，忽略缓存: {e}")
+            self.entries = {}
+        
+        resumed = self.load_journal()
+        if resumed:
+            print(f"📒 从结果日志恢复 {len(resumed)} 个频道: {', '.join(resumed)}")
+    
+    def load_journal(self) -> List[str]:
+        """按顺序回放结果日志，比缓存中更新的条目覆盖缓存；最后一行写了一半时忽略该行"""
+        resumed = []
+        try:
+            with open(self.journal_path, 'r', encoding='utf-8') as f:
+                lines = f.readlines()
+        except FileNotFoundError:
+            return resumed
+        except OSError as e:
+            print(f"⚠️ 读取结果日志失败，忽略日志: {e}")
+            return resumed
+        
+        for line in lines:
+            try:
+                record = json.loads(line)
+                name = record['channel']
+                entry = {key: record[key] for key in ('channels', 'fetched_at', 'expires_at')}
+            except (ValueError, KeyError, TypeError):
+                continue
+            current = self.entries.get(name)
+            if current is None or entry['fetched_at'] >= current.get('fetched_at', 0):
+                self.entries[name] = entry
+                if name not in resumed:
+                    resumed.append(name)
+        return resumed
+    
+    def save(self):
+        """原子写入缓存文件，之后结果日志中的内容都已包含在缓存中，删除日志"""
+        with self.lock:
+            data = {
+                'channels': self.entries,
+                'soonest_expiry': self.soonest_expiry(),
+                'next_refresh_at': self.next_refresh_at()
+            }
+            atomic_write_text(self.path, json.dumps(data, ensure_ascii=False, indent=2, sort_keys=True))
+            try:
+                os.remove(self.journal_path)
+            except FileNotFoundError:
+                pass
+    
+    def get_fresh(self, channel_name: str, margin: int = CACHE_SAFETY_MARGIN,
+                  now: Optional[float] = None) -> Optional[List[Dict]]:
+        """返回在安全余量之后仍然有效的缓存条目，否则返回None"""
+        entry = self.entries.get(channel_name)
+        if not entry:
+            return None
+        now = time.time() if now is None else now
+        if entry.get('expires_at', 0) - margin <= now:
+            return None
+        return entry['channels']
+    
+    def put(self, channel_name: str, channels: List[Dict], now: Optional[float] = None):
+        """写入频道的最新地址，过期时间取所有条目中最早的Policy过期时间"""
+        now = int(time.time() if now is None else now)
+        expiries = [decode_policy_expiry(ch['url']) for ch in channels]
+        signed_expiries = [expiry for expiry in expiries if expiry]
+        expires_at = min(signed_expiries) if signed_expiries else now + UNSIGNED_URL_TTL
+        self.entries[channel_name] = {
+            'channels': channels,
+            'fetched_at': now,
+            'expires_at': expires_at
+        }
+    
+    def record(self, channel_name: str, channels: List[Dict], now: Optional[float] = None):
+        """写入缓存并立即追加到结果日志（fsync），进程中途退出也不会丢失已完成的频道"""
+        with self.lock:
+            self.put(channel_name, channels, now)
+            entry = self.entries[channel_name]
+            line = json.dumps({'channel': channel_name, **entry}, ensure_ascii=False)
+            try:
+                with open(self.journal_path, 'a', encoding='utf-8') as f:
+                    f.write(line + '\n')
+                    f.flush()
+                    os.fsync(f.fileno())
+            except OSError as e:
+                print(f"⚠️ 写入结果日志失败: {e}")
+    
+    def soonest_expiry(self) -> Optional[Tuple[str, int]]:
+        """最早过期的频道及其过期时间"""
+        if not self.entries:
+            return None
+        name = min(self.entries, key=lambda n: self.entries[n]['expires_at'])
+        return name, self.entries[name]['expires_at']
+    
+    def next_refresh_at(self, margin: int = CACHE_SAFETY_MARGIN) -> Optional[int]:
+        """下一次需要重新抓取的时间（最早过期时间减去安全余量）"""
+        soonest = self.soonest_expiry()
+        return soonest[1] - margin if soonest else None
+
+class TierStats:
+    """按站点记录每种获取方式的成功次数、连续失败次数和成功耗时，用于调整尝试顺序"""
+    
+    def __init__(self, path: str = TIER_STATS_FILE):
+        self.path = path
+        self.lock = threading.Lock()
+        self.sites: Dict[str, Dict] = {}
+        self.load()
+    
+    def load(self):
+        """从磁盘读取统计，文件损坏时从头开始统计"""
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                self.sites = json.load(f).get('sites', {})
+        except FileNotFoundError:
+            self.sites = {}
+        except Exception as e:
+            print(f"⚠️ 读取获取方式统计失败，重新统计: {e}")
+            self.sites = {}
+    
+    def save(self):
+        """原子写入统计文件"""
+        with self.lock:
+            data = json.dumps({'sites': self.sites}, ensure_ascii=False, indent=2, sort_keys=True)
+        atomic_write_text(self.path, data)
+    
+    def start_run(self, sites: List[str]):
+        """一次运行开始时每个站点的运行次数加一（同一次运行中同一站点的所有频道共用一个探索周期）"""
+        with self.lock:
+            for site in dict.fromkeys(sites):
+                self.sites.setdefault(site, {'runs': 0, 'tiers': {}})['runs'] += 1
+    
+    def plan(self, site: str, names: List[str],
+             inputs: Optional[Dict[str, Tuple[str, ...]]] = None) -> Tuple[List[str], List[str]]:
+        """返回本次的尝试顺序和被延后的方式
+
+        历史上成功过的方式按平均成功耗时从快到慢排在前面，没有成功记录的保持默认顺序，
+        连续失败 TIER_SKIP_AFTER 次运行的方式延后到最后；每 TIER_EXPLORE_EVERY 次运行按默认顺序完整尝试一次。
+        inputs 为 {方式: 它读取其状态的方式}，读取状态的方式始终排在这些方式之后
+        """
+        with self.lock:
+            site_stats = self.sites.setdefault(site, {'runs': 0, 'tiers': {}})
+            if TIER_EXPLORE_EVERY > 0 and site_stats['runs'] and site_stats['runs'] % TIER_EXPLORE_EVERY == 0:
+                print(f"🔭 第 {site_stats['runs']} 次获取 {site}，按默认顺序重新探索所有方式")
+                return list(names), []
+            
+            tiers = site_stats['tiers']
+            deferred = [name for name in names
+                        if tiers.get(name, {}).get('failures_in_row', 0) >= TIER_SKIP_AFTER]
+            active = [name for name in names if name not in deferred]
+            proven = sorted((name for name in active if tiers.get(name, {}).get('successes')),
+                            key=lambda name: tiers[name]['avg_seconds'])
+            unproven = [name for name in active if name not in proven]
+            order = proven + unproven
+            for name, producers in (inputs or {}).items():
+                if name not in order:
+                    continue
+                # 只读取状态的方式单独耗时很短，按耗时排序会排到产生状态的方式前面，此时移到最后一个产生者之后
+                last_producer = max((order.index(producer) for producer in producers if producer in order), default=-1)
+                if order.index(name) < last_producer:
+                    order.remove(name)
+                    order.insert(last_producer, name)
+            return order + deferred, deferred
+    
+    def record(self, site: str, name: str, success: bool, seconds: float):
+        """记录一次尝试的结果，成功耗时使用指数移动平均"""
+        with self.lock:
+            site_stats = self.sites.setdefault(site, {'runs': 0, 'tiers': {}})
+            tier = site_stats['tiers'].setdefault(name, {
+                'attempts': 0, 'successes': 0, 'failures_in_row': 0, 'avg_seconds': None
+            })
+            tier['attempts'] += 1
+            if success:
+                tier['successes'] += 1
+                tier['failures_in_row'] = 0
+                previous = tier['avg_seconds']
+                tier['avg_seconds'] = round(seconds if previous is None else 0.7 * previous + 0.3 * seconds, 3)
+                tier['last_success'] = int(time.time())
+            elif tier.get('last_failed_run') != site_stats['runs']:
+                # 同一次运行中同一站点的多个频道失败只算一次
+                tier['failures_in_row'] += 1
+                tier['last_failed_run'] = site_stats['runs']
+
+_tier_stats: Optional[TierStats] = None
+_tier_stats_lock = threading.Lock()
+
+def get_tier_stats() -> TierStats:
+    """全局共享的获取方式统计，第一次使用时从磁盘加载"""
+    global _tier_stats
+    with _tier_stats_lock:
+        if _tier_stats is None:
+            _tier_stats = TierStats(TIER_STATS_FILE)
+        return _tier_stats
+
+_http_session: Optional[requests.Session] = None
+_http_session_lock = threading.Lock()
+
+def get_http_session() -> requests.Session:
+    """全局共享的HTTP会话（连接池 + keep-alive），所有线程复用"""
+    global _http_session
+    with _http_session_lock:
+        if _http_session is None:
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=20, pool_maxsize=HEALTH_CHECK_WORKERS + 4)
+            session.mount('http://', adapter)
+            session.mount('https://', adapter)
+            session.headers.update({
+                'User-Agent': USER_AGENT,
+                'Accept': '*/*',
+                'Connection': 'keep-alive'
+            })
+            _http_session = session
+        return _http_session
+
+class StreamCandidate(NamedTuple):
+    """页面或响应中找到的一个m3u8候选地址"""
+    url: str
+    source: str  # 匹配来源: 'url' 或 'json:<字段名>'
+    has_signature: bool
+    host: str
+
+class PageScan(NamedTuple):
+    """一次扫描的结果：m3u8候选地址以及零散的Policy/Signature参数"""
+    candidates: List[StreamCandidate]
+    policies: List[str]
+    signatures: List[str]
+    
+    def signed_kbs_urls(self) -> List[str]:
+        """带签名的KBS直播地址（按出现顺序）"""
+        return [c.url for c in self.candidates if c.has_signature and KBS_SIGNED_DOMAIN in c.host]
+    
+    def signing_params(self) -> Tuple[List[str], List[str]]:
+        """所有Policy和Signature参数值，包括完整签名地址中携带的"""
+        policies, signatures = list(self.policies), list(self.signatures)
+        for candidate in self.candidates:
+            if candidate.has_signature:
+                for name, value in _SIGNING_PARAM_PATTERN.findall(candidate.url):
+                    (policies if name == 'Policy' else signatures).append(value)
+        return policies, signatures
+
+# 合并后的候选扫描器：只用三个固定字面量作为锚点扫描整页一遍，命中后再在局部向两侧扩展，
+# 不再有从每个位置开始的 [^\s"']* 回溯
+_ANCHOR_PATTERN = re.compile(r'\.m3u8|Policy=|Signature=')
+_URL_TAIL_PATTERN = re.compile(r'[^\s"\'<>\\]*')
+_URL_DELIMITER_PATTERN = re.compile(r'[\s"\'<>\\]')
+_PARAM_VALUE_PATTERN = re.compile(r'[A-Za-z0-9_\-~]+')
+_JSON_KEY_PATTERN = re.compile(r'"(url|src|streamUrl|source)"\s*:\s*"$')
+_SIGNING_PARAM_PATTERN = re.compile(r'(Policy|Signature)=([A-Za-z0-9_\-~]+)')
+_LOOKBEHIND = 4096  # 向前寻找URL起点的最大距离
+
+def _url_start(text: str, pos: int) -> Tuple[int, str]:
+    """从锚点向前找到URL起点，返回 (起点, 来源)；找不到时起点为-1"""
+    window_start = max(0, pos - _LOOKBEHIND)
+    window = text[window_start:pos]
+    
+    # 绝对地址: 最近的 http 之后到锚点之间不能有分隔符
+    http = window.rfind('http')
+    if http != -1 and not _URL_DELIMITER_PATTERN.search(window, http):
+        start = window_start + http
+        key = _JSON_KEY_PATTERN.search(text, max(0, start - 64), start)
+        return start, f"json:{key.group(1)}" if key else 'url'
+    
+    # 相对地址只接受JSON字段值，起点为最近的引号之后
+    quote = window.rfind('"')
+    if quote == -1 or _URL_DELIMITER_PATTERN.search(window, quote + 1):
+        return -1, ''
+    start = window_start + quote + 1
+    key = _JSON_KEY_PATTERN.search(text, max(0, start - 64), start)
+    return (start, f"json:{key.group(1)}") if key else (-1, '')
+
+def scan_stream_candidates(text: str) -> PageScan:
+    """单次线性扫描文本，返回所有m3u8候选地址和零散的签名参数
+
+    页面正则、HTTP快速解析和最终的参数拼接都共用这一个扫描器
+    """
+    # JSON中的 '/' 可能被转义为 '\/'
+    text = text.replace('\\/', '/')
+    candidates: List[StreamCandidate] = []
+    policies: List[str] = []
+    signatures: List[str] = []
+    seen = set()
+    consumed_until = 0  # 已经作为完整URL处理过的位置，其中的锚点不再重复处理
+    
+    for match in _ANCHOR_PATTERN.finditer(text):
+        pos = match.start()
+        if pos < consumed_until:
+            continue
+        anchor = match.group()
+        
+        if anchor != '.m3u8':
+            value = _PARAM_VALUE_PATTERN.match(text, match.end())
+            if value:
+                (policies if anchor == 'Policy=' else signatures).append(value.group())
+            continue
+        
+        start, source = _url_start(text, pos)
+        if start == -1:
+            continue
+        end = _URL_TAIL_PATTERN.match(text, pos).end()
+        consumed_until = end
+        
+        # HTML属性中的 '&' 可能被转义为 '&amp;'
+        url = text[start:end].replace('&amp;', '&')
+        if url in seen:
+            continue
+        seen.add(url)
+        candidates.append(StreamCandidate(
+            url=url,
+            source=source,
+            has_signature='Policy=' in url and 'Signature=' in url,
+            host=urlparse(url).netloc
+        ))
+    
+    return PageScan(candidates, policies, signatures)
+
+def find_signed_kbs_urls(text: str) -> List[str]:
+    """从HTTP响应文本中找出所有带签名的KBS直播地址"""
+    return scan_stream_candidates(text).signed_kbs_urls()
+
+def get_kbs_channel_code(channel) -> Optional[str]:
+    """从频道页面地址中取出ch_code参数"""
+    codes = parse_qs(urlparse(channel['url']).query).get('ch_code')
+    return codes[0] if codes else None
+
+def resolve_kbs_live_api(session: requests.Session, channel) -> Optional[str]:
+    """快速解析: 请求KBS播放器使用的直播接口，直接从JSON中取出签名地址"""
+    ch_code = get_kbs_channel_code(channel)
+    if not ch_code:
+        return None
+    
+    api_url = f"{KBS_API_BASE}/api/v1/landing/live/channel_code/{ch_code}"
+    response = session.get(api_url, headers={'Referer': channel['url']}, timeout=HTTP_TIMEOUT)
+    TRACER.add('bytes_fetched', len(response.content))
+    if response.status_code != 200:
+        print(f"  ⚠️ KBS直播接口返回状态码 {response.status_code}")
+        return None
+    
+    # 优先使用结构化字段，失败时退回到全文搜索
+    try:
+        for item in response.json().get('channel_item', []):
+            service_url = item.get('service_url')
+            if is_signed_kbs_url(service_url):
+                return service_url
+    except ValueError:
+        pass
+    
+    urls = find_signed_kbs_urls(response.text)
+    return urls[0] if urls else None
+
+def resolve_kbs_page_html(session: requests.Session, channel) -> Optional[str]:
+    """快速解析: 直接请求频道页面HTML，搜索其中内嵌的签名地址"""
+    response = session.get(channel['url'], timeout=HTTP_TIMEOUT)
+    TRACER.add('bytes_fetched', len(response.content))
+    if response.status_code != 200:
+        return None
+    urls = find_signed_kbs_urls(response.text)
+    return urls[0] if urls else None
+
+# 快速解析层：按顺序尝试，任何一个成功即不再启动浏览器
+# 每个解析器签名为 (session, channel) -> Optional[str]，可以按需追加
+FAST_RESOLVERS: List[Callable[[requests.Session, Dict], Optional[str]]] = [
+    resolve_kbs_live_api,
+    resolve_kbs_page_html,
+]
+
+def resolve_channel_fast(channel, resolvers=None) -> Optional[List[Dict]]:
+    """不使用浏览器，尝试通过纯HTTP请求获取频道的签名地址"""
+    if channel['name'] not in KBS_BASE_URLS:
+        return None
+    
+    session = get_http_session()
+    with TRACER.span('fast', channel=channel['name'], tier='fast', entries=0):
+        for resolver in (FAST_RESOLVERS if resolvers is None else resolvers):
+            try:
+                with TRACER.span(resolver.__name__):
+                    url = resolver(session, channel)
+            except Exception as e:
+                print(f"  ⚠️ {resolver.__name__} 出错: {e}")
+                continue
+            if url:
+                print(f"⚡ {channel['name']} - 快速解析成功（{resolver.__name__}）")
+                TRACER.annotate(method=resolver.__name__, entries=1)
+                return [{
+                    'name': channel['name'],
+                    'tvg_id': channel['tvg_id'],
+                    'url': url
+                }]
+    return None
+
+_chromedriver_path = None
+_chromedriver_lock = threading.Lock()
+
+def installed_chrome_major() -> Optional[str]:
+    """本机Chrome的主版本号（只运行本地命令，不联网），找不到时返回None"""
+    for binary in ('google-chrome', 'google-chrome-stable', 'chromium', 'chromium-browser'):
+        path = shutil.which(binary)
+        if not path:
+            continue
+        try:
+            output = subprocess.run([path, '--version'], capture_output=True, text=True, timeout=10).stdout
+        except (OSError, subprocess.SubprocessError):
+            continue
+        match = re.search(r'(\d+)\.\d+', output)
+        if match:
+            return match.group(1)
+    return None
+
+def resolve_chromedriver() -> str:
+    """返回chromedriver路径：第一次下载后复制到缓存目录并记录对应的Chrome版本，之后完全离线
+
+    本机Chrome主版本变化时才重新下载；设置了 CHROMEDRIVER_PATH 时直接使用
+    """
+    global _chromedriver_path
+    if CHROMEDRIVER_PATH:
+        return CHROMEDRIVER_PATH
+    with _chromedriver_lock:
+        if _chromedriver_path:
+            return _chromedriver_path
+        
+        pin_file = os.path.join(CHROME_CACHE_DIR, 'chromedriver.json')
+        chrome_major = installed_chrome_major()
+        try:
+            with open(pin_file, 'r', encoding='utf-8') as f:
+                pin = json.load(f)
+        except (OSError, ValueError):
+            pin = {}
+        if pin.get('path') and os.path.exists(pin['path']) \
+                and (chrome_major is None or pin.get('chrome_major') == chrome_major):
+            _chromedriver_path = pin['path']
+            return _chromedriver_path
+        
+        from webdriver_manager.chrome import ChromeDriverManager
+        print(f"⬇️ 下载chromedriver（Chrome {chrome_major or '未知版本'}），之后的运行直接使用缓存...")
+        downloaded = ChromeDriverManager().install()
+        target_dir = os.path.join(CHROME_CACHE_DIR, 'drivers', chrome_major or 'unknown')
+        os.makedirs(target_dir, exist_ok=True)
+        target = os.path.join(target_dir, os.path.basename(downloaded))
+        shutil.copy2(downloaded, target)
+        atomic_write_text(pin_file, json.dumps({
+            'path': target,
+            'chrome_major': chrome_major,
+            'pinned_at': int(time.time())
+        }, indent=2))
+        _chromedriver_path = target
+        return target
+
+def forget_chromedriver():
+    """丢弃固定的chromedriver（启动失败时调用），下一次重新下载"""
+    global _chromedriver_path
+    with _chromedriver_lock:
+        _chromedriver_path = None
+        try:
+            os.remove(os.path.join(CHROME_CACHE_DIR, 'chromedriver.json'))
+        except FileNotFoundError:
+            pass
+
+def acquire_profile(name: Optional[str]):
+    """锁定一个持久的浏览器配置目录，返回 (目录, 锁文件)
+
+    同一目录同时只能被一个Chrome使用；被其他进程占用或关闭了持久配置时返回 (None, None)，使用临时配置
+    """
+    if not CHROME_PERSISTENT_PROFILE or not name:
+        return None, None
+    directory = os.path.join(CHROME_CACHE_DIR, 'profiles', name)
+    os.makedirs(directory, exist_ok=True)
+    lock_file = open(f"{directory}.lock", 'w')
+    try:
+        import fcntl
+        fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except ImportError:
+        pass  # 非POSIX系统不加锁
+    except OSError:
+        lock_file.close()
+        print(f"⚠️ 浏览器配置 {name} 正在被其他进程使用，本次使用临时配置")
+        return None, None
+    
+    # 上一次浏览器异常退出留下的单例锁会阻止启动（目录锁已经保证没有其他Chrome在使用）
+    for leftover in ('SingletonLock', 'SingletonSocket', 'SingletonCookie'):
+        path = os.path.join(directory, leftover)
+        if os.path.lexists(path):
+            os.remove(path)
+    return directory, lock_file
+
+def count_webdriver_rpcs(driver):
+    """包装 driver.execute：每个WebDriver命令（一次往返）累加 webdriver_rpcs 和 webdriver_rpc_seconds 计数器
+
+    计数记在当前阶段（如某个获取方式）上，运行报告中可以看到每个阶段的往返次数和耗时；
+    包装函数只弱引用driver（类上的 execute 不绑定实例），不会形成 driver → 包装函数 → driver 的引用环
+    """
+    execute = type(driver).execute
+    driver_ref = weakref.ref(driver)
+    
+    def counted_execute(driver_command, params=None):
+        start = time.monotonic()
+        try:
+            return execute(driver_ref(), driver_command, params)
+        finally:
+            TRACER.add('webdriver_rpcs')
+            TRACER.add('webdriver_rpc_seconds', time.monotonic() - start)
+    
+    driver.execute = counted_execute
+    return driver
+
+def quit_driver(driver):
+    """关闭浏览器并释放持久配置目录的锁（quit 失败时也释放）"""
+    try:
+        driver.quit()
+    finally:
+        profile_lock = getattr(driver, 'profile_lock', None)
+        if profile_lock:
+            profile_lock.close()
+            driver.profile_lock = None
 
-def setup_driver():
-    """设置Chrome驱动"""
+def setup_driver(profile: Optional[str] = None):
+    """设置Chrome驱动
+
+    profile 为持久配置目录的名称（每个工作线程一个），播放器脚本和HTTP缓存在运行之间复用
+    """
+    from selenium import webdriver
+    from selenium.webdriver.chrome.options import Options
+    from selenium.webdriver.chrome.service import Service
+    
     chrome_options = Options()
     chrome_options.add_argument('--headless')
     chrome_options.add_argument('--no-sandbox')
     chrome_options.add_argument('--disable-dev-shm-usage')
     chrome_options.add_argument('--disable-gpu')
     chrome_options.add_argument('--window-size=1920,1080')
-    chrome_options.add_argument('--user-agent=Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36')
+    chrome_options.add_argument(f'--user-agent={USER_AGENT}')
     
     # 添加更多选项以模拟真实浏览器
     chrome_options.add_argument('--disable-blink-features=AutomationControlled')
@@ -147,385 +1011,801 @@ def setup_driver():
     
     chrome_options.set_capability('goog:loggingPrefs', {'performance': 'ALL'})
     
-    service = Service(ChromeDriverManager().install())
-    driver = webdriver.Chrome(service=service, options=chrome_options)
+    profile_dir, profile_lock = acquire_profile(profile)
+    if profile_dir:
+        chrome_options.add_argument(f'--user-data-dir={profile_dir}')
+        chrome_options.add_argument(f'--disk-cache-size={CHROME_DISK_CACHE_MB * 1024 * 1024}')
+        chrome_options.add_argument('--no-first-run')
+        chrome_options.add_argument('--no-default-browser-check')
+    
+    try:
+        with TRACER.span('driver_install'):
+            service = Service(resolve_chromedriver())
+        with TRACER.span('driver_launch'):
+            try:
+                driver = webdriver.Chrome(service=service, options=chrome_options)
+            except Exception as e:
+                if CHROMEDRIVER_PATH:
+                    raise
+                # 固定的驱动可能与升级后的Chrome不匹配，重新下载后再试一次
+                print(f"⚠️ 浏览器启动失败，重新获取chromedriver: {e}")
+                forget_chromedriver()
+                driver = webdriver.Chrome(service=Service(resolve_chromedriver()), options=chrome_options)
+    except Exception:
+        if profile_lock:
+            profile_lock.close()
+        raise
+    # 锁文件随driver一起保留，浏览器运行期间其他进程不会使用同一个配置目录
+    driver.profile_lock = profile_lock
+    count_webdriver_rpcs(driver)
     
     # 执行JavaScript来隐藏自动化特征
     driver.execute_script("Object.defineProperty(navigator, 'webdriver', {get: () => undefined})")
     
+    # 页面加载不能超过单频道期限，否则工作线程会被卡住
+    driver.set_page_load_timeout(CHANNEL_DEADLINE)
+    
     return driver
 
-def extract_m3u8_from_network_logs(driver, target_domains=None):
-    """从网络日志中提取m3u8链接"""
-    m3u8_urls = []
+def get_block_profile(page_url: str) -> Tuple[List[str], List[str]]:
+    """根据页面域名合并通用和站点专属的屏蔽规则，返回 (deny, allow)"""
+    host = urlparse(page_url).netloc
+    deny, allow = [], []
+    for site, profile in BLOCK_PROFILES.items():
+        if site == '*' or host == site or host.endswith('.' + site):
+            deny.extend(profile.get('deny', []))
+            allow.extend(profile.get('allow', []))
+    # 白名单优先：包含白名单关键字的规则不会下发给浏览器
+    deny = [pattern for pattern in deny if not any(keyword in pattern for keyword in allow)]
+    return deny, allow
+
+def enable_request_blocking(driver, page_url: str):
+    """为当前标签页开启请求屏蔽（只影响该标签页）"""
+    if not BLOCK_REQUESTS:
+        return
+    deny, _ = get_block_profile(page_url)
     try:
-        logs = driver.get_log('performance')
-        for log in logs:
-            try:
-                message = json.loads(log['message'])['message']
-                method = message.get('method')
-                
-                if method in ['Network.responseReceived', 'Network.requestWillBeSent']:
-                    request = message['params'].get('request', {})
-                    response = message['params'].get('response', {})
-                    
-                    urls = [request.get('url', ''), response.get('url', '')]
-                    for url in urls:
-                        if url and '.m3u8' in url:
-                            if target_domains:
-                                if any(domain in url for domain in target_domains):
-                                    m3u8_urls.append(url)
-                            else:
-                                m3u8_urls.append(url)
-                            
-            except Exception:
-                continue
-                
+        driver.execute_cdp_cmd('Network.enable', {})
+        driver.execute_cdp_cmd('Network.setBlockedURLs', {'urls': deny})
     except Exception as e:
-        print(f"⚠️ 读取网络日志时出错: {e}")
+        print(f"⚠️ 开启请求屏蔽失败: {e}")
+
+class RequestStats:
+    """统计单个标签页的已下载和被屏蔽请求"""
+    
+    def __init__(self):
+        self.loaded_requests = 0
+        self.loaded_bytes = 0
+        self.blocked_by_type: Dict[str, int] = {}
     
-    return list(set(m3u8_urls))
+    def record(self, message: Dict):
+        """记录一条 Network.loadingFinished / Network.loadingFailed 事件"""
+        params = message.get('params', {})
+        if message.get('method') == 'Network.loadingFinished':
+            self.loaded_requests += 1
+            self.loaded_bytes += int(params.get('encodedDataLength', 0))
+        elif message.get('method') == 'Network.loadingFailed' and params.get('blockedReason'):
+            resource_type = params.get('type', 'Other')
+            self.blocked_by_type[resource_type] = self.blocked_by_type.get(resource_type, 0) + 1
+    
+    @property
+    def blocked_requests(self) -> int:
+        return sum(self.blocked_by_type.values())
+    
+    def estimated_saved_bytes(self) -> int:
+        """按资源类型的典型大小估算节省的流量"""
+        return sum(
+            count * TYPICAL_RESOURCE_BYTES.get(resource_type, TYPICAL_RESOURCE_BYTES['Other'])
+            for resource_type, count in self.blocked_by_type.items()
+        )
+    
+    def summary(self) -> str:
+        return (f"屏蔽 {self.blocked_requests} 个请求（估计节省 {self.estimated_saved_bytes() / 1024:.0f} KB），"
+                f"实际下载 {self.loaded_requests} 个请求 / {self.loaded_bytes / 1024:.0f} KB")
 
-def deep_analyze_kbs_page(driver, channel_name):
-    """深度分析KBS页面，寻找认证参数"""
-    print(f"🔍 深度分析 {channel_name} 页面...")
+# 性能日志条目中标识来源标签页的字段（值为DevTools target id）
+_WEBVIEW_PATTERN = re.compile(r'"webview":\s*"([^"]+)"')
+
+def handle_to_target_id(handle: str) -> str:
+    """窗口句柄转换为DevTools target id（旧版chromedriver带有CDwindow-前缀）"""
+    return handle[len('CDwindow-'):] if handle.startswith('CDwindow-') else handle
+
+class BrowserSession:
+    """常驻的浏览器会话
+
+    所有频道共享同一个浏览器的缓存和Cookie，每个频道在独立的标签页中打开；
+    性能日志按来源标签页分发到各自的缓冲区，避免频道之间的地址互相污染。
+    """
     
-    try:
-        # 方法1: 直接搜索页面中的所有m3u8链接
-        page_source = driver.page_source
-        
-        # 使用多种模式搜索
-        patterns = [
-            # 完整URL模式
-            r'(https?://[^\s"\']*\.m3u8\?[^\s"\']*Policy=[^\s"\']*Signature=[^\s"\']*)',
-            r'["\'](https?://[^"\']*\.m3u8\?[^"\']*Policy=[^"\']*Signature=[^"\']*)["\']',
-            # 参数模式
-            r'Policy=([A-Za-z0-9_\-~]+)',
-            r'Signature=([A-Za-z0-9_\-~]+)',
-            # JSON数据模式
-            r'"url"\s*:\s*"([^"]*\.m3u8[^"]*)"',
-            r'"src"\s*:\s*"([^"]*\.m3u8[^"]*)"',
-            r'"streamUrl"\s*:\s*"([^"]*\.m3u8[^"]*)"',
-            r'"source"\s*:\s*"([^"]*\.m3u8[^"]*)"',
-        ]
-        
-        found_urls = []
-        
-        for pattern in patterns:
-            matches = re.findall(pattern, page_source)
-            for match in matches:
-                if isinstance(match, str) and '.m3u8' in match:
-                    if 'gscdn.kbs.co.kr' in match and 'Policy=' in match and 'Signature=' in match:
-                        found_urls.append(match)
-                        print(f"✅ 从页面找到认证URL: {match[:100]}...")
-        
-        if found_urls:
-            return found_urls[0]
-        
-        # 方法2: 执行JavaScript获取播放器配置
-        print("💻 执行JavaScript获取播放器数据...")
-        js_scripts = [
-            # 获取所有可能的视频源
-            """
-            var sources = [];
-            // 获取video元素
-            var videos = document.querySelectorAll('video');
-            videos.forEach(v => {
-                if (v.src) sources.push(v.src);
-                if (v.currentSrc) sources.push(v.currentSrc);
-            });
-            
-            // 获取source元素
-            var sourceElements = document.querySelectorAll('source');
-            sourceElements.forEach(s => {
-                if (s.src) sources.push(s.src);
-            });
-            
-            // 获取iframe内的video
-            var iframes = document.querySelectorAll('iframe');
-            iframes.forEach(iframe => {
-                try {
-                    var iframeDoc = iframe.contentDocument || iframe.contentWindow.document;
-                    var iframeVideos = iframeDoc.querySelectorAll('video');
-                    iframeVideos.forEach(v => {
-                        if (v.src) sources.push(v.src);
-                    });
-                } catch(e) {}
-            });
-            
-            return sources.filter(s => s.includes('.m3u8') && s.includes('kbs'));
-            """,
-            
-            # 搜索全局变量中的视频配置
-            """
-            var configs = [];
-            var keys = Object.keys(window);
-            for (var i = 0; i < keys.length; i++) {
-                var key = keys[i];
-                try {
-                    var value = window[key];
-                    if (typeof value === 'string' && value.includes('.m3u8') && value.includes('gscdn.kbs.co.kr')) {
-                        configs.push(value);
-                    } else if (typeof value === 'object' && value !== null) {
-                        // 递归搜索对象
-                        var searchObj = function(obj, path) {
-                            for (var prop in obj) {
-                                if (obj.hasOwnProperty(prop)) {
-                                    var val = obj[prop];
-                                    if (typeof val === 'string' && val.includes('.m3u8') && val.includes('gscdn.kbs.co.kr')) {
-                                        configs.push(val);
-                                    } else if (typeof val === 'object' && val !== null) {
-                                        searchObj(val, path + '.' + prop);
-                                    }
-                                }
-                            }
-                        };
-                        searchObj(value, key);
-                    }
-                } catch(e) {}
-            }
-            return configs;
-            """,
-            
-            # 查找包含认证参数的脚本
-            """
-            var authUrls = [];
-            var scripts = document.getElementsByTagName('script');
-            for (var i = 0; i < scripts.length; i++) {
-                var content = scripts[i].textContent;
-                if (content.includes('Policy=') && content.includes('Signature=')) {
-                    // 使用正则表达式提取URL
-                    var urlMatch = content.match(/(https?:\/\/[^\s"']*\.m3u8[^\s"']*Policy=[^\s"']*Signature=[^\s"']*)/);
-                    if (urlMatch) {
-                        authUrls.push(urlMatch[0]);
-                    }
-                }
-            }
-            return authUrls;
-            """
-        ]
-        
-        for js_script in js_scripts:
-            try:
-                result = driver.execute_script(js_script)
-                if result:
-                    if isinstance(result, list):
-                        for url in result:
-                            if isinstance(url, str) and '.m3u8' in url and 'gscdn.kbs.co.kr' in url:
-                                if 'Policy=' in url and 'Signature=' in url:
-                                    print(f"✅ 从JS找到认证URL: {url[:100]}...")
-                                    return url
-                                else:
-                                    # 如果没有认证参数，检查是否是基础URL
-                                    print(f"🔍 找到基础URL: {url[:100]}...")
-                    elif isinstance(result, str) and '.m3u8' in result and 'gscdn.kbs.co.kr' in result:
-                        print(f"✅ 从JS找到URL: {result[:100]}...")
-                        return result
-            except Exception as e:
+    def __init__(self, driver):
+        self.driver = driver
+        self.home_handle = driver.current_window_handle
+        self.active_handle = self.home_handle
+        self.buffers: Dict[str, List[Dict]] = {}
+        self.stats: Dict[str, RequestStats] = {}
+    
+    def focus(self, handle: str):
+        """切换到指定标签页（已是当前标签页时不产生额外请求）"""
+        if self.active_handle != handle:
+            self.driver.switch_to.window(handle)
+            self.active_handle = handle
+    
+    def drain_logs(self):
+        """读取浏览器的全部性能日志并按标签页分发，已关闭标签页的事件直接丢弃"""
+        for entry in self.driver.get_log('performance'):
+            raw = entry.get('message', '')
+            match = _WEBVIEW_PATTERN.search(raw)
+            if not match or match.group(1) not in self.buffers:
                 continue
-        
-        # 方法3: 检查视频播放器事件监听器
-        print("🎮 检查视频播放器事件...")
-        try:
-            # 尝试触发视频播放
-            trigger_js = """
-            // 尝试播放所有视频
-            var videos = document.querySelectorAll('video');
-            var playedUrls = [];
-            for (var i = 0; i < videos.length; i++) {
-                try {
-                    var video = videos[i];
-                    // 设置超时，避免阻塞
-                    setTimeout(function(v) {
-                        try {
-                            v.play();
-                        } catch(e) {}
-                    }, 100 * i, video);
-                } catch(e) {}
-            }
-            
-            // 查找播放按钮并点击
-            var playButtons = document.querySelectorAll('button, div, a, span');
-            for (var i = 0; i < Math.min(playButtons.length, 20); i++) {
-                var btn = playButtons[i];
-                var text = (btn.textContent || btn.innerText || '').toLowerCase();
-                if (text.includes('play') || text.includes('재생') || text.includes('시작') || 
-                    text.includes('시청') || btn.className.includes('play') || btn.id.includes('play')) {
-                    try {
-                        btn.click();
-                    } catch(e) {}
-                }
-            }
-            return 'Triggered play events';
-            """
+            target_id = match.group(1)
+            self.buffers[target_id].append(entry)
             
-            driver.execute_script(trigger_js)
-            time.sleep(5)  # 等待可能触发的网络请求
-            
-        except Exception as e:
-            print(f"⚠️ 触发播放事件时出错: {e}")
-        
-        return None
-        
-    except Exception as e:
-        print(f"❌ 深度分析页面时出错: {e}")
-        return None
-
-def wait_for_kbs_advertisement(driver):
-    """等待KBS广告结束"""
-    print("⏳ 等待KBS广告结束...")
+            # 只解析加载完成/失败事件用于流量统计
+            if '"Network.loadingF' in raw:
+                try:
+                    self.stats[target_id].record(json.loads(raw)['message'])
+                except Exception:
+                    pass
     
-    # 总等待时间（包括广告和缓冲）
-    total_wait_time = 30  # 15秒广告 + 15秒缓冲
+    def take_logs(self, handle: str) -> List[Dict]:
+        """取出并清空指定标签页的性能日志"""
+        self.drain_logs()
+        target_id = handle_to_target_id(handle)
+        entries = self.buffers.get(target_id, [])
+        self.buffers[target_id] = []
+        return entries
     
-    for i in range(total_wait_time):
-        time.sleep(1)
-        
-        # 每5秒检查一次页面状态
-        if i % 5 == 0:
-            try:
-                # 检查是否有"广告"、"AD"等字样
-                page_text = driver.page_source.lower()
-                if 'ad' in page_text or '광고' in page_text or 'advertisement' in page_text:
-                    print(f"  广告中... ({i+1}/{total_wait_time}秒)")
-                else:
-                    print(f"  页面加载中... ({i+1}/{total_wait_time}秒)")
-                    
-                # 检查视频元素是否出现
-                videos = driver.find_elements(By.TAG_NAME, 'video')
-                if videos:
-                    print(f"  🎥 发现 {len(videos)} 个视频元素")
-                    
-            except Exception as e:
-                print(f"  检查页面状态时出错: {e}")
+    def open_tab(self) -> "ChannelTab":
+        """新建一个空白标签页，返回只属于该标签页的视图"""
+        # 先把之前的日志分发出去，新标签页从干净的缓冲区开始
+        self.drain_logs()
+        self.driver.switch_to.new_window('tab')
+        handle = self.driver.current_window_handle
+        self.active_handle = handle
+        self.buffers[handle_to_target_id(handle)] = []
+        self.stats[handle_to_target_id(handle)] = RequestStats()
+        return ChannelTab(self, handle)
     
-    print("✅ 广告等待结束")
+    def close_tab(self, tab: "ChannelTab") -> RequestStats:
+        """关闭标签页并丢弃其日志缓冲区，返回该标签页的流量统计"""
+        target_id = handle_to_target_id(tab.handle)
+        try:
+            self.drain_logs()
+            self.focus(tab.handle)
+            self.driver.close()
+        finally:
+            self.buffers.pop(target_id, None)
+            self.driver.switch_to.window(self.home_handle)
+            self.active_handle = self.home_handle
+        return self.stats.pop(target_id, RequestStats())
 
-def get_kbs_m3u8_advanced(driver: webdriver.Chrome, url: str, channel_name: str) -> Optional[str]:
-    """高级方法获取KBS的m3u8链接"""
-    try:
-        print(f"🎬 正在获取 {channel_name}...")
-        
-        # 清除之前的网络日志
-        driver.get_log('performance')
-        
-        # 访问页面
-        print(f"🌐 访问 {channel_name} 页面...")
-        driver.get(url)
-        
-        # 等待页面完全加载
-        print("⏳ 等待页面完全加载...")
-        time.sleep(10)
-        
-        # 等待广告
-        wait_for_kbs_advertisement(driver)
-        
-        # 第一次深度分析
-        print("🔍 第一次深度分析...")
-        m3u8_url = deep_analyze_kbs_page(driver, channel_name)
+class ChannelTab:
+    """单个频道的标签页视图，可以直接当作driver传给各个抓取函数
+
+    get_log('performance') 只返回本标签页的事件，其余属性访问会先切换到
+    本标签页再转发给底层driver。
+    """
+    
+    def __init__(self, session: BrowserSession, handle: str):
+        self._session = session
+        self.handle = handle
+        self._hook_installed = False
+    
+    def get(self, url: str):
+        """打开页面前按站点开启请求屏蔽，并注入网络钩子（每个标签页注册一次）"""
+        self._session.focus(self.handle)
+        enable_request_blocking(self._session.driver, url)
+        if not self._hook_installed:
+            self._hook_installed = install_stream_hook(self._session.driver)
+        self._session.driver.get(url)
+    
+    def get_log(self, log_type: str):
+        if log_type == 'performance':
+            return self._session.take_logs(self.handle)
+        self._session.focus(self.handle)
+        return self._session.driver.get_log(log_type)
+    
+    def __getattr__(self, name):
+        # 私有属性（如日志读取器）属于标签页本身，不转发给底层driver
+        if name.startswith('_'):
+            raise AttributeError(name)
+        self._session.focus(self.handle)
+        return getattr(self._session.driver, name)
+
+def time_left(deadline: Optional[float]) -> float:
+    """距离截止时间的剩余秒数（没有截止时间时为无穷大）"""
+    if deadline is None:
+        return float('inf')
+    return deadline - time.monotonic()
+
+def deadline_passed(deadline: Optional[float]) -> bool:
+    """是否已经超过截止时间"""
+    return time_left(deadline) <= 0
+
+def sleep_within(seconds: float, deadline: Optional[float]):
+    """睡眠指定秒数，但不超过截止时间"""
+    remaining = time_left(deadline)
+    if remaining > 0:
+        time.sleep(min(seconds, remaining))
+
+# 通过 Page.addScriptToEvaluateOnNewDocument 在页面脚本之前执行：包装 fetch、XMLHttpRequest.open、
+# 媒体元素的 src 以及 hls.js / video.js 的加载入口，把出现的m3u8地址记录到 window.__m3u8Hook.urls；
+# 同源iframe中的地址记录到顶层页面的缓冲区，Python 一次 execute_script 读取全部地址
+STREAM_HOOK_SCRIPT = r"""
+(function () {
+    var hook;
+    try { hook = window.top.__m3u8Hook; } catch (e) {}
+    if (!hook) {
+        if (window.__m3u8Hook) return;
+        hook = window.__m3u8Hook = {urls: [], seen: {}};
+    }
+    function record(url, source) {
+        try {
+            if (url && typeof url === 'object') url = url.url || url.src || url.href;
+            if (typeof url !== 'string' || url.indexOf('.m3u8') === -1) return;
+            url = new URL(url, location.href).href;
+            if (hook.seen[url]) return;
+            hook.seen[url] = true;
+            hook.urls.push({url: url, source: source});
+            if (hook.urls.length > 200) hook.urls.shift();
+        } catch (e) {}
+    }
+    function wrap(owner, name, source) {
+        var original = owner && owner[name];
+        if (typeof original !== 'function' || original.__m3u8Hooked) return;
+        var wrapped = function (first, second) {
+            record(name === 'open' ? second : first, source);
+            return original.apply(this, arguments);
+        };
+        wrapped.__m3u8Hooked = true;
+        owner[name] = wrapped;
+    }
+    function whenDefined(name, onDefine) {
+        var value = window[name];
+        if (value) onDefine(value);
+        try {
+            Object.defineProperty(window, name, {
+                configurable: true,
+                get: function () { return value; },
+                set: function (next) { value = next; try { onDefine(next); } catch (e) {} }
+            });
+        } catch (e) {}
+    }
+    wrap(window, 'fetch', 'fetch');
+    if (window.XMLHttpRequest) wrap(XMLHttpRequest.prototype, 'open', 'xhr');
+    try {
+        var descriptor = Object.getOwnPropertyDescriptor(HTMLMediaElement.prototype, 'src');
+        Object.defineProperty(HTMLMediaElement.prototype, 'src', {
+            configurable: true,
+            get: descriptor.get,
+            set: function (value) { record(value, 'media'); return descriptor.set.call(this, value); }
+        });
+    } catch (e) {}
+    whenDefined('Hls', function (Hls) { wrap(Hls.prototype, 'loadSource', 'hls.js'); });
+    whenDefined('videojs', function (videojs) {
+        var Player = videojs.getComponent && videojs.getComponent('Player');
+        if (Player) wrap(Player.prototype, 'src', 'video.js');
+    });
+})();
+"""
+
+def install_stream_hook(driver) -> bool:
+    """为当前标签页注册网络钩子（对之后打开的每个页面生效，必须在 driver.get 之前调用）"""
+    if not STREAM_HOOK:
+        return False
+    try:
+        driver.execute_cdp_cmd('Page.addScriptToEvaluateOnNewDocument', {'source': STREAM_HOOK_SCRIPT})
+        return True
+    except Exception as e:
+        print(f"⚠️ 注入网络钩子失败: {e}")
+        return False
+
+def read_stream_hook(driver) -> Optional[List[str]]:
+    """一次读取钩子记录到的全部m3u8地址（按出现顺序），页面没有钩子（未注入或注入失败）时返回None"""
+    try:
+        records = driver.execute_script("return window.__m3u8Hook ? window.__m3u8Hook.urls : null;")
+    except Exception:
+        return None
+    if records is None:
+        return None
+    return [record['url'] for record in records if isinstance(record, dict) and record.get('url')]
+
+def wait_for_stream_hook_url(driver, predicate: Callable[[str], bool], timeout: float,
+                             deadline: Optional[float] = None,
+                             poll_interval: float = CAPTURE_POLL_INTERVAL) -> Optional[str]:
+    """轮询钩子缓冲区，一旦出现满足条件的地址立即返回；超时或页面没有钩子时返回None"""
+    stop_at = min(time.monotonic() + timeout, deadline if deadline is not None else float('inf'))
+    while True:
+        TRACER.add('hook_reads')
+        urls = read_stream_hook(driver)
+        if urls is None:
+            return None
+        url = next((url for url in urls if predicate(url)), None)
+        if url:
+            return url
+        remaining = stop_at - time.monotonic()
+        if remaining <= 0:
+            return None
+        time.sleep(min(poll_interval, remaining))
+
+class NetworkLogReader:
+    """增量消费性能日志
+
+    保存游标和已见过的m3u8地址：原始消息先用字符串预过滤，只有包含 .m3u8 的条目
+    才做JSON解析；next_match 在第一个满足条件的地址处立即返回，剩余条目留给下一次调用。
+    """
+    
+    URL_METHODS = ('Network.requestWillBeSent', 'Network.responseReceived')
+    
+    def __init__(self, driver):
+        self.driver = driver
+        self.pending: List[str] = []  # 已从浏览器取出但尚未处理的原始消息
+        self.cursor = 0
+        self.seen = set()
+        self.urls: List[str] = []  # 按出现顺序去重后的全部m3u8地址
+        self.unchecked: List[str] = []  # 已解析但还没交给调用方判断的新地址
+    
+    def fetch(self):
+        """从浏览器取出新的日志条目（只保存原始字符串）"""
+        try:
+            entries = self.driver.get_log('performance')
+        except Exception as e:
+            print(f"⚠️ 读取网络日志时出错: {e}")
+            return
+        if self.cursor and self.cursor >= len(self.pending):
+            self.pending, self.cursor = [], 0
+        self.pending.extend(entry.get('message', '') for entry in entries)
+    
+    def parse(self, raw: str) -> List[str]:
+        """解析单条原始消息中的m3u8地址（预过滤后才做JSON解析）"""
+        if '.m3u8' not in raw:
+            return []
+        try:
+            message = json.loads(raw)['message']
+        except Exception:
+            return []
+        if message.get('method') not in self.URL_METHODS:
+            return []
+        params = message.get('params', {})
+        urls = [params.get('request', {}).get('url', ''), params.get('response', {}).get('url', '')]
+        return [url for url in urls if url and '.m3u8' in url]
+    
+    def next_match(self, predicate: Optional[Callable[[str], bool]] = None) -> Optional[str]:
+        """返回下一个满足条件的新地址，没有则返回None"""
+        self.fetch()
+        while True:
+            while self.unchecked:
+                url = self.unchecked.pop(0)
+                if predicate is None or predicate(url):
+                    return url
+            if self.cursor >= len(self.pending):
+                return None
+            raw = self.pending[self.cursor]
+            self.cursor += 1
+            for url in self.parse(raw):
+                if url not in self.seen:
+                    self.seen.add(url)
+                    self.urls.append(url)
+                    self.unchecked.append(url)
+    
+    def collect(self, target_domains=None) -> List[str]:
+        """处理全部新日志，返回至今见过的所有m3u8地址（可按域名过滤）"""
+        self.next_match(lambda url: False)
+        if not target_domains:
+            return list(self.urls)
+        return [url for url in self.urls if any(domain in url for domain in target_domains)]
+    
+    def reset(self):
+        """丢弃浏览器中现有的日志和已见地址（切换频道前调用）"""
+        self.fetch()
+        self.pending, self.cursor = [], 0
+        self.seen, self.urls, self.unchecked = set(), [], []
+
+def get_network_log_reader(driver) -> NetworkLogReader:
+    """每个driver（或标签页视图）共享一个日志读取器，避免多个读取器互相抢走日志"""
+    reader = getattr(driver, '_network_log_reader', None)
+    if reader is None:
+        reader = NetworkLogReader(driver)
+        driver._network_log_reader = reader
+    return reader
+
+def extract_m3u8_from_network_logs(driver, target_domains=None):
+    """从网络日志中提取m3u8链接（包括之前轮询时已经见过的地址）"""
+    return get_network_log_reader(driver).collect(target_domains)
+
+def is_signed_kbs_url(url: Optional[str]) -> bool:
+    """是否为带CloudFront签名的KBS直播地址"""
+    return bool(url) and KBS_SIGNED_DOMAIN in url and '.m3u8' in url \
+        and 'Policy=' in url and 'Signature=' in url
+
+def wait_for_network_url(driver, predicate: Callable[[str], bool], timeout: float,
+                         deadline: Optional[float] = None,
+                         poll_interval: float = CAPTURE_POLL_INTERVAL) -> Optional[str]:
+    """轮询性能日志，一旦出现满足条件的m3u8地址立即返回
+
+    最多等待 timeout 秒（同时不超过频道截止时间），超时返回None
+    """
+    stop_at = min(time.monotonic() + timeout, deadline if deadline is not None else float('inf'))
+    reader = get_network_log_reader(driver)
+    while True:
+        url = reader.next_match(predicate)
+        if url:
+            return url
         
-        if m3u8_url and 'Policy=' in m3u8_url and 'Signature=' in m3u8_url:
-            print(f"✅ 第一次分析找到认证URL: {m3u8_url[:100]}...")
+        remaining = stop_at - time.monotonic()
+        if remaining <= 0:
+            return None
+        time.sleep(min(poll_interval, remaining))
+
+def wait_for_signed_kbs_url(driver, timeout: float, deadline: Optional[float] = None,
+                            poll_interval: float = CAPTURE_POLL_INTERVAL) -> Optional[str]:
+    """轮询性能日志，一旦出现带签名的KBS地址立即返回"""
+    return wait_for_network_url(driver, is_signed_kbs_url, timeout, deadline, poll_interval)
+
+def kbs_tier_page_scan(driver, channel_name: str, deadline: Optional[float] = None) -> Optional[str]:
+    """一次扫描页面源码中的所有m3u8候选地址"""
+    found_urls = scan_stream_candidates(driver.page_source).signed_kbs_urls()
+    if found_urls:
+        print(f"✅ 从页面找到认证URL: {found_urls[0][:100]}...")
+        return found_urls[0]
+    return None
+
+def kbs_tier_js_probe(driver, channel_name: str, deadline: Optional[float] = None) -> Optional[str]:
+    """执行JavaScript获取播放器数据：网络钩子记录的地址，以及内联脚本中的签名地址
+
+    MSE播放器的 <video>.src 只是blob地址，遍历 window 的全部属性代价又很高，
+    所以直接读取页面加载前注入的钩子（见 STREAM_HOOK_SCRIPT）记录的播放器请求
+    """
+    print("💻 执行JavaScript获取播放器数据...")
+    TRACER.add('js_probes')
+    for url in read_stream_hook(driver) or []:
+        if is_signed_kbs_url(url):
+            print(f"✅ 从网络钩子找到认证URL: {url[:100]}...")
+            return url
+        if KBS_SIGNED_DOMAIN in url:
+            print(f"🔍 找到基础URL: {url[:100]}...")
+    
+    # 查找包含认证参数的脚本
+    script_probe = """
+    var authUrls = [];
+    var scripts = document.getElementsByTagName('script');
+    for (var i = 0; i < scripts.length; i++) {
+        var content = scripts[i].textContent;
+        if (content.includes('Policy=') && content.includes('Signature=')) {
+            // 使用正则表达式提取URL
+            var urlMatch = content.match(/(https?:\\/\\/[^\\s"']*\\.m3u8[^\\s"']*Policy=[^\\s"']*Signature=[^\\s"']*)/);
+            if (urlMatch) {
+                authUrls.push(urlMatch[0]);
+            }
+        }
+    }
+    return authUrls;
+    """
+    try:
+        TRACER.add('js_probes')
+        for url in driver.execute_script(script_probe) or []:
+            if isinstance(url, str) and is_signed_kbs_url(url):
+                print(f"✅ 从JS找到认证URL: {url[:100]}...")
+                return url
+    except Exception:
+        pass
+    return None
+
+def kbs_tier_stream_hook(driver, channel_name: str, deadline: Optional[float] = None) -> Optional[str]:
+    """读取页面脚本之前注入的网络钩子：播放器一请求签名地址就能拿到，不依赖性能日志"""
+    print("🪝 等待网络钩子记录签名地址...")
+    m3u8_url = wait_for_stream_hook_url(driver, is_signed_kbs_url, 10, deadline)
+    if m3u8_url:
+        print(f"✅ 网络钩子捕获认证URL: {m3u8_url[:100]}...")
+    return m3u8_url
+
+def kbs_tier_play_trigger(driver, channel_name: str, deadline: Optional[float] = None) -> Optional[str]:
+    """检查视频播放器事件：触发播放后等待网络请求"""
+    print("🎮 检查视频播放器事件...")
+    trigger_js = """
+    // 尝试播放所有视频
+    var videos = document.querySelectorAll('video');
+    var playedUrls = [];
+    for (var i = 0; i < videos.length; i++) {
+        try {
+            var video = videos[i];
+            // 设置超时，避免阻塞
+            setTimeout(function(v) {
+                try {
+                    v.play();
+                } catch(e) {}
+            }, 100 * i, video);
+        } catch(e) {}
+    }
+    
+    // 查找播放按钮并点击
+    var playButtons = document.querySelectorAll('button, div, a, span');
+    for (var i = 0; i < Math.min(playButtons.length, 20); i++) {
+        var btn = playButtons[i];
+        var text = (btn.textContent || btn.innerText || '').toLowerCase();
+        if (text.includes('play') || text.includes('재생') || text.includes('시작') || 
+            text.includes('시청') || btn.className.includes('play') || btn.id.includes('play')) {
+            try {
+                btn.click();
+            } catch(e) {}
+        }
+    }
+    return 'Triggered play events';
+    """
+    
+    driver.execute_script(trigger_js)
+    
+    # 等待可能触发的网络请求，一出现签名地址就返回
+    m3u8_url = wait_for_signed_kbs_url(driver, 5, deadline)
+    if m3u8_url:
+        print(f"✅ 触发播放后捕获认证URL: {m3u8_url[:100]}...")
+    return m3u8_url
+
+def deep_analyze_kbs_page(driver, channel_name, deadline: Optional[float] = None):
+    """深度分析KBS页面，寻找认证参数"""
+    print(f"🔍 深度分析 {channel_name} 页面...")
+    
+    for tier in (kbs_tier_page_scan, kbs_tier_js_probe, kbs_tier_play_trigger):
+        try:
+            m3u8_url = tier(driver, channel_name, deadline)
+        except Exception as e:
+            print(f"⚠️ {tier.__name__} 出错: {e}")
+            continue
+        if m3u8_url:
             return m3u8_url
+    return None
+
+def wait_for_kbs_advertisement(driver, deadline: Optional[float] = None) -> Optional[str]:
+    """等待KBS广告结束
+
+    等待期间持续监听网络日志，签名地址一出现就提前返回该地址
+    """
+    from selenium.webdriver.common.by import By
+    
+    print("⏳ 等待KBS广告结束...")
+    
+    # 总等待时间（包括广告和缓冲）
+    total_wait_time = 30  # 15秒广告 + 15秒缓冲
+    
+    for i in range(total_wait_time):
+        if deadline_passed(deadline):
+            print("  ⏰ 已到频道处理期限，停止等待广告")
+            return None
         
-        # 如果没找到，尝试刷新页面
-        print("🔄 刷新页面重新尝试...")
-        driver.refresh()
-        time.sleep(15)
-        
-        # 等待广告
-        wait_for_kbs_advertisement(driver)
-        
-        # 第二次深度分析
-        print("🔍 第二次深度分析...")
-        m3u8_url = deep_analyze_kbs_page(driver, channel_name)
-        
-        if m3u8_url and 'Policy=' in m3u8_url and 'Signature=' in m3u8_url:
-            print(f"✅ 第二次分析找到认证URL: {m3u8_url[:100]}...")
+        m3u8_url = wait_for_signed_kbs_url(driver, 1, deadline)
+        if m3u8_url:
+            print(f"  ✅ 第 {i+1} 秒捕获到认证URL，提前结束等待")
             return m3u8_url
         
-        # 监控网络请求
-        print("📡 监控网络请求...")
-        m3u8_urls = extract_m3u8_from_network_logs(driver, ['gscdn.kbs.co.kr'])
-        
-        # 过滤出认证URL
-        auth_urls = [url for url in m3u8_urls if 'Policy=' in url and 'Signature=' in url]
+        # 每5秒检查一次页面状态
+        if i % 5 == 0:
+            try:
+                # 检查是否有"广告"、"AD"等字样
+                page_text = driver.page_source.lower()
+                if 'ad' in page_text or '광고' in page_text or 'advertisement' in page_text:
+                    print(f"  广告中... ({i+1}/{total_wait_time}秒)")
+                else:
+                    print(f"  页面加载中... ({i+1}/{total_wait_time}秒)")
+                    
+                # 检查视频元素是否出现
+                videos = driver.find_elements(By.TAG_NAME, 'video')
+                if videos:
+                    print(f"  🎥 发现 {len(videos)} 个视频元素")
+                    
+            except Exception as e:
+                print(f"  检查页面状态时出错: {e}")
+    
+    print("✅ 广告等待结束")
+    return None
+
+def kbs_tier_network_wait(driver, channel_name: str, deadline: Optional[float] = None) -> Optional[str]:
+    """等待页面完全加载（签名地址出现即返回）"""
+    print("⏳ 等待页面完全加载...")
+    return wait_for_signed_kbs_url(driver, 10, deadline)
+
+def kbs_tier_ad_wait(driver, channel_name: str, deadline: Optional[float] = None) -> Optional[str]:
+    """等待前贴片广告播放结束"""
+    return wait_for_kbs_advertisement(driver, deadline)
+
+def kbs_tier_refresh(driver, channel_name: str, deadline: Optional[float] = None) -> Optional[str]:
+    """刷新页面后重新等待签名地址（包括广告时间），再深度分析一次"""
+    if deadline_passed(deadline):
+        return None
+    print("🔄 刷新页面重新尝试...")
+    driver.refresh()
+    return (wait_for_signed_kbs_url(driver, 15, deadline)
+            or wait_for_kbs_advertisement(driver, deadline)
+            or deep_analyze_kbs_page(driver, channel_name, deadline))
+
+def kbs_tier_network_logs(driver, channel_name: str, deadline: Optional[float] = None) -> Optional[str]:
+    """从累积的网络请求中筛选认证URL"""
+    print("📡 监控网络请求...")
+    m3u8_urls = extract_m3u8_from_network_logs(driver, [KBS_SIGNED_DOMAIN])
+    auth_urls = [url for url in m3u8_urls if 'Policy=' in url and 'Signature=' in url]
+    if auth_urls:
+        print(f"✅ 从网络请求找到 {len(auth_urls)} 个认证URL")
+        return auth_urls[0]
+    return None
+
+# 在页面内一次收集并评分所有可能的播放控件，按分数从高到低返回前 arguments[0] 个，
+# 元素本身保存在 window.__playCandidates 中，点击时只需要传序号
+PLAY_CONTROL_FINDER_SCRIPT = """
+var selectors = ['button', '.btn-play', '.play-button', '[class*="play"]', '[onclick*="play"]',
+                 '[onclick*="video"]', 'a[href*="javascript"]', 'div[class*="player"]', 'div[class*="video"]',
+                 '[aria-label*="play" i]', '[aria-label*="재생"]', '[title*="재생"]'];
+var textKeywords = ['play', '재생', '시작', '보기', '시청'];
+var negativeKeywords = ['pause', 'stop', 'close', 'mute', 'share', 'volume', 'fullscreen', 'setting',
+                        '정지', '닫기', '공유', '음소거', 'login', '로그인'];
+var videos = Array.prototype.slice.call(document.querySelectorAll('video')).map(function (v) {
+    return v.getBoundingClientRect();
+});
+var seen = new Set();
+var candidates = [];
+document.querySelectorAll(selectors.join(',')).forEach(function (el) {
+    if (seen.has(el)) return;
+    seen.add(el);
+    var rect = el.getBoundingClientRect();
+    var style = window.getComputedStyle(el);
+    if (rect.width < 4 || rect.height < 4 || style.visibility === 'hidden' || style.display === 'none') return;
+
+    var text = (el.innerText || el.textContent || '').trim().toLowerCase().slice(0, 60);
+    var attrs = ((el.className && el.className.baseVal !== undefined ? el.className.baseVal : el.className) + ' ' +
+                 el.id + ' ' + (el.getAttribute('aria-label') || '') + ' ' + (el.getAttribute('title') || '') + ' ' +
+                 (el.getAttribute('onclick') || '')).toLowerCase();
+    var score = 0;
+    if (textKeywords.some(function (k) { return text.indexOf(k) !== -1; })) score += 5;
+    if (attrs.indexOf('play') !== -1 || attrs.indexOf('재생') !== -1) score += 4;
+    if (attrs.indexOf('video') !== -1 || attrs.indexOf('player') !== -1) score += 1;
+    if (el.tagName === 'BUTTON' || el.getAttribute('role') === 'button') score += 1;
+    if (negativeKeywords.some(function (k) { return attrs.indexOf(k) !== -1 || text.indexOf(k) !== -1; })) score -= 6;
+    // 覆盖在视频上的控件（大播放按钮）优先
+    var cx = rect.left + rect.width / 2, cy = rect.top + rect.height / 2;
+    if (videos.some(function (v) { return cx >= v.left && cx <= v.right && cy >= v.top && cy <= v.bottom; })) score += 2;
+    if (score > 0) candidates.push({el: el, score: score, label: text.slice(0, 20) || attrs.trim().slice(0, 40)});
+});
+candidates.sort(function (a, b) { return b.score - a.score; });
+candidates = candidates.slice(0, arguments[0]);
+window.__playCandidates = candidates.map(function (c) { return c.el; });
+return candidates.map(function (c, index) { return {index: index, score: c.score, label: c.label}; });
+"""
+
+PLAY_CONTROL_CLICK_SCRIPT = """
+var el = (window.__playCandidates || [])[arguments[0]];
+if (!el || !el.isConnected) return false;
+el.scrollIntoView({block: 'center'});
+el.click();
+return true;
+"""
+
+def find_play_controls(driver, limit: int = PLAY_CLICK_LIMIT) -> List[Dict]:
+    """一次页面内调用找出得分最高的播放控件，返回 [{'index', 'score', 'label'}]（按分数从高到低）"""
+    try:
+        candidates = driver.execute_script(PLAY_CONTROL_FINDER_SCRIPT, limit)
+    except Exception as e:
+        print(f"⚠️ 查找播放控件失败: {e}")
+        return []
+    return [c for c in candidates or [] if isinstance(c, dict) and 'index' in c]
+
+def kbs_tier_click(driver, channel_name: str, deadline: Optional[float] = None) -> Optional[str]:
+    """模拟用户点击播放：按得分依次点击候选播放控件，每次点击后监控网络请求，捕获到签名地址即停止
+
+    查找和评分在页面内一次完成，每次点击只需要一次调用（旧实现每个元素要多次往返）
+    """
+    print("🖱️ 尝试模拟用户点击播放...")
+    candidates = find_play_controls(driver)
+    if not candidates:
+        print("  没有找到可点击的播放控件")
+        return None
+    summary = ', '.join(f"{c['label'] or '无文本'}({c['score']})" for c in candidates)
+    print(f"🖱️ 候选播放控件: {summary}")
+    
+    for candidate in candidates:
+        if deadline_passed(deadline):
+            print("⏰ 已到频道处理期限，停止点击尝试")
+            break
+        try:
+            if not driver.execute_script(PLAY_CONTROL_CLICK_SCRIPT, candidate['index']):
+                continue
+        except Exception:
+            continue
+        print(f"🖱️ 点击元素: {candidate['label'] or '无文本'}")
         
-        if auth_urls:
-            print(f"✅ 从网络请求找到 {len(auth_urls)} 个认证URL")
-            selected_url = auth_urls[0]
-            print(f"🔗 选择: {selected_url[:100]}...")
-            return selected_url
+        # 点击后监控网络，最多等待 PLAY_CLICK_WAIT 秒
+        new_auth_url = wait_for_signed_kbs_url(driver, PLAY_CLICK_WAIT, deadline)
+        if new_auth_url:
+            print(f"✅ 点击后找到认证URL: {new_auth_url[:100]}...")
+            return new_auth_url
+    return None
+
+def kbs_tier_stitch(driver, channel_name: str, deadline: Optional[float] = None) -> Optional[str]:
+    """最终尝试：从页面中提取Policy和Signature，拼接到频道的基础URL上"""
+    print("🔍 最终尝试：构建认证URL...")
+    page_scan = scan_stream_candidates(driver.page_source)
+    
+    # 点击后页面中可能已经出现完整的签名地址
+    signed_urls = page_scan.signed_kbs_urls()
+    if signed_urls:
+        print(f"✅ 从页面找到认证URL: {signed_urls[0][:100]}...")
+        return signed_urls[0]
+    
+    # 尝试提取Policy和Signature（完整URL中的参数也算在内）
+    policies, signatures = page_scan.signing_params()
+    if policies and signatures and channel_name in KBS_BASE_URLS:
+        auth_url = f"{KBS_BASE_URLS[channel_name]}?Policy={policies[0]}&Key-Pair-Id=APKAICDSGT3Y7IXGJ3TA&Signature={signatures[0]}"
+        print(f"✅ 构建认证URL成功: {auth_url[:100]}...")
+        return auth_url
+    return None
+
+# KBS获取方式（层级）的默认顺序，实际顺序由 TierStats 根据历史成功率和耗时调整
+# 每个方式签名为 (driver, channel_name, deadline) -> Optional[str]，返回带签名的地址
+KBS_TIERS: List[Tuple[str, Callable]] = [
+    ('page_scan', kbs_tier_page_scan),
+    ('stream_hook', kbs_tier_stream_hook),
+    ('network_wait', kbs_tier_network_wait),
+    ('ad_wait', kbs_tier_ad_wait),
+    ('js_probe', kbs_tier_js_probe),
+    ('play_trigger', kbs_tier_play_trigger),
+    ('refresh', kbs_tier_refresh),
+    ('network_logs', kbs_tier_network_logs),
+    ('click', kbs_tier_click),
+    ('stitch', kbs_tier_stitch),
+]
+
+# 读取其他方式留下的状态（累积的网络日志、页面中的Policy/Signature）的方式，以及产生这些状态的等待和点击方式
+KBS_TIER_INPUTS: Dict[str, Tuple[str, ...]] = {
+    'network_logs': ('network_wait', 'ad_wait', 'play_trigger', 'refresh'),
+    'stitch': ('network_wait', 'ad_wait', 'play_trigger', 'refresh', 'click'),
+}
+
+def get_kbs_m3u8_advanced(driver, url: str, channel_name: str,
+                          deadline: Optional[float] = None) -> Optional[str]:
+    """高级方法获取KBS的m3u8链接
+
+    按历史上最快成功的顺序依次尝试 KBS_TIERS 中的方式，连续失败的方式延后；
+    deadline 为 time.monotonic() 时间戳，超过后等待类的方式立即返回，最终使用基础URL
+    """
+    try:
+        print(f"🎬 正在获取 {channel_name}...")
         
-        # 如果还是没找到，尝试模拟点击播放
-        print("🖱️ 尝试模拟用户点击播放...")
-        try:
-            # 查找并点击所有可能的播放元素
-            click_selectors = [
-                "button",
-                ".btn-play",
-                ".play-button",
-                "[class*='play']",
-                "[onclick*='play']",
-                "[onclick*='video']",
-                "a[href*='javascript']",
-                "div[class*='player']",
-                "div[class*='video']"
-            ]
-            
-            for selector in click_selectors:
-                try:
-                    elements = driver.find_elements(By.CSS_SELECTOR, selector)
-                    for element in elements[:5]:  # 只尝试前5个
-                        try:
-                            text = element.text.lower()
-                            element_class = element.get_attribute('class') or ''
-                            element_id = element.get_attribute('id') or ''
-                            
-                            if any(keyword in text for keyword in ['play', '재생', '시작', '보기', '시청']) or \
-                               any(keyword in element_class for keyword in ['play', 'video', 'player']) or \
-                               any(keyword in element_id for keyword in ['play', 'video', 'player']):
-                                
-                                print(f"🖱️ 点击元素: {text[:20] if text else '无文本'}")
-                                driver.execute_script("arguments[0].scrollIntoView();", element)
-                                driver.execute_script("arguments[0].click();", element)
-                                time.sleep(3)
-                                
-                                # 点击后监控网络
-                                new_urls = extract_m3u8_from_network_logs(driver, ['gscdn.kbs.co.kr'])
-                                new_auth_urls = [url for url in new_urls if 'Policy=' in url and 'Signature=' in url]
-                                
-                                if new_auth_urls:
-                                    print(f"✅ 点击后找到认证URL: {new_auth_urls[0][:100]}...")
-                                    return new_auth_urls[0]
-                        except:
-                            continue
-                except:
-                    continue
-        except Exception as e:
-            print(f"⚠️ 点击播放时出错: {e}")
+        # 清除之前的网络日志（标签页模式下只清空本标签页的缓冲区）
+        get_network_log_reader(driver).reset()
         
-        # 最终尝试：从页面中提取可能的URL并添加认证参数
-        print("🔍 最终尝试：构建认证URL...")
-        page_source = driver.page_source
+        # 访问页面
+        print(f"🌐 访问 {channel_name} 页面...")
+        with TRACER.span('page_load'):
+            driver.get(url)
         
-        # 尝试提取Policy和Signature
-        policy_match = re.search(r'Policy=([A-Za-z0-9_\-~]+)', page_source)
-        signature_match = re.search(r'Signature=([A-Za-z0-9_\-~]+)', page_source)
+        site = urlparse(url).hostname or url
+        tier_stats = get_tier_stats()
+        order, deferred = tier_stats.plan(site, [name for name, _ in KBS_TIERS], KBS_TIER_INPUTS)
+        if deferred:
+            print(f"⏭️ 连续失败的方式延后尝试: {', '.join(deferred)}")
+        print(f"🧭 尝试顺序: {' → '.join(order)}")
         
-        if policy_match and signature_match:
-            policy = policy_match.group(1)
-            signature = signature_match.group(1)
+        tiers = dict(KBS_TIERS)
+        for name in order:
+            # 期限已过时仍然执行（等待类方式会立即返回），但不计入统计
+            expired = deadline_passed(deadline)
+            start = time.monotonic()
+            try:
+                with TRACER.span(name):
+                    m3u8_url = tiers[name](driver, channel_name, deadline)
+            except Exception as e:
+                print(f"⚠️ {name} 出错: {e}")
+                m3u8_url = None
             
-            if channel_name in KBS_BASE_URLS:
-                base_url = KBS_BASE_URLS[channel_name]
-                auth_url = f"{base_url}?Policy={policy}&Key-Pair-Id=APKAICDSGT3Y7IXGJ3TA&Signature={signature}"
-                print(f"✅ 构建认证URL成功: {auth_url[:100]}...")
-                return auth_url
+            success = is_signed_kbs_url(m3u8_url)
+            if not expired:
+                tier_stats.record(site, name, success, time.monotonic() - start)
+            if success:
+                print(f"✅ 通过 {name} 获取认证URL: {m3u8_url[:100]}...")
+                TRACER.annotate(method=name)
+                return m3u8_url
         
         # 如果所有方法都失败，使用基础URL
         print(f"❌ 所有方法都失败，使用基础URL: {channel_name}")
         if channel_name in KBS_BASE_URLS:
+            TRACER.annotate(method='base_url')
             return KBS_BASE_URLS[channel_name]
         
         return None
@@ -536,18 +1816,15 @@ def get_kbs_m3u8_advanced(driver: webdriver.Chrome, url: str, channel_name: str)
         traceback.print_exc()
         return None
 
-def get_real_mbn_url_from_response(auth_url):
-    """从MBN认证链接的响应内容获取真实m3u8地址"""
+def get_real_mbn_url_from_response(auth_url, session: Optional[requests.Session] = None):
+    """从MBN认证链接的响应内容获取真实m3u8地址（默认复用全局HTTP会话）"""
     try:
         print(f"🔗 请求MBN认证链接: {auth_url}")
         
-        headers = {
-            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36',
-            'Accept': '*/*',
-            'Referer': 'https://www.mbn.co.kr/vod/onair'
-        }
-        
-        response = requests.get(auth_url, headers=headers, timeout=(5, 10))
+        session = session or get_http_session()
+        response = session.get(auth_url, headers={'Referer': 'https://www.mbn.co.kr/vod/onair'},
+                               timeout=HTTP_TIMEOUT)
+        TRACER.add('bytes_fetched', len(response.content))
         
         if response.status_code == 200:
             content = response.text.strip()
@@ -566,264 +1843,1814 @@ def get_real_mbn_url_from_response(auth_url):
         print(f"❌ 请求MBN认证链接时出错: {str(e)}")
         return None
 
-def get_mbn_m3u8_multiple_quality(driver):
-    """获取MBN的m3u8链接 - 同时获取1000k和600k版本"""
-    mbn_channels = []
+# MBN地址中的画质路径，如 /mbn-on-air/1000k/playlist.m3u8
+MBN_QUALITY_PATTERN = re.compile(r'/(\d+)k/[^/?&]*\.m3u8')
+
+def mbn_bandwidth(quality: str) -> int:
+    """画质名称（如 1000k）对应的码率（bit/s）"""
+    return int(quality.rstrip('k')) * 1000
+
+def make_mbn_entry(channel: Dict, quality: Dict, url: str) -> Dict:
+    return {
+        'name': quality['name'],
+        'tvg_id': channel['tvg_id'],
+        'url': url,
+        'quality': quality['quality']
+    }
+
+def get_mbn_fallback_channels(channel: Optional[Dict] = None):
+    """MBN备用地址（channels.json 中各画质的直接地址）"""
+    channel = channel or CHANNELS_BY_NAME['MBN']
+    return [make_mbn_entry(channel, quality, quality['url']) for quality in discover_mbn_qualities(channel)]
+
+def discover_mbn_qualities(channel: Dict, urls: List[str] = ()) -> List[Dict]:
+    """channels.json 中配置的画质加上网络请求里出现的其他画质，按码率从高到低排列"""
+    qualities = {quality['quality']: quality for quality in channel['qualities']}
+    template = channel['qualities'][0]
+    for url in urls:
+        for match in MBN_QUALITY_PATTERN.finditer(unquote(url)):
+            quality = f"{match.group(1)}k"
+            if quality not in qualities:
+                print(f"🔍 发现新的MBN画质: {quality}")
+                qualities[quality] = {
+                    'quality': quality,
+                    'name': f"MBN（{quality}）",
+                    'url': template['url'].replace(f"/{template['quality']}/", f"/{quality}/")
+                }
+    return sorted(qualities.values(), key=lambda quality: mbn_bandwidth(quality['quality']), reverse=True)
+
+def resolve_mbn_qualities(channel: Dict, qualities: List[Dict],
+                          auth_urls: List[str] = ()) -> Tuple[List[Optional[Dict]], List[str]]:
+    """通过同一个HTTP会话并发解析每个画质的认证链接
+
+    优先使用浏览器中发现的认证链接，其次使用 channels.json 中的 auth_url 模板构造；
+    返回与 qualities 对应的条目（失败为None）以及每个画质采用的方式
+    """
+    session = get_http_session()
+    
+    def resolve(quality):
+        candidates = [('discovered', url) for url in auth_urls if f"/{quality['quality']}/" in unquote(url)]
+        candidates.append(('constructed', channel['auth_url'].format(url=quality['url'])))
+        for source, auth_url in candidates:
+            with TRACER.span('auth_request', channel=channel['name'], quality=quality['quality'], source=source):
+                real_url = get_real_mbn_url_from_response(auth_url, session)
+            if real_url:
+                return make_mbn_entry(channel, quality, real_url), f"{quality['quality']}:{source}"
+        return None, f"{quality['quality']}:failed"
+    
+    with ThreadPoolExecutor(max_workers=len(qualities)) as executor:
+        results = list(executor.map(resolve, qualities))
+    return [entry for entry, _ in results], [method for _, method in results]
+
+def complete_mbn_entries(channel: Dict, qualities: List[Dict], resolved: List[Optional[Dict]]) -> List[Dict]:
+    """解析失败的画质使用直接地址作为备用，按码率从高到低返回全部画质的条目"""
+    entries = []
+    for quality, entry in zip(qualities, resolved):
+        if entry is None:
+            print(f"❌ MBN {quality['quality']} 认证链接无效，使用备用地址")
+            entry = make_mbn_entry(channel, quality, quality['url'])
+        entries.append(entry)
+    
+    resolved_count = sum(1 for entry in resolved if entry)
+    if resolved_count == len(qualities):
+        print(f"🎉 成功获取MBN全部 {len(qualities)} 个画质版本！")
+    elif resolved_count:
+        print(f"⚠️ 只成功获取 {', '.join(entry['quality'] for entry in resolved if entry)} 版本")
+    else:
+        print("❌ 未能获取任何MBN版本，使用备用地址")
+    return entries
+
+def fetch_mbn_variant_urls(url: str, session: Optional[requests.Session] = None) -> List[str]:
+    """读取已解析地址的主播放列表，返回其中所有子码流（#EXT-X-STREAM-INF）的绝对地址"""
+    session = session or get_http_session()
+    try:
+        response = session.get(url, headers={'Referer': 'https://www.mbn.co.kr/vod/onair'}, timeout=HTTP_TIMEOUT)
+        TRACER.add('bytes_fetched', len(response.content))
+    except requests.RequestException as e:
+        print(f"⚠️ 读取MBN主播放列表失败: {e}")
+        return []
+    if response.status_code != 200:
+        return []
+    lines = response.text.splitlines()
+    variants = []
+    for index, line in enumerate(lines):
+        if line.startswith('#EXT-X-STREAM-INF'):
+            variant = next((l.strip() for l in lines[index + 1:] if l.strip() and not l.startswith('#')), None)
+            if variant:
+                variants.append(urljoin(response.url, variant))
+    return variants
+
+def get_mbn_m3u8_http(channel: Optional[Dict] = None) -> Optional[List[Dict]]:
+    """不启动浏览器，直接用构造的认证链接并发解析所有画质；全部失败时返回None
+
+    和浏览器方式一样发现 channels.json 以外的画质：读取第一个解析成功的地址的主播放列表，
+    子码流中出现的新画质再并发解析一次
+    """
+    channel = channel or CHANNELS_BY_NAME['MBN']
+    qualities = discover_mbn_qualities(channel)
+    print(f"⚡ MBN - 并发解析 {len(qualities)} 个画质的认证链接...")
+    resolved, methods = resolve_mbn_qualities(channel, qualities)
+    if not any(resolved):
+        return None
+    
+    first = next(entry for entry in resolved if entry)
+    with TRACER.span('variant_discovery', channel=channel['name']):
+        discovered = discover_mbn_qualities(channel, fetch_mbn_variant_urls(first['url']))
+    known = {quality['quality'] for quality in qualities}
+    extra = [quality for quality in discovered if quality['quality'] not in known]
+    if extra:
+        extra_resolved, extra_methods = resolve_mbn_qualities(channel, extra)
+        by_quality = dict(zip([quality['quality'] for quality in qualities + extra], resolved + extra_resolved))
+        qualities, methods = discovered, methods + extra_methods
+        resolved = [by_quality[quality['quality']] for quality in qualities]
+    TRACER.annotate(method=','.join(methods), entries=len(qualities))
+    return complete_mbn_entries(channel, qualities, resolved)
+
+def get_mbn_m3u8_multiple_quality(driver, deadline: Optional[float] = None, channel: Optional[Dict] = None):
+    """获取MBN的m3u8链接 - 从播放器请求中发现所有画质，再并发解析认证链接"""
+    channel = channel or CHANNELS_BY_NAME['MBN']
     
     try:
         print("🚀 正在获取 MBN 多画质版本...")
-        driver.get("https://www.mbn.co.kr/vod/onair")
-        time.sleep(15)
+        get_network_log_reader(driver).reset()
+        with TRACER.span('page_load'):
+            driver.get(channel['url'])
         
-        m3u8_urls = []
-        target_domains = ['mbn.co.kr', 'hls-live.mbn.co.kr']
+        # 播放器请求认证链接或直播地址后立即继续，最多等待15秒
+        with TRACER.span('wait_page'):
+            wait_for_network_url(driver, lambda url: 'mbnStreamAuth' in url or 'hls-live.mbn.co.kr' in url,
+                                 15, deadline)
         
         # 网络请求监控
-        network_urls = extract_m3u8_from_network_logs(driver, target_domains)
-        m3u8_urls.extend(network_urls)
-        
-        # 查找认证代理链接
+        m3u8_urls = extract_m3u8_from_network_logs(driver, ['mbn.co.kr', 'hls-live.mbn.co.kr'])
         auth_urls = [url for url in m3u8_urls if 'mbnStreamAuth' in url]
+        print(f"🔍 找到 {len(auth_urls)} 个MBN认证链接")
         
-        # 分别处理1000k和600k版本
-        quality_configs = [
-            {
-                'quality': '1000k',
-                'name': 'MBN（高画质）',
-                'tvg_id': 'MBN.kr',
-                'auth_urls': [url for url in auth_urls if '1000k' in url],
-                'base_url': 'https://hls-live.mbn.co.kr/mbn-on-air/1000k/playlist.m3u8',
-                'backup_url': 'https://hls-live.mbn.co.kr/mbn-on-air/1000k/playlist.m3u8'
-            },
-            {
-                'quality': '600k',
-                'name': 'MBN（标清）',
-                'tvg_id': 'MBN.kr',
-                'auth_urls': [url for url in auth_urls if '600k' in url],
-                'base_url': 'https://hls-live.mbn.co.kr/mbn-on-air/600k/playlist.m3u8',
-                'backup_url': 'https://hls-live.mbn.co.kr/mbn-on-air/600k/playlist.m3u8'
-            }
-        ]
-        
-        for config in quality_configs:
-            print(f"\n🎯 正在获取 {config['quality']} 版本...")
-            
-            real_url = None
-            
-            # 首先尝试自动发现的认证链接
-            if config['auth_urls']:
-                print(f"🔍 找到 {config['quality']} 认证链接: {config['auth_urls'][0]}")
-                real_url = get_real_mbn_url_from_response(config['auth_urls'][0])
-                if real_url:
-                    print(f"✅ 成功获取 {config['quality']} 版本")
-                else:
-                    print(f"❌ 自动发现的 {config['quality']} 认证链接无效")
-            
-            # 如果自动发现的链接失败，尝试构造认证链接
-            if not real_url:
-                print(f"🔄 尝试构造 {config['quality']} 认证链接...")
-                constructed_auth_url = f"https://www.mbn.co.kr/player/mbnStreamAuth_new_live.mbn?vod_url={config['base_url']}"
-                
-                real_url = get_real_mbn_url_from_response(constructed_auth_url)
-                if real_url:
-                    print(f"✅ 通过构造链接获取 {config['quality']} 版本")
-                else:
-                    print(f"❌ 构造链接也失败，使用备用地址")
-                    real_url = config['backup_url']
-            
-            # 添加到频道列表
-            if real_url:
-                mbn_channels.append({
-                    'name': config['name'],
-                    'tvg_id': config['tvg_id'],
-                    'url': real_url,
-                    'quality': config['quality']
-                })
-        
-        # 如果两个版本都获取成功
-        if len(mbn_channels) == 2:
-            print("🎉 成功获取MBN双画质版本！")
-        elif len(mbn_channels) == 1:
-            print(f"⚠️ 只成功获取 {mbn_channels[0]['quality']} 版本")
-        else:
-            print("❌ 未能获取任何MBN版本，使用备用地址")
-            mbn_channels.append({
-                'name': 'MBN（高画质）',
-                'tvg_id': 'MBN.kr',
-                'url': 'https://hls-live.mbn.co.kr/mbn-on-air/1000k/playlist.m3u8',
-                'quality': '1000k'
-            })
-            mbn_channels.append({
-                'name': 'MBN（标清）',
-                'tvg_id': 'MBN.kr',
-                'url': 'https://hls-live.mbn.co.kr/mbn-on-air/600k/playlist.m3u8',
-                'quality': '600k'
-            })
-            
-        return mbn_channels
+        qualities = discover_mbn_qualities(channel, m3u8_urls)
+        resolved, methods = resolve_mbn_qualities(channel, qualities, auth_urls)
+        TRACER.annotate(method=','.join(methods))
+        return complete_mbn_entries(channel, qualities, resolved)
             
     except Exception as e:
         print(f"❌ 获取 MBN 多画质版本时出错: {str(e)}")
         import traceback
         traceback.print_exc()
         # 返回备用地址
-        return [
-            {
-                'name': 'MBN（高画质）',
-                'tvg_id': 'MBN.kr',
-                'url': 'https://hls-live.mbn.co.kr/mbn-on-air/1000k/playlist.m3u8',
-                'quality': '1000k'
-            },
-            {
-                'name': 'MBN（标清）',
-                'tvg_id': 'MBN.kr',
-                'url': 'https://hls-live.mbn.co.kr/mbn-on-air/600k/playlist.m3u8',
-                'quality': '600k'
-            }
-        ]
+        return get_mbn_fallback_channels(channel)
 
-def update_stable_repository(content):
-    """更新GitHub固定仓库的M3U文件"""
+def git_blob_sha(content: bytes) -> str:
+    """按git的方式计算blob的SHA，与GitHub树中记录的SHA一致，用于在本地判断文件是否变化"""
+    return hashlib.sha1(b'blob %d\0' % len(content) + content).hexdigest()
+
+class GitDataPublisher:
+    """通过Git Data API（blob → tree → commit → ref）把任意数量的文件合并为一次提交推送"""
+    
+    RETRY_STATUSES = (409, 500, 502, 503, 504)
+    # 更新分支引用时的冲突说明分支头已经变化，原样重试没有意义，交给 publish 基于新的分支头重建
+    REF_CONFLICT_STATUSES = (409, 422)
+    
+    def __init__(self, owner: str, repo: str, token: str, branch: Optional[str] = None,
+                 api_base: Optional[str] = None, session: Optional[requests.Session] = None):
+        self.repo_url = f"{api_base or GITHUB_API_BASE}/repos/{owner}/{repo}"
+        self.branch = branch or STABLE_REPO_BRANCH
+        self.session = session or get_http_session()
+        self.headers = {
+            "Authorization": f"token {token}",
+            "Accept": "application/vnd.github.v3+json"
+        }
+    
+    def request(self, method: str, path: str, retry_statuses: Optional[Tuple[int, ...]] = None,
+                **kwargs) -> requests.Response:
+        """发送API请求，retry_statuses（默认为409和5xx）按指数退避重试，其他错误直接抛出"""
+        retry_statuses = self.RETRY_STATUSES if retry_statuses is None else retry_statuses
+        for attempt in range(PUBLISH_MAX_ATTEMPTS):
+            response = self.session.request(method, f"{self.repo_url}{path}", headers=self.headers,
+                                            timeout=HTTP_TIMEOUT, **kwargs)
+            if response.status_code not in retry_statuses or attempt == PUBLISH_MAX_ATTEMPTS - 1:
+                break
+            delay = PUBLISH_BACKOFF * (2 ** attempt)
+            TRACER.add('publish_retries')
+            print(f"⏳ {method} {path} 返回 {response.status_code}，{delay:.1f}秒后重试...")
+            time.sleep(delay)
+        response.raise_for_status()
+        return response
+    
+    def remote_blob_shas(self, tree_sha: str) -> Dict[str, str]:
+        """远端树中每个文件路径对应的blob SHA"""
+        tree = self.request('GET', f"/git/trees/{tree_sha}", params={'recursive': '1'}).json()
+        return {item['path']: item['sha'] for item in tree.get('tree', []) if item.get('type') == 'blob'}
+    
+    def publish(self, files: Dict[str, str], message: str) -> Optional[str]:
+        """推送文件（路径 → 文本内容），返回新提交的SHA；所有文件都没有变化时返回None"""
+        encoded = {path: content.encode('utf-8') for path, content in files.items()}
+        
+        for attempt in range(PUBLISH_MAX_ATTEMPTS):
+            head_sha = self.request('GET', f"/git/ref/heads/{self.branch}").json()['object']['sha']
+            base_tree = self.request('GET', f"/git/commits/{head_sha}").json()['tree']['sha']
+            
+            # 与远端blob SHA相同的文件不需要上传
+            remote = self.remote_blob_shas(base_tree)
+            changed = {path: data for path, data in encoded.items() if remote.get(path) != git_blob_sha(data)}
+            if not changed:
+                return None
+            
+            tree_entries = []
+            for path, data in changed.items():
+                blob = self.request('POST', '/git/blobs', json={
+                    "content": base64.b64encode(data).decode('ascii'),
+                    "encoding": "base64"
+                }).json()
+                tree_entries.append({"path": path, "mode": "100644", "type": "blob", "sha": blob['sha']})
+            
+            tree_sha = self.request('POST', '/git/trees', json={
+                "base_tree": base_tree,
+                "tree": tree_entries
+            }).json()['sha']
+            commit_sha = self.request('POST', '/git/commits', json={
+                "message": message,
+                "tree": tree_sha,
+                "parents": [head_sha],
+                "committer": {
+                    "name": "GitHub Action",
+                    "email": "action@github.com"
+                }
+            }).json()['sha']
+            
+            # 分支在此期间被其他提交推进时（非快进更新），重新基于最新的分支头构建
+            try:
+                self.request('PATCH', f"/git/refs/heads/{self.branch}", json={"sha": commit_sha, "force": False},
+                             retry_statuses=tuple(status for status in self.RETRY_STATUSES
+                                                  if status not in self.REF_CONFLICT_STATUSES))
+                return commit_sha
+            except requests.HTTPError as e:
+                if e.response is None or e.response.status_code not in self.REF_CONFLICT_STATUSES \
+                        or attempt == PUBLISH_MAX_ATTEMPTS - 1:
+                    raise
+                TRACER.add('publish_retries')
+                print("🔄 分支已被更新，基于最新提交重新推送...")
+        return None
+
+def update_stable_repository(files: Dict[str, str]):
+    """把生成的播放列表（路径 → 内容）一次性提交到GitHub固定仓库"""
     if not FULL_ACCESS_TOKEN:
         print("❌ 未找到FULL_ACCESS_TOKEN，跳过GitHub仓库更新")
         return False
-        
-    url = f"https://api.github.com/repos/{GITHUB_USERNAME}/{STABLE_REPO_NAME}/contents/korean_tv.m3u"
-    headers = {
-        "Authorization": f"token {FULL_ACCESS_TOKEN}",
-        "Accept": "application/vnd.github.v3+json"
-    }
     
+    publisher = GitDataPublisher(GITHUB_USERNAME, STABLE_REPO_NAME, FULL_ACCESS_TOKEN)
     try:
-        # 获取文件当前SHA
-        response = requests.get(url, headers=headers)
-        sha = None
-        if response.status_code == 200:
-            sha = response.json().get('sha')
-            print("📁 找到GitHub现有文件，准备更新...")
-        else:
-            print("📁 GitHub未找到现有文件，将创建新文件...")
-        
-        # Base64编码
-        content_bytes = content.encode('utf-8')
-        content_base64 = base64.b64encode(content_bytes).decode('ascii')
-        
-        # 更新或创建文件
-        data = {
-            "message": f"自动更新播放列表 - {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}",
-            "content": content_base64,
-            "committer": {
-                "name": "GitHub Action",
-                "email": "action@github.com"
-            }
-        }
-        
-        if sha:
-            data["sha"] = sha
-        
-        response = requests.put(url, headers=headers, json=data)
+        commit_sha = publisher.publish(files, f"自动更新播放列表 - {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
+        if commit_sha is None:
+            print("📁 GitHub仓库中的文件没有变化，跳过提交")
+            return True
         
-        if response.status_code in [200, 201]:
-            print("🎉 GitHub仓库更新成功!")
-            github_static_url = f"https://raw.githubusercontent.com/{GITHUB_USERNAME}/{STABLE_REPO_NAME}/main/korean_tv.m3u"
+        print(f"🎉 GitHub仓库更新成功! 提交 {commit_sha[:7]}，共 {len(files)} 个文件")
+        for path in files:
+            github_static_url = f"https://raw.githubusercontent.com/{GITHUB_USERNAME}/{STABLE_REPO_NAME}/{STABLE_REPO_BRANCH}/{path}"
             print(f"🔗 GitHub静态URL: {github_static_url}")
-            return True
-        else:
-            print(f"❌ GitHub仓库更新失败: {response.status_code} - {response.text}")
-            return False
-            
+        return True
+    
+    except requests.HTTPError as e:
+        print(f"❌ GitHub仓库更新失败: {e.response.status_code} - {e.response.text}")
+        return False
     except Exception as e:
         print(f"❌ 更新GitHub仓库时出错: {str(e)}")
         import traceback
         traceback.print_exc()
         return False
 
-def generate_playlist(dynamic_channels):
+def parse_m3u_entries(lines: List[str]) -> List[Dict]:
+    """把M3U行（如STATIC_CHANNELS）按条目分组，每个条目以地址行结束"""
+    entries = []
+    current: List[str] = []
+    for line in lines:
+        stripped = line.strip()
+        if not stripped:
+            continue
+        current.append(line)
+        if not stripped.startswith('#'):
+            entries.append(make_m3u_entry(current))
+            current = []
+    return entries
+
+def make_m3u_entry(lines: List[str]) -> Dict:
+    """从条目的行中取出名称、地址和播放器需要的请求头"""
+    entry = {'lines': lines, 'url': lines[-1].strip(), 'name': '', 'headers': {}}
+    for line in lines:
+        stripped = line.strip()
+        if stripped.startswith('#EXTINF'):
+            entry['name'] = stripped.rsplit(',', 1)[-1]
+        elif stripped.startswith('#EXTVLCOPT:http-referrer='):
+            entry['headers']['Referer'] = stripped.split('=', 1)[1]
+        elif stripped.startswith('#EXTVLCOPT:http-user-agent='):
+            entry['headers']['User-Agent'] = stripped.split('=', 1)[1]
+    return entry
+
+def render_m3u_entries(entries: List[Dict]) -> List[str]:
+    """把条目还原为M3U行，条目之间用空行分隔"""
+    lines = []
+    for index, entry in enumerate(entries):
+        if index:
+            lines.append('')
+        lines.extend(entry['lines'])
+    return lines
+
+def find_first_variant(playlist: str) -> Tuple[Optional[str], Optional[int]]:
+    """主播放列表中的第一个子码流地址及其BANDWIDTH"""
+    lines = playlist.splitlines()
+    for index, line in enumerate(lines):
+        if line.startswith('#EXT-X-STREAM-INF'):
+            bandwidth = re.search(r'BANDWIDTH=(\d+)', line)
+            variant = next((l.strip() for l in lines[index + 1:] if l.strip() and not l.startswith('#')), None)
+            return variant, int(bandwidth.group(1)) if bandwidth else None
+    return None, None
+
+def find_first_segment(playlist: str) -> Optional[str]:
+    """媒体播放列表中的第一个分片地址"""
+    return next((l.strip() for l in playlist.splitlines() if l.strip() and not l.startswith('#')), None)
+
+def run_with_deadlines(func: Callable, items: List, max_workers: int, timeout: float) -> List:
+    """在线程池中并发执行 func(item)，返回与 items 顺序一致的结果列表
+
+    每个任务从开始执行时计时（排队等待空闲线程的时间不算），开始后超过 timeout + 1 秒仍未完成的任务结果为None
+    """
+    if not items:
+        return []
+    started: Dict[int, float] = {}
+    
+    def run(index, item):
+        started[index] = time.monotonic()
+        return func(item)
+    
+    executor = ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(items))))
+    futures = [executor.submit(run, index, item) for index, item in enumerate(items)]
+    pending = set(range(len(futures)))
+    while pending:
+        now = time.monotonic()
+        pending = {index for index in pending
+                   if not futures[index].done() and not (index in started and now - started[index] > timeout + 1)}
+        if not pending:
+            break
+        # 等到最早开始的任务超时或任意任务完成；还没开始的任务不计时
+        deadlines = [started[index] + timeout + 1 for index in pending if index in started]
+        wait_for = min(deadlines) - now if deadlines else 0.05
+        wait([futures[index] for index in pending], timeout=max(0.0, wait_for) + 0.01, return_when=FIRST_COMPLETED)
+    executor.shutdown(wait=False, cancel_futures=True)
+    return [future.result() if future.done() and not future.cancelled() and future.exception() is None else None
+            for future in futures]
+
+def check_stream(url: str, headers: Optional[Dict] = None, timeout: float = HEALTH_CHECK_TIMEOUT,
+                 session: Optional[requests.Session] = None) -> Dict:
+    """检查直播源是否可以播放：获取主播放列表，跟随一个子码流，HEAD一个分片
+
+    返回 {'ok', 'status', 'latency', 'bitrate', 'error'}，latency为首个请求的耗时（秒）
+    """
+    session = session or get_http_session()
+    deadline = time.monotonic() + timeout
+    result = {'ok': False, 'status': None, 'latency': None, 'bitrate': None, 'error': ''}
+    
+    def request(method, target):
+        remaining = time_left(deadline)
+        if remaining <= 0:
+            raise requests.Timeout('超过检查时长上限')
+        return session.request(method, target, headers=headers, timeout=(min(3, remaining), remaining),
+                               allow_redirects=True)
+    
+    try:
+        start = time.monotonic()
+        response = request('GET', url)
+        result['latency'] = time.monotonic() - start
+        result['status'] = response.status_code
+        if response.status_code >= 400:
+            result['error'] = f"HTTP {response.status_code}"
+            return result
+        playlist = response.text
+        if not playlist.lstrip().startswith('#EXTM3U'):
+            result['error'] = '响应不是M3U8'
+            return result
+        base_url = response.url
+        
+        # 主播放列表：跟随第一个子码流
+        if '#EXT-X-STREAM-INF' in playlist:
+            variant, result['bitrate'] = find_first_variant(playlist)
+            if not variant:
+                result['error'] = '主播放列表中没有子码流'
+                return result
+            response = request('GET', urljoin(base_url, variant))
+            result['status'] = response.status_code
+            if response.status_code >= 400:
+                result['error'] = f"子码流 HTTP {response.status_code}"
+                return result
+            playlist = response.text
+            base_url = response.url
+        
+        # 媒体播放列表：HEAD第一个分片（部分服务器不支持HEAD时改用GET只读响应头）
+        segment = find_first_segment(playlist)
+        if not segment:
+            result['error'] = '播放列表中没有分片'
+            return result
+        segment_url = urljoin(base_url, segment)
+        response = request('HEAD', segment_url)
+        if response.status_code in (403, 405):
+            response = session.get(segment_url, headers=headers, stream=True,
+                                   timeout=max(0.1, time_left(deadline)))
+            response.close()
+        result['status'] = response.status_code
+        if response.status_code >= 400:
+            result['error'] = f"分片 HTTP {response.status_code}"
+            return result
+        
+        result['ok'] = True
+        return result
+    except Exception as e:
+        result['error'] = type(e).__name__
+        return result
+
+def check_streams(targets: List[Tuple[str, Dict]], timeout: float = HEALTH_CHECK_TIMEOUT,
+                  max_workers: Optional[int] = None) -> Dict[str, Dict]:
+    """并发检查所有地址（共享连接池），默认每个地址一个线程（检查都在等待网络），整个阶段大约只花一个超时时间
+
+    targets 为 (url, headers) 列表，返回 {url: 检查结果}；超时未完成的地址记为失败
+    """
+    session = get_http_session()
+    unique = {}
+    for url, headers in targets:
+        unique.setdefault(url, headers)
+    if not unique:
+        return {}
+    
+    checks = run_with_deadlines(lambda item: check_stream(item[0], item[1], timeout, session),
+                                list(unique.items()), max_workers or len(unique), timeout)
+    results = {}
+    for url, check in zip(unique, checks):
+        results[url] = check or {'ok': False, 'status': None, 'latency': None, 'bitrate': None, 'error': 'Timeout'}
+    return results
+
+def apply_health_check(dynamic_channels: List[Dict], static_lines: List[str],
+                       mode: str = HEALTH_CHECK_MODE) -> Tuple[List[Dict], List[str]]:
+    """检查动态和静态频道，按模式删除或后移失效的条目，返回 (动态频道, 静态频道行)"""
+    if mode == 'off':
+        return dynamic_channels, static_lines
+    
+    static_entries = parse_m3u_entries(static_lines)
+    targets = [(ch['url'], {}) for ch in dynamic_channels if ch.get('url')]
+    targets += [(entry['url'], entry['headers']) for entry in static_entries]
+    
+    print(f"🩺 并发检查 {len(targets)} 个直播源（超时 {HEALTH_CHECK_TIMEOUT:g} 秒）...")
+    start = time.monotonic()
+    results = check_streams(targets, HEALTH_CHECK_TIMEOUT)
+    
+    named_urls = [(ch['name'], ch['url']) for ch in dynamic_channels if ch.get('url')] + \
+                 [(entry['name'], entry['url']) for entry in static_entries]
+    for name, url in named_urls:
+        result = results[url]
+        latency = f"{result['latency'] * 1000:.0f}ms" if result['latency'] is not None else '-'
+        bitrate = f"{result['bitrate'] / 1000:.0f}kbps" if result['bitrate'] else '-'
+        status = '✅' if result['ok'] else f"❌ {result['error']}"
+        print(f"  {status} {name} - 状态 {result['status'] or '-'} / 延迟 {latency} / 码率 {bitrate}")
+    print(f"🩺 健康检查耗时 {time.monotonic() - start:.1f} 秒")
+    
+    def reorder(items, get_url):
+        # 没有地址的条目没有被检查，保持原位，两种模式下都不删除
+        failed = [bool(get_url(item)) and not results.get(get_url(item), {}).get('ok') for item in items]
+        kept = [item for item, is_failed in zip(items, failed) if not is_failed]
+        dead = [item for item, is_failed in zip(items, failed) if is_failed]
+        return kept if mode == 'drop' else kept + dead
+    
+    dead_count = sum(1 for _, url in named_urls if not results[url]['ok'])
+    if dead_count:
+        action = '删除' if mode == 'drop' else '移到最后'
+        print(f"⚠️ {dead_count} 个直播源检查失败，已{action}")
+    else:
+        # 全部正常时保持原样，输出与不检查时完全一致
+        return dynamic_channels, static_lines
+    
+    dynamic_channels = reorder(dynamic_channels, lambda ch: ch.get('url'))
+    static_lines = render_m3u_entries(reorder(static_entries, lambda entry: entry['url']))
+    return dynamic_channels, static_lines
+
+def build_routes(url: str) -> List[Tuple[str, str]]:
+    """为一个地址生成主线路和各代理线路 [(名称, 地址), ...]"""
+    return [('主线路', url)] + [(label, template.format(url=url)) for label, template in PROXY_ROUTES]
+
+def probe_route(url: str, proxy: Optional[str] = None, timeout: float = ROUTE_PROBE_TIMEOUT,
+                session: Optional[requests.Session] = None) -> Dict:
+    """测量线路的首字节时间和分片吞吐量（按播放器的方式跟随子码流和分片）
+
+    返回 {'ok', 'ttfb', 'throughput', 'error'}，ttfb单位秒，throughput单位字节/秒
+    """
+    session = session or get_http_session()
+    proxies = {'http': proxy, 'https': proxy} if proxy else None
+    deadline = time.monotonic() + timeout
+    result = {'ok': False, 'ttfb': None, 'throughput': None, 'error': ''}
+    
+    def get(target, **kwargs):
+        remaining = time_left(deadline)
+        if remaining <= 0:
+            raise requests.Timeout('超过测速时长上限')
+        return session.get(target, proxies=proxies, timeout=(min(3, remaining), remaining), **kwargs)
+    
+    try:
+        start = time.monotonic()
+        response = get(url, stream=True)
+        result['ttfb'] = time.monotonic() - start
+        playlist = response.text
+        if response.status_code >= 400 or not playlist.lstrip().startswith('#EXTM3U'):
+            result['error'] = f"HTTP {response.status_code}"
+            return result
+        base_url = response.url
+        
+        if '#EXT-X-STREAM-INF' in playlist:
+            variant, _ = find_first_variant(playlist)
+            if not variant:
+                result['error'] = '主播放列表中没有子码流'
+                return result
+            response = get(urljoin(base_url, variant))
+            playlist, base_url = response.text, response.url
+        
+        segment = find_first_segment(playlist)
+        if not segment:
+            result['error'] = '播放列表中没有分片'
+            return result
+        
+        # 下载分片的前 ROUTE_PROBE_BYTES 字节计算吞吐量
+        start = time.monotonic()
+        received = 0
+        with get(urljoin(base_url, segment), stream=True) as response:
+            if response.status_code >= 400:
+                result['error'] = f"分片 HTTP {response.status_code}"
+                return result
+            for chunk in response.iter_content(64 * 1024):
+                received += len(chunk)
+                TRACER.add('probe_bytes', len(chunk))
+                if received >= ROUTE_PROBE_BYTES or deadline_passed(deadline):
+                    break
+        elapsed = max(time.monotonic() - start, 1e-3)
+        result['throughput'] = received / elapsed
+        result['ok'] = received > 0
+        if not received:
+            result['error'] = '分片为空'
+        return result
+    except Exception as e:
+        result['error'] = type(e).__name__
+        return result
+
+def route_score(probes: List[Dict], timeout: float = ROUTE_PROBE_TIMEOUT) -> float:
+    """线路得分（越小越好）: 首字节时间 + 以实测吞吐量下载一个标准分片的时间，各测速出口取平均
+
+    失败的测速按两倍超时计分
+    """
+    scores = []
+    for probe in probes:
+        if probe['ok']:
+            scores.append(probe['ttfb'] + ROUTE_PROBE_BYTES / probe['throughput'])
+        else:
+            scores.append(timeout * 2)
+    return sum(scores) / len(scores)
+
+def keep_previous_order(scored: List[Tuple[float, str, str]], previous: Optional[List[str]],
+                        threshold: float = ROUTE_REORDER_THRESHOLD) -> List[Tuple[float, str, str]]:
+    """以上一次的线路顺序为基础，只有后面的线路得分好超过 threshold 秒时才和前面的交换
+
+    scored 为按得分排好的 [(得分, 名称, 线路地址), ...]，上一次没有的线路按得分排在后面
+    """
+    if not previous:
+        return scored
+    position = {label: index for index, label in enumerate(previous)}
+    ordered = sorted(scored, key=lambda item: position.get(item[1], len(position)))
+    swapped = True
+    while swapped:
+        swapped = False
+        for index in range(len(ordered) - 1):
+            if ordered[index + 1][0] + threshold < ordered[index][0]:
+                ordered[index], ordered[index + 1] = ordered[index + 1], ordered[index]
+                swapped = True
+    return ordered
+
+def previous_route_orders(path: str) -> Dict[str, List[str]]:
+    """从上一次生成的中国优化版播放列表中读取每个频道的线路顺序 {频道名称: [线路名称, ...]}"""
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            lines = f.read().splitlines()
+    except OSError:
+        return {}
+    orders: Dict[str, List[str]] = {}
+    for entry in parse_m3u_entries(lines):
+        match = re.match(r'(.+) \[(.+)\]$', entry['name'])
+        if match:
+            orders.setdefault(match.group(1), []).append(match.group(2))
+    return orders
+
+def rank_routes(urls: List[str], origins: Optional[List[Optional[str]]] = None,
+                timeout: float = ROUTE_PROBE_TIMEOUT,
+                previous: Optional[Dict[str, List[str]]] = None) -> Dict[str, List[Tuple[str, str]]]:
+    """并发测速所有地址的所有线路，按得分排序并去掉在所有测速出口都失败的线路
+
+    previous 为 {原始地址: 上一次的线路名称顺序}，得分差距不超过 ROUTE_REORDER_THRESHOLD 时保持上一次的顺序；
+    返回 {原始地址: [(名称, 线路地址), ...]}；全部线路都失败时保持默认顺序
+    """
+    origins = origins or PROBE_ORIGINS
+    previous = previous or {}
+    session = get_http_session()
+    tasks = [(url, label, route_url, origin)
+             for url in dict.fromkeys(urls)
+             for label, route_url in build_routes(url)
+             for origin in origins]
+    if not tasks:
+        return {}
+    
+    print(f"📶 并发测速 {len(tasks)} 条线路（{len(origins)} 个测速出口）...")
+    results = run_with_deadlines(lambda task: probe_route(task[2], task[3], timeout, session),
+                                 tasks, HEALTH_CHECK_WORKERS, timeout)
+    
+    probes: Dict[Tuple[str, str, str], List[Dict]] = {}
+    for (url, label, route_url, _), probe in zip(tasks, results):
+        probe = probe or {'ok': False, 'ttfb': None, 'throughput': None, 'error': 'Timeout'}
+        probes.setdefault((url, label, route_url), []).append(probe)
+    
+    rankings = {}
+    for url in dict.fromkeys(urls):
+        scored = []
+        for label, route_url in build_routes(url):
+            route_probes = probes[(url, label, route_url)]
+            scored.append((route_score(route_probes, timeout), any(p['ok'] for p in route_probes), label, route_url))
+        alive = sorted((item for item in scored if item[1]), key=lambda item: item[0])
+        ordered = keep_previous_order([(score, label, route_url) for score, _, label, route_url in alive],
+                                      previous.get(url))
+        rankings[url] = [(label, route_url) for _, label, route_url in ordered] or build_routes(url)
+    return rankings
+
+def generate_china_playlist(dynamic_channels, static_channels: Optional[List[str]] = None,
+                            rankings: Optional[Dict[str, List[Tuple[str, str]]]] = None):
+    """生成中国优化版播放列表：每个动态频道输出多条线路，按测速结果排序"""
+    rankings = rankings or {}
+    lines = ["#EXTM3U"]
+    lines.append(f"# 中国优化版 - 生成时间: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
+    lines.append("# 提供多条线路以适应不同网络环境")
+    lines.append("# 线路已按实测速度排序，如果第一条线路无法播放，请尝试后面的线路")
+    lines.append("")
+    lines.append("#EXTINF:-1,=== 韩国电视台 (中国优化版) ===")
+    lines.append("#EXTVLCOPT:network-caching=1000")
+    lines.append("#EXTVLCOPT:http-reconnect=true")
+    lines.append("")
+    
+    def add_channel(channel):
+        for label, route_url in rankings.get(channel['url']) or build_routes(channel['url']):
+            lines.append(f'#EXTINF:-1 tvg-id="{channel["tvg_id"]}",{channel["name"]} [{label}]')
+            lines.append(route_url)
+            lines.append("")
+    
+    for channel in dynamic_channels:
+        if channel.get('url') and channel['name'] not in LATER_CHANNELS:
+            add_channel(channel)
+    
+    lines.extend(STATIC_CHANNELS if static_channels is None else static_channels)
+    lines.append("")
+    
+    for channel in dynamic_channels:
+        if channel.get('url') and channel['name'] in LATER_CHANNELS:
+            add_channel(channel)
+    
+    lines.append("#EXTINF:-1,=== 播放器设置建议 ===")
+    lines.append("# 建议使用VLC、PotPlayer或IINA播放器")
+    lines.append("# 设置网络缓存为1000-3000ms以获得更流畅体验")
+    lines.append("# 如遇卡顿，请切换到其他线路")
+    return "\n".join(lines)
+
+# 每次生成都会变化、但不代表内容变化的头部注释
+VOLATILE_LINE_PREFIXES = ('# 自动生成时间:', '# 中国优化版 - 生成时间:')
+
+def playlist_model(text: str) -> List[Tuple[str, ...]]:
+    """播放列表的规范模型：按顺序排列的条目，每个条目为去掉首尾空白的行元组，忽略易变的头部注释"""
+    lines = [line for line in text.splitlines()
+             if line.strip() and line.strip() != '#EXTM3U'
+             and not line.strip().startswith(VOLATILE_LINE_PREFIXES)]
+    model = [tuple(line.strip() for line in entry['lines']) for entry in parse_m3u_entries(lines)]
+    
+    # 最后一个地址之后的注释（如播放器设置建议）也属于内容
+    trailing = []
+    for line in reversed(lines):
+        if not line.strip().startswith('#'):
+            break
+        trailing.insert(0, line.strip())
+    if trailing:
+        model.append(tuple(trailing))
+    return model
+
+def diff_playlists(old_text: Optional[str], new_text: str) -> Dict:
+    """按条目比较新旧播放列表，条目以标题（#EXTINF行）标识，重复标题按出现次序区分"""
+    def keyed(model):
+        counts: Dict[str, int] = {}
+        result = {}
+        for entry in model:
+            title = next((line for line in entry if line.startswith('#EXTINF')), entry[0])
+            counts[title] = counts.get(title, 0) + 1
+            result[(title, counts[title])] = entry
+        return result
+    
+    old_model = playlist_model(old_text) if old_text is not None else []
+    new_model = playlist_model(new_text)
+    old_entries, new_entries = keyed(old_model), keyed(new_model)
+    
+    def label(key):
+        return key[0].rsplit(',', 1)[-1]
+    
+    added = [label(key) for key in new_entries if key not in old_entries]
+    removed = [label(key) for key in old_entries if key not in new_entries]
+    updated = [label(key) for key in new_entries if key in old_entries and old_entries[key] != new_entries[key]]
+    common_old = [key for key in old_entries if key in new_entries]
+    common_new = [key for key in new_entries if key in old_entries]
+    return {
+        'changed': old_model != new_model,
+        'added': added,
+        'removed': removed,
+        'updated': updated,
+        'reordered': common_old != common_new
+    }
+
+def write_playlist_if_changed(path: str, content: str) -> Dict:
+    """只有条目真正变化时才（原子地）写入播放列表，返回变化报告"""
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            old_content = f.read()
+    except FileNotFoundError:
+        old_content = None
+    
+    report = diff_playlists(old_content, content)
+    if not report['changed']:
+        print(f"📝 {path} - 条目没有变化，保留原文件")
+        return report
+    
+    atomic_write_text(path, content)
+    parts = []
+    for key, text in (('added', '新增'), ('removed', '删除'), ('updated', '地址更新')):
+        if report[key]:
+            parts.append(f"{text} {len(report[key])} 个（{', '.join(report[key])}）")
+    if report['reordered']:
+        parts.append("顺序调整")
+    print(f"💾 {path} - 已更新: {'；'.join(parts) or '内容变化'}")
+    return report
+
+def generate_playlist(dynamic_channels, static_channels: Optional[List[str]] = None):
     """生成完整的M3U播放列表"""
     lines = ["#EXTM3U"]
     lines.append(f"# 自动生成时间: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
     lines.append("")
     
-    # 分离出要放在后面的频道
-    later_channels = ['KBS DRAMA', 'KBS JOY', 'KBS STORY', 'KBS LIFE']
-    
     # 先添加其他动态频道
     for channel in dynamic_channels:
-        if channel.get('url') and channel['name'] not in later_channels:
+        if channel.get('url') and channel['name'] not in LATER_CHANNELS:
             lines.append(f'#EXTINF:-1 tvg-id="{channel["tvg_id"]}",{channel["name"]}')
             lines.append(channel['url'])
             lines.append("")
     
     # 添加静态频道（包括JTBC）
-    lines.extend(STATIC_CHANNELS)
+    lines.extend(STATIC_CHANNELS if static_channels is None else static_channels)
     lines.append("")
     
     # 最后添加指定的KBS频道
     for channel in dynamic_channels:
-        if channel.get('url') and channel['name'] in later_channels:
+        if channel.get('url') and channel['name'] in LATER_CHANNELS:
             lines.append(f'#EXTINF:-1 tvg-id="{channel["tvg_id"]}",{channel["name"]}')
             lines.append(channel['url'])
             lines.append("")
     
     return "\n".join(lines)
 
-def main():
-    """主函数"""
-    start_time = time.time()
-    print("🎬 开始获取M3U8链接...")
-    print(f"📺 计划获取 {len(CHANNELS)} 个频道")
+class ChannelResolver:
+    """频道解析器基类，channels.json 中的 resolver 字段决定使用哪个子类
+
+    cost 为 'http' 的解析器只需要HTTP请求，失败时直接使用备用地址；
+    cost 为 'browser' 的解析器先尝试 resolve_http，失败后才交给浏览器工作池
+    """
+    
+    cost = 'browser'
+    
+    def __init__(self, channel: Dict):
+        self.channel = channel
+    
+    def entry(self, url: str) -> Dict:
+        return {
+            'name': self.channel['name'],
+            'tvg_id': self.channel['tvg_id'],
+            'url': url
+        }
+    
+    def resolve_http(self) -> Optional[List[Dict]]:
+        """不启动浏览器的解析，返回None表示需要其他方式"""
+        return None
+    
+    def resolve_browser(self, driver, deadline: Optional[float] = None) -> List[Dict]:
+        """使用浏览器（标签页）解析"""
+        return []
     
+    def fallback(self) -> List[Dict]:
+        """抓取失败或超时时使用的备用条目"""
+        return []
+
+class KbsResolver(ChannelResolver):
+    """KBS频道：先尝试HTTP快速解析，失败后在浏览器中按获取方式层级抓取签名地址"""
+    
+    def resolve_http(self) -> Optional[List[Dict]]:
+        return resolve_channel_fast(self.channel)
+    
+    def resolve_browser(self, driver, deadline: Optional[float] = None) -> List[Dict]:
+        m3u8_url = get_kbs_m3u8_advanced(driver, self.channel['url'], self.channel['name'], deadline)
+        return [self.entry(m3u8_url)] if m3u8_url else []
+    
+    def fallback(self) -> List[Dict]:
+        base_url = self.channel.get('base_url')
+        return [self.entry(base_url)] if base_url else []
+
+class MbnResolver(ChannelResolver):
+    """MBN：多画质版本，每个画质一个条目；构造的认证链接可用时不需要浏览器"""
+    
+    def resolve_http(self) -> Optional[List[Dict]]:
+        with TRACER.span('fast', channel=self.channel['name'], tier='fast', entries=0):
+            return get_mbn_m3u8_http(self.channel)
+    
+    def resolve_browser(self, driver, deadline: Optional[float] = None) -> List[Dict]:
+        return get_mbn_m3u8_multiple_quality(driver, deadline, self.channel)
+    
+    def fallback(self) -> List[Dict]:
+        return get_mbn_fallback_channels(self.channel)
+
+class JtbcResolver(ChannelResolver):
+    """JTBC：需要在韩国网络环境才能抓取，暂时跳过（播放列表中使用静态链接）"""
+    
+    cost = 'http'
+    
+    def resolve_http(self) -> Optional[List[Dict]]:
+        print(f"⚠️  {self.channel['name']} - 跳过自动抓取（需要在韩国网络环境）")
+        return []
+
+# channels.json 中 resolver 字段到解析器类的映射
+RESOLVERS: Dict[str, type] = {
+    'kbs': KbsResolver,
+    'mbn': MbnResolver,
+    'jtbc': JtbcResolver,
+}
+
+def get_resolver(channel: Dict) -> ChannelResolver:
+    """为频道创建对应的解析器"""
+    resolver_class = RESOLVERS.get(channel.get('resolver'))
+    if resolver_class is None:
+        raise ValueError(f"{channel['name']} - 未知的解析器类型: {channel.get('resolver')}")
+    return resolver_class(channel)
+
+def get_fallback_channels(channel):
+    """频道抓取失败或超时时使用的备用条目"""
+    return get_resolver(channel).fallback()
+
+def scrape_channel(driver, channel, deadline: Optional[float] = None) -> List[Dict]:
+    """使用给定的浏览器抓取单个频道，返回播放列表条目"""
+    entries = get_resolver(channel).resolve_browser(driver, deadline)
+    if entries:
+        print(f"✅ {channel['name']} - 获取成功" + (f"（{len(entries)} 个画质）" if len(entries) > 1 else ""))
+    else:
+        print(f"❌ {channel['name']} - 获取失败")
+    return entries
+
+def resolve_channels_http(channels: List[Dict]) -> Dict[str, Optional[List[Dict]]]:
+    """所有频道的纯HTTP解析放在一起并发执行（共享连接池），返回 频道名 → 条目（None表示未解析）"""
+    def resolve(channel):
+        try:
+            return get_resolver(channel).resolve_http()
+        except Exception as e:
+            print(f"⚠️ {channel['name']} - HTTP解析出错: {e}")
+            return None
+    
+    if not channels:
+        return {}
+    with ThreadPoolExecutor(max_workers=min(len(channels), 8)) as executor:
+        return dict(zip((channel['name'] for channel in channels), executor.map(resolve, channels)))
+
+def channel_worker(worker_id: int, task_queue: "queue.Queue", results: Dict[int, List[Dict]],
+                   channel_deadline: float, on_result: Optional[Callable[[Dict, List[Dict]], None]] = None):
+    """工作线程：使用独立的常驻浏览器从队列中依次抓取频道，每个频道一个标签页
+
+    on_result(channel, entries) 在每个频道完成后立即调用（用于写入结果日志）
+    """
     driver = None
     try:
-        driver = setup_driver()
-        dynamic_channels = []
-        
-        # 遍历所有频道进行抓取
-        for channel in CHANNELS:
-            print(f"\n{'='*50}")
-            print(f"🔍 正在处理频道: {channel['name']}")
+        with TRACER.span('browser_start', worker=worker_id):
+            driver = setup_driver(profile=f"worker-{worker_id}")
+        session = BrowserSession(driver)
+        print(f"🧵 工作线程 {worker_id} 浏览器已启动")
+        while True:
+            try:
+                index, channel = task_queue.get_nowait()
+            except queue.Empty:
+                break
             
-            if channel['name'] == "MBN":  # 精确匹配MBN
-                # MBN特殊处理 - 多画质版本
-                mbn_channels = get_mbn_m3u8_multiple_quality(driver)
-                dynamic_channels.extend(mbn_channels)
-                print(f"✅ {channel['name']} - 获取成功（双画质）")
-                continue  # 跳过MBN的常规处理
-            elif channel['name'] == "JTBC":  # 精确匹配JTBC
-                # JTBC暂时跳过自动抓取，因为可能需要特定网络环境
-                print(f"⚠️  {channel['name']} - 跳过自动抓取（需要在韩国网络环境）")
-                continue
+            print(f"\n{'='*50}")
+            print(f"🔍 [W{worker_id}] 正在处理频道: {channel['name']}")
+            deadline = time.monotonic() + channel_deadline
+            tab = None
+            with TRACER.span('browser', channel=channel['name'], tier='browser', worker=worker_id) as span:
+                try:
+                    tab = session.open_tab()
+                    results[index] = scrape_channel(tab, channel, deadline)
+                    if on_result:
+                        on_result(channel, results[index])
+                except Exception as e:
+                    print(f"❌ [W{worker_id}] 处理频道 {channel['name']} 时出错: {str(e)}，使用备用地址")
+                    # 和超时的频道一样使用备用地址（抓取已经成功、只是 on_result 出错时保留抓取结果）
+                    if index not in results:
+                        results[index] = get_fallback_channels(channel)
+                finally:
+                    span.attrs['entries'] = len(results.get(index, []))
+                    if tab:
+                        try:
+                            stats = session.close_tab(tab)
+                            TRACER.add('blocked_requests', stats.blocked_requests)
+                            if BLOCK_REQUESTS:
+                                print(f"🛡️ [W{worker_id}] {channel['name']}: {stats.summary()}")
+                        except Exception as e:
+                            print(f"⚠️ [W{worker_id}] 关闭标签页时出现警告: {e}")
+                    task_queue.task_done()
+    except Exception as e:
+        print(f"❌ 工作线程 {worker_id} 启动浏览器失败: {str(e)}")
+    finally:
+        if driver:
+            try:
+                quit_driver(driver)
+            except Exception as e:
+                print(f"⚠️ 工作线程 {worker_id} 关闭浏览器驱动时出现警告: {e}")
+
+def scrape_channels_parallel(channels: List[Dict], max_workers: int = MAX_WORKERS,
+                             channel_deadline: float = CHANNEL_DEADLINE,
+                             on_result: Optional[Callable[[Dict, List[Dict]], None]] = None) -> List[List[Dict]]:
+    """使用浏览器工作池并发抓取频道，按输入顺序返回每个频道的条目列表
+
+    每个工作线程拥有独立的浏览器，从共享队列中领取频道；单个频道超过期限时
+    使用备用地址，总耗时接近最慢的单个频道而不是所有频道之和。
+    """
+    workers = max(1, min(max_workers, len(channels)))
+    print(f"🧵 启动 {workers} 个浏览器工作线程（单频道期限 {channel_deadline} 秒）")
+    
+    task_queue = queue.Queue()
+    for index, channel in enumerate(channels):
+        task_queue.put((index, channel))
+    
+    results: Dict[int, List[Dict]] = {}
+    threads = []
+    for worker_id in range(1, workers + 1):
+        thread = threading.Thread(
+            target=channel_worker,
+            args=(worker_id, task_queue, results, channel_deadline, on_result),
+            name=f"channel-worker-{worker_id}",
+            daemon=True
+        )
+        thread.start()
+        threads.append(thread)
+    
+    # 整体等待上限：每个线程最多处理的频道数 × 单频道期限，再加上浏览器启动时间
+    rounds = -(-len(channels) // workers)
+    overall_deadline = time.monotonic() + rounds * channel_deadline + 120
+    for thread in threads:
+        thread.join(max(0, time_left(overall_deadline)))
+    
+    channel_results = []
+    for index, channel in enumerate(channels):
+        if index in results:
+            channel_results.append(results[index])
+        else:
+            print(f"⏰ {channel['name']} - 未在期限内完成，使用备用地址")
+            channel_results.append(get_fallback_channels(channel))
+    return channel_results
+
+def is_cacheable_result(channel, entries: List[Dict]) -> bool:
+    """只有真正抓取成功的结果才写入缓存（备用地址和未签名的KBS基础地址不缓存）"""
+    if not entries:
+        return False
+    fallback_urls = {entry['url'] for entry in get_fallback_channels(channel)}
+    return all(entry.get('url') and entry['url'] not in fallback_urls for entry in entries)
+
+def resolve_channels(channels: List[Dict], cache: SignedUrlCache,
+                     margin: int = CACHE_SAFETY_MARGIN) -> List[Dict]:
+    """优先使用缓存中仍然有效的地址，只有存在即将过期的频道时才启动浏览器
+
+    每个频道成功后立即写入结果日志，运行中断后重新运行只会解析还没有完成的频道
+    """
+    results: Dict[str, List[Dict]] = {}
+    stale_channels = []
+    
+    for channel in channels:
+        cached = cache.get_fresh(channel['name'], margin)
+        if cached is not None:
+            expires_at = cache.entries[channel['name']]['expires_at']
+            print(f"♻️ {channel['name']} - 使用缓存地址（有效至 {datetime.fromtimestamp(expires_at).strftime('%Y-%m-%d %H:%M:%S')}）")
+            with TRACER.span('cache', channel=channel['name'], tier='cache', method='cache', entries=len(cached)):
+                results[channel['name']] = cached
+        else:
+            stale_channels.append(channel)
+    
+    # 先一次性并发完成所有纯HTTP解析，只有解析器需要浏览器的频道才交给浏览器
+    http_results = resolve_channels_http(stale_channels)
+    browser_channels = []
+    for channel in stale_channels:
+        entries = http_results.get(channel['name'])
+        if entries:
+            results[channel['name']] = entries
+            if is_cacheable_result(channel, entries):
+                cache.record(channel['name'], entries)
+        elif get_resolver(channel).cost == 'http':
+            results[channel['name']] = entries if entries is not None else get_fallback_channels(channel)
+        else:
+            browser_channels.append(channel)
+    
+    if browser_channels:
+        print(f"🌐 需要浏览器抓取 {len(browser_channels)} 个频道: {', '.join(ch['name'] for ch in browser_channels)}")
+        
+        def journal_result(channel, entries):
+            if is_cacheable_result(channel, entries):
+                cache.record(channel['name'], entries)
+        
+        get_tier_stats().start_run([urlparse(channel['url']).hostname or channel['url']
+                                    for channel in browser_channels if channel.get('resolver') == 'kbs'])
+        with TRACER.span('browser_pool', channels=len(browser_channels)):
+            browser_results = scrape_channels_parallel(browser_channels, on_result=journal_result)
+        get_tier_stats().save()
+        for channel, entries in zip(browser_channels, browser_results):
+            results[channel['name']] = entries
+    else:
+        print("⚡ 所有频道均已通过缓存或HTTP获取，无需启动浏览器")
+    
+    if stale_channels:
+        cache.save()
+    
+    dynamic_channels = []
+    for channel in channels:
+        dynamic_channels.extend(results.get(channel['name'], []))
+    return dynamic_channels
+
+def load_cached_channels(channels: List[Dict], cache: SignedUrlCache) -> List[Dict]:
+    """只从缓存生成动态频道（不联网、不启动浏览器），没有缓存的频道使用备用地址"""
+    dynamic_channels = []
+    now = time.time()
+    for channel in channels:
+        entry = cache.entries.get(channel['name'])
+        if entry:
+            if entry['expires_at'] <= now:
+                print(f"⚠️ {channel['name']} - 缓存地址已过期，仍然使用")
+            dynamic_channels.extend(entry['channels'])
+        else:
+            print(f"⚠️ {channel['name']} - 没有缓存，使用备用地址")
+            dynamic_channels.extend(get_fallback_channels(channel))
+    return dynamic_channels
+
+def report_next_refresh(cache: SignedUrlCache):
+    """输出最早过期时间，供调度器决定下一次运行时间"""
+    soonest = cache.soonest_expiry()
+    if not soonest:
+        return
+    
+    name, expires_at = soonest
+    next_refresh_at = cache.next_refresh_at()
+    print(f"⏰ 最早过期频道: {name}，过期时间 {datetime.fromtimestamp(expires_at).strftime('%Y-%m-%d %H:%M:%S')}")
+    print(f"⏰ 建议下次运行时间: {datetime.fromtimestamp(next_refresh_at).strftime('%Y-%m-%d %H:%M:%S')}")
+    
+    # 在GitHub Actions中作为步骤输出，便于后续步骤调度
+    github_output = os.getenv('GITHUB_OUTPUT')
+    if github_output:
+        with open(github_output, 'a', encoding='utf-8') as f:
+            f.write(f"soonest_expiry={expires_at}\n")
+            f.write(f"next_refresh_at={next_refresh_at}\n")
+
+class RefreshScheduler:
+    """常驻刷新调度器
+
+    按缓存中的Token过期时间维护一个优先队列，只在频道即将过期时重新解析该频道，
+    然后用缓存中的全部地址重写播放列表。
+    """
+    
+    def __init__(self, channels: List[Dict], cache: SignedUrlCache, output: str,
+                 margin: int = CACHE_SAFETY_MARGIN, state_file: str = DAEMON_STATE_FILE):
+        self.channels = {channel['name']: channel for channel in channels}
+        self.order = [channel['name'] for channel in channels]
+        self.cache = cache
+        self.output = output
+        self.margin = margin
+        self.state_file = state_file
+        self.heap: List[Tuple[float, str]] = []
+        self.scheduled: Dict[str, float] = {}
+        self.history: Dict[str, Dict] = {name: {'refreshes': 0, 'failures': 0, 'last_refresh': None}
+                                         for name in self.order}
+        self.stop_event = threading.Event()
+        self.wake_event = threading.Event()
+        self.dump_requested = threading.Event()
+        
+        for name in self.order:
+            self.schedule(name, self.refresh_time(name))
+    
+    def refresh_time(self, name: str) -> float:
+        """频道的下一次刷新时间：过期时间减去安全余量（没有缓存时立即刷新）"""
+        entry = self.cache.entries.get(name)
+        return entry['expires_at'] - self.margin if entry else time.time()
+    
+    def schedule(self, name: str, at: float):
+        """（重新）安排频道的刷新时间，旧的队列项在弹出时被忽略"""
+        self.scheduled[name] = at
+        heapq.heappush(self.heap, (at, name))
+    
+    def pop_due(self, now: float) -> List[str]:
+        """取出在批处理窗口内到期的所有频道"""
+        due = []
+        while self.heap and self.heap[0][0] <= now + DAEMON_BATCH_WINDOW:
+            at, name = heapq.heappop(self.heap)
+            if self.scheduled.get(name) == at and name not in due:
+                due.append(name)
+        return due
+    
+    def next_wakeup(self) -> Optional[float]:
+        """下一个有效队列项的时间"""
+        while self.heap and self.scheduled.get(self.heap[0][1]) != self.heap[0][0]:
+            heapq.heappop(self.heap)
+        return self.heap[0][0] if self.heap else None
+    
+    def refresh(self, names: List[str]):
+        """重新解析到期的频道，成功后按新的过期时间重新排队，失败则稍后重试"""
+        print(f"\n{'='*50}")
+        print(f"🔄 [{datetime.now().strftime('%H:%M:%S')}] 刷新即将过期的频道: {', '.join(names)}")
+        before = {name: self.cache.entries.get(name) for name in names}
+        with TRACER.span('resolve'):
+            resolve_channels([self.channels[name] for name in names], self.cache,
+                             margin=self.margin + DAEMON_BATCH_WINDOW)
+        
+        now = time.time()
+        for name in names:
+            history = self.history[name]
+            history['refreshes'] += 1
+            history['last_refresh'] = int(now)
+            entry = self.cache.entries.get(name)
+            # cache.put 每次写入新的条目对象，对象没变说明这次没有拿到可缓存的新地址
+            if entry is not None and entry is not before[name] and entry['expires_at'] - self.margin > now:
+                self.schedule(name, entry['expires_at'] - self.margin)
             else:
-                # KBS频道统一处理
+                history['failures'] += 1
+                print(f"⚠️ {name} - 刷新失败，{DAEMON_RETRY_INTERVAL} 秒后重试")
+                self.schedule(name, now + DAEMON_RETRY_INTERVAL)
+        
+        self.write_playlist()
+        TRACER.flush('daemon')
+    
+    def write_playlist(self):
+        """用缓存中的全部地址重写播放列表"""
+        dynamic_channels = load_cached_channels([self.channels[name] for name in self.order], self.cache)
+        write_playlist_if_changed(self.output, generate_playlist(dynamic_channels))
+    
+    def snapshot(self) -> Dict:
+        """队列状态：每个频道的下次刷新时间、过期时间和刷新历史"""
+        queue_state = []
+        for name in sorted(self.order, key=lambda n: self.scheduled.get(n, float('inf'))):
+            entry = self.cache.entries.get(name, {})
+            queue_state.append({
+                'channel': name,
+                'refresh_at': int(self.scheduled[name]) if name in self.scheduled else None,
+                'expires_at': entry.get('expires_at'),
+                **self.history[name]
+            })
+        return {'updated_at': int(time.time()), 'next_wakeup': self.next_wakeup(), 'queue': queue_state}
+    
+    def write_state(self):
+        """把队列状态写入状态文件并打印"""
+        state = self.snapshot()
+        atomic_write_text(self.state_file, json.dumps(state, ensure_ascii=False, indent=2))
+        
+        print("📋 刷新队列:")
+        for item in state['queue']:
+            refresh_at = datetime.fromtimestamp(item['refresh_at']).strftime('%m-%d %H:%M:%S') if item['refresh_at'] else '-'
+            print(f"  ⏰ {item['channel']}: {refresh_at}（已刷新 {item['refreshes']} 次，失败 {item['failures']} 次）")
+    
+    def stop(self):
+        """请求退出循环（可以在信号处理函数中调用）"""
+        self.stop_event.set()
+        self.wake_event.set()
+    
+    def request_dump(self):
+        """请求写出队列状态（可以在信号处理函数中调用）
+
+        只设置标记并唤醒循环，由循环在两次刷新之间写出，不会和循环自己的 write_state 交错，
+        也不会在队列修改到一半时读取
+        """
+        self.dump_requested.set()
+        self.wake_event.set()
+    
+    def run_forever(self):
+        """循环等待下一个到期频道，直到收到停止信号"""
+        self.write_playlist()
+        while not self.stop_event.is_set():
+            if self.dump_requested.is_set():
+                self.dump_requested.clear()
+                self.write_state()
+            due = self.pop_due(time.time())
+            if due:
                 try:
-                    m3u8_url = get_kbs_m3u8_advanced(driver, channel['url'], channel['name'])
-                    if m3u8_url:
-                        dynamic_channels.append({
-                            'name': channel['name'],
-                            'tvg_id': channel['tvg_id'],
-                            'url': m3u8_url
-                        })
-                        print(f"✅ {channel['name']} - 获取成功")
-                    else:
-                        print(f"❌ {channel['name']} - 获取失败")
+                    self.refresh(due)
                 except Exception as e:
-                    print(f"❌ 处理频道 {channel['name']} 时出错: {str(e)}")
+                    print(f"❌ 刷新频道时出错: {e}")
+                    for name in due:
+                        self.schedule(name, time.time() + DAEMON_RETRY_INTERVAL)
+                self.write_state()
+                continue
+            
+            wakeup = self.next_wakeup()
+            delay = max(0, wakeup - DAEMON_BATCH_WINDOW - time.time()) if wakeup else DAEMON_RETRY_INTERVAL
+            print(f"😴 下一次刷新在 {delay:.0f} 秒后")
+            self.wake_event.wait(delay)
+            self.wake_event.clear()
+
+def run_daemon(output: str):
+    """常驻模式：按Token过期时间逐个刷新频道"""
+    cache = SignedUrlCache(URL_CACHE_FILE)
+    scheduler = RefreshScheduler(CHANNELS, cache, output)
+    
+    def handle_stop(signum, frame):
+        print("🛑 收到停止信号，退出常驻模式...")
+        scheduler.stop()
+    
+    signal.signal(signal.SIGTERM, handle_stop)
+    signal.signal(signal.SIGINT, handle_stop)
+    if hasattr(signal, 'SIGUSR1'):
+        # kill -USR1 <pid> 打印当前队列状态（由循环写出）
+        signal.signal(signal.SIGUSR1, lambda signum, frame: scheduler.request_dump())
+    
+    print(f"🕰️ 进入常驻模式，状态文件: {scheduler.state_file}")
+    scheduler.write_state()
+    scheduler.run_forever()
+
+class RelayCache:
+    """中转使用的LRU缓存（按字节数限制大小），同一个地址同时只向上游请求一次
+
+    正在请求的地址记录为一个 Future，其他并发请求等待它的结果而不是重复下载，
+    所以无论有多少客户端，每个分片只从上游下载一份。
+    """
+    
+    def __init__(self, max_bytes: int = RELAY_CACHE_BYTES):
+        self.max_bytes = max_bytes
+        self.lock = threading.Lock()
+        self.entries: "OrderedDict[str, Tuple[Optional[float], Dict]]" = OrderedDict()
+        self.inflight: Dict[str, Future] = {}
+        self.size = 0
+        self.stats = {'hits': 0, 'misses': 0, 'coalesced': 0, 'evictions': 0, 'upstream_bytes': 0}
+    
+    def get(self, key: str, fetch: Callable[[], Dict]) -> Dict:
+        """返回缓存的响应，没有时调用 fetch() 获取
+
+        响应为 {'status', 'content_type', 'body', 'ttl'}，ttl 为None表示直到被淘汰前一直有效
+        """
+        with self.lock:
+            cached = self.entries.get(key)
+            if cached and (cached[0] is None or cached[0] > time.monotonic()):
+                self.entries.move_to_end(key)
+                self.stats['hits'] += 1
+                return cached[1]
+            flight = self.inflight.get(key)
+            leader = flight is None
+            if leader:
+                flight = self.inflight[key] = Future()
+                self.stats['misses'] += 1
+            else:
+                self.stats['coalesced'] += 1
+        
+        if not leader:
+            return flight.result(timeout=HTTP_TIMEOUT[0] + HTTP_TIMEOUT[1])
+        
+        try:
+            response = fetch()
+        except Exception as e:
+            with self.lock:
+                self.inflight.pop(key, None)
+            flight.set_exception(e)
+            raise
+        
+        # 先写入缓存再移除正在请求的记录（同一把锁内），之后到达的请求一定能命中缓存，不会再次请求上游
+        with self.lock:
+            self.stats['upstream_bytes'] += len(response['body'])
+            # 只缓存成功的响应，上游错误下一次请求时重新获取
+            if response['status'] == 200 and len(response['body']) <= self.max_bytes:
+                ttl = response.get('ttl')
+                self.store(key, response, None if ttl is None else time.monotonic() + ttl)
+            self.inflight.pop(key, None)
+        flight.set_result(response)
+        return response
+    
+    def store(self, key: str, response: Dict, expires_at: Optional[float]):
+        """写入条目并淘汰最久没有使用的条目（调用方持有锁）"""
+        old = self.entries.pop(key, None)
+        if old:
+            self.size -= len(old[1]['body'])
+        self.entries[key] = (expires_at, response)
+        self.size += len(response['body'])
+        while self.size > self.max_bytes and self.entries:
+            _, (_, evicted) = self.entries.popitem(last=False)
+            self.size -= len(evicted['body'])
+            self.stats['evictions'] += 1
+    
+    def snapshot(self) -> Dict:
+        with self.lock:
+            return {**self.stats, 'entries': len(self.entries), 'bytes': self.size, 'max_bytes': self.max_bytes}
+
+HLS_URI_ATTRIBUTE = re.compile(r'URI="([^"]+)"')
+
+def rewrite_hls_playlist(playlist: str, base_url: str, make_url: Callable[[str], str]) -> str:
+    """把HLS播放列表中的子码流、分片、密钥等地址（包括 URI="..." 属性）替换为 make_url(绝对地址)"""
+    lines = []
+    for line in playlist.splitlines():
+        stripped = line.strip()
+        if not stripped:
+            lines.append(line)
+        elif stripped.startswith('#'):
+            lines.append(HLS_URI_ATTRIBUTE.sub(
+                lambda match: f'URI="{make_url(urljoin(base_url, match.group(1)))}"', line))
+        else:
+            lines.append(make_url(urljoin(base_url, stripped)))
+    return '\n'.join(lines) + '\n'
+
+def is_hls_response(url: str, content_type: str, body: bytes) -> bool:
+    """上游响应是否为HLS播放列表（需要改写地址）而不是分片"""
+    return 'mpegurl' in content_type.lower() or urlparse(url).path.endswith('.m3u8') \
+        or body.lstrip()[:7] == b'#EXTM3U'
+
+class RelayRoute(NamedTuple):
+    """一个被中转的频道：当前上游地址、需要注入的请求头、允许中转的上游主机"""
+    name: str
+    url: str
+    headers: Dict[str, str]
+    hosts: set
+
+class HlsRelay:
+    """本地HLS中转：把播放列表中的地址改写为指向自己，分片从上游只下载一次后分发给所有客户端
+
+    /playlist.m3u            改写后的播放列表（每次请求时如果文件有变化则重新读取）
+    /live/<频道ID>.m3u8      频道入口，频道ID不随签名地址刷新而变化
+    /r/<频道ID>?u=<上游地址>  改写后的子码流、分片和密钥地址，只允许该频道播放列表中出现过的主机
+    /relay/stats             缓存命中率和上游流量
+    """
+    
+    def __init__(self, playlist_path: str, cache: Optional[RelayCache] = None,
+                 session: Optional[requests.Session] = None, public_url: str = RELAY_PUBLIC_URL):
+        self.playlist_path = playlist_path
+        self.cache = cache or RelayCache()
+        self.session = session or get_http_session()
+        self.public_url = public_url
+        self.lock = threading.Lock()
+        self.routes: Dict[str, RelayRoute] = {}
+        self.header_lines: List[str] = []
+        self.entries: List[Dict] = []
+        self.mtime = None
+    
+    @staticmethod
+    def route_id(name: str) -> str:
+        return hashlib.sha1(name.encode('utf-8')).hexdigest()[:12]
+    
+    def load_playlist(self):
+        """播放列表文件有变化时重新读取，更新每个频道的上游地址和请求头"""
+        mtime = os.path.getmtime(self.playlist_path)
+        with self.lock:
+            if mtime == self.mtime:
+                return
+            with open(self.playlist_path, 'r', encoding='utf-8') as f:
+                lines = f.read().splitlines()
+            first = next((i for i, line in enumerate(lines) if line.startswith('#EXTINF')), len(lines))
+            self.header_lines = lines[:first]
+            self.entries = parse_m3u_entries(lines[first:])
+            for entry in self.entries:
+                if '.m3u8' not in entry['url']:
+                    continue
+                route_id = self.route_id(entry['name'] or entry['url'])
+                old = self.routes.get(route_id)
+                hosts = old.hosts if old else set()
+                hosts.add(urlparse(entry['url']).hostname)
+                self.routes[route_id] = RelayRoute(entry['name'], entry['url'], entry['headers'], hosts)
+            self.mtime = mtime
+        print(f"📄 中转播放列表已加载: {len(self.entries)} 个条目，{len(self.routes)} 个可中转频道")
+    
+    def render_playlist(self, base: str) -> str:
+        """频道地址替换为中转入口；请求头由中转注入，不再需要 #EXTVLCOPT（任何播放器都能播放）"""
+        self.load_playlist()
+        lines = list(self.header_lines)
+        for index, entry in enumerate(self.entries):
+            if index:
+                lines.append('')
+            route_id = self.route_id(entry['name'] or entry['url'])
+            if route_id not in self.routes:
+                lines.extend(entry['lines'])
+                continue
+            lines.extend(line for line in entry['lines'][:-1] if not line.strip().startswith('#EXTVLCOPT:'))
+            lines.append(f"{base}/live/{route_id}.m3u8")
+        return '\n'.join(lines) + '\n'
+    
+    def fetch(self, route_id: str, route: RelayRoute, url: str) -> Dict:
+        """从上游获取地址；播放列表中的地址改写为中转地址，同时把其中的主机加入允许列表
+
+        改写后的地址是以 / 开头的相对地址，播放器相对于播放列表地址解析，与客户端使用哪个Host访问无关
+        """
+        response = self.session.get(url, headers=route.headers, timeout=HTTP_TIMEOUT)
+        content_type = response.headers.get('Content-Type', 'application/octet-stream')
+        body = response.content
+        playlist = response.status_code == 200 and is_hls_response(response.url, content_type, body)
+        if playlist:
+            def make_url(target):
+                route.hosts.add(urlparse(target).hostname)
+                return f"/r/{route_id}?u={quote(target, safe='')}"
+            text = rewrite_hls_playlist(body.decode('utf-8', errors='replace'), response.url, make_url)
+            body = text.encode('utf-8')
+            content_type = 'application/vnd.apple.mpegurl'
+        # 播放列表（直播时不断更新）只缓存很短时间，分片一直缓存到被淘汰
+        return {'status': response.status_code, 'content_type': content_type, 'body': body,
+                'playlist': playlist, 'ttl': RELAY_PLAYLIST_TTL if playlist else None}
+    
+    def relay(self, route_id: str, url: Optional[str] = None) -> Dict:
+        """中转频道入口（url为None）或频道内的地址，返回 {'status', 'content_type', 'body'}"""
+        self.load_playlist()
+        route = self.routes.get(route_id)
+        if route is None:
+            return {'status': 404, 'content_type': 'text/plain', 'body': b'unknown channel'}
+        url = url or route.url
+        if urlparse(url).hostname not in route.hosts:
+            return {'status': 403, 'content_type': 'text/plain', 'body': b'host not allowed'}
+        return self.cache.get(url, lambda: self.fetch(route_id, route, url))
+
+class RelayRequestHandler(BaseHTTPRequestHandler):
+    """中转服务器的请求处理（server.relay 为 HlsRelay 实例）"""
+    
+    protocol_version = 'HTTP/1.1'
+    
+    def log_message(self, format, *args):
+        pass
+    
+    def base_url(self) -> str:
+        return self.server.relay.public_url or f"http://{self.headers.get('Host', f'{RELAY_HOST}:{RELAY_PORT}')}"
+    
+    def do_HEAD(self):
+        self.handle_request(head=True)
+    
+    def do_GET(self):
+        self.handle_request(head=False)
+    
+    def handle_request(self, head: bool):
+        relay = self.server.relay
+        parsed = urlparse(self.path)
+        try:
+            if parsed.path in ('/', '/playlist.m3u'):
+                body = relay.render_playlist(self.base_url()).encode('utf-8')
+                response = {'status': 200, 'content_type': 'audio/x-mpegurl; charset=utf-8', 'body': body}
+            elif parsed.path == '/relay/stats':
+                body = json.dumps(relay.cache.snapshot()).encode('utf-8')
+                response = {'status': 200, 'content_type': 'application/json', 'body': body}
+            elif parsed.path.startswith('/live/') and parsed.path.endswith('.m3u8'):
+                response = relay.relay(parsed.path[len('/live/'):-len('.m3u8')])
+            elif parsed.path.startswith('/r/'):
+                url = parse_qs(parsed.query).get('u', [None])[0]
+                response = relay.relay(parsed.path[len('/r/'):], url) if url else \
+                    {'status': 400, 'content_type': 'text/plain', 'body': b'missing u'}
+            else:
+                response = {'status': 404, 'content_type': 'text/plain', 'body': b'not found'}
+        except Exception as e:
+            print(f"⚠️ 中转 {self.path[:100]} 失败: {e}")
+            response = {'status': 502, 'content_type': 'text/plain', 'body': str(e).encode('utf-8')}
+        
+        self.send_response(response['status'])
+        self.send_header('Content-Type', response['content_type'])
+        self.send_header('Content-Length', str(len(response['body'])))
+        self.send_header('Access-Control-Allow-Origin', '*')
+        self.send_header('Cache-Control', 'no-cache' if response.get('playlist', True) else 'max-age=3600')
+        self.end_headers()
+        if not head:
+            self.wfile.write(response['body'])
+
+def start_relay_server(playlist_path: str, host: str = RELAY_HOST, port: int = RELAY_PORT) -> ThreadingHTTPServer:
+    """在后台线程启动中转服务器（port 为0时使用随机端口），返回服务器对象"""
+    server = ThreadingHTTPServer((host, port), RelayRequestHandler)
+    server.daemon_threads = True
+    server.relay = HlsRelay(playlist_path)
+    threading.Thread(target=server.serve_forever, name='hls-relay', daemon=True).start()
+    return server
+
+def run_relay(playlist_path: str):
+    """中转模式：为本地网络中的所有播放器提供同一份上游分片"""
+    server = start_relay_server(playlist_path)
+    stop_event = threading.Event()
+    
+    def handle_stop(signum, frame):
+        print("🛑 收到停止信号，关闭中转服务器...")
+        stop_event.set()
+    
+    signal.signal(signal.SIGTERM, handle_stop)
+    signal.signal(signal.SIGINT, handle_stop)
+    print(f"📡 HLS中转已启动: http://{RELAY_HOST}:{server.server_port}/playlist.m3u "
+          f"（缓存上限 {RELAY_CACHE_BYTES // 1024 // 1024}MB）")
+    stop_event.wait()
+    server.shutdown()
+    print(f"📊 中转统计: {json.dumps(server.relay.cache.snapshot(), ensure_ascii=False)}")
+
+class PlaylistService:
+    """按需播放列表服务的内存模型：请求到来时只重新解析即将过期的频道
+
+    同一频道同时只有一次解析（记录为 Future），并发请求不会重复启动浏览器；
+    旧地址仍然有效时立即返回旧地址并在后台刷新，只有没有可用地址的频道才等待解析结果。
+    解析失败的频道在 retry_interval 内不再重新解析（直接返回旧地址或备用地址），避免每个请求都启动浏览器。
+    """
+    
+    def __init__(self, channels: List[Dict], cache: SignedUrlCache, margin: int = CACHE_SAFETY_MARGIN,
+                 resolve_timeout: float = SERVE_RESOLVE_TIMEOUT, retry_interval: float = DAEMON_RETRY_INTERVAL):
+        self.channels = channels
+        self.cache = cache
+        self.margin = margin
+        self.resolve_timeout = resolve_timeout
+        self.retry_interval = retry_interval
+        self.lock = threading.Lock()
+        self.inflight: Dict[str, Future] = {}
+        self.failed_at: Dict[str, float] = {}
+        self.rendered: Dict[str, Tuple[List, str, bytes, bytes]] = {}
+        self.stats = {'requests': 0, 'not_modified': 0, 'resolutions': 0, 'coalesced': 0, 'stale_served': 0,
+                      'backoff': 0}
+    
+    def refresh(self, channels: List[Dict]) -> Dict[str, Future]:
+        """为没有正在解析、也不在失败退避期内的频道启动一次批量解析（后台线程），返回这些频道的 Future
+
+        退避期内的频道不在返回值中
+        """
+        futures, batch = {}, []
+        now = time.monotonic()
+        with self.lock:
+            for channel in channels:
+                future = self.inflight.get(channel['name'])
+                if future is None and now - self.failed_at.get(channel['name'], float('-inf')) < self.retry_interval:
+                    self.stats['backoff'] += 1
                     continue
+                if future is None:
+                    future = self.inflight[channel['name']] = Future()
+                    batch.append(channel)
+                else:
+                    self.stats['coalesced'] += 1
+                futures[channel['name']] = future
+            if batch:
+                self.stats['resolutions'] += 1
+        if batch:
+            threading.Thread(target=self.resolve_batch, args=(batch,), name='serve-resolve', daemon=True).start()
+        return futures
+    
+    def resolve_batch(self, batch: List[Dict]):
+        """解析一批频道（共享同一个浏览器工作池），完成后唤醒所有等待的请求"""
+        print(f"🔄 按需解析: {', '.join(channel['name'] for channel in batch)}")
+        try:
+            with TRACER.span('resolve'):
+                resolve_channels(batch, self.cache, self.margin)
+        except Exception as e:
+            print(f"❌ 按需解析失败: {e}")
+        finally:
+            # 解析后仍然没有有效地址的频道记录失败时间，退避期内不再重新解析
+            failed = {channel['name'] for channel in batch
+                      if self.cache.get_fresh(channel['name'], self.margin) is None}
+            with self.lock:
+                for channel in batch:
+                    if channel['name'] in failed:
+                        self.failed_at[channel['name']] = time.monotonic()
+                    else:
+                        self.failed_at.pop(channel['name'], None)
+                futures = [self.inflight.pop(channel['name']) for channel in batch]
+            if failed:
+                print(f"⏸️ 解析失败，{self.retry_interval:.0f}秒内不再重试: {', '.join(sorted(failed))}")
+            for future in futures:
+                future.set_result(None)
+            TRACER.flush('serve')
+    
+    def dynamic_channels(self) -> List[Dict]:
+        """当前最好的动态频道条目：即将过期的频道触发刷新，已经过期的频道等待刷新（有上限）"""
+        now = time.time()
+        stale = [channel for channel in self.channels if self.cache.get_fresh(channel['name'], self.margin) is None]
+        futures = self.refresh(stale) if stale else {}
+        
+        # 旧地址还没有真正过期的频道直接返回旧地址，其余频道等待解析结果
+        waiting = [channel['name'] for channel in stale
+                   if channel['name'] in futures
+                   and self.cache.entries.get(channel['name'], {}).get('expires_at', 0) <= now]
+        with self.lock:
+            self.stats['stale_served'] += len(futures) - len(waiting)
+        deadline = time.monotonic() + self.resolve_timeout
+        for name in waiting:
+            try:
+                futures[name].result(timeout=max(0, time_left(deadline)))
+            except FutureTimeoutError:
+                print(f"⏰ {name} - 等待解析超时，使用旧地址或备用地址")
+        
+        dynamic_channels = []
+        for channel in self.channels:
+            entry = self.cache.entries.get(channel['name'])
+            dynamic_channels.extend(entry['channels'] if entry else get_fallback_channels(channel))
+        return dynamic_channels
+    
+    def playlist(self, kind: str) -> Tuple[str, bytes, bytes]:
+        """返回 (ETag, 正文, gzip正文)；条目没有变化时返回上一次生成的正文，ETag保持不变"""
+        dynamic_channels = self.dynamic_channels()
+        content = generate_china_playlist(dynamic_channels) if kind == 'china' else generate_playlist(dynamic_channels)
+        model = playlist_model(content)
+        with self.lock:
+            rendered = self.rendered.get(kind)
+            if rendered is None or rendered[0] != model:
+                body = content.encode('utf-8')
+                etag = '"' + hashlib.sha1(json.dumps(model, ensure_ascii=False).encode('utf-8')).hexdigest()[:20] + '"'
+                rendered = self.rendered[kind] = (model, etag, body, gzip.compress(body))
+        return rendered[1], rendered[2], rendered[3]
+    
+    def channel_url(self, key: str) -> Optional[str]:
+        """按频道名称或tvg-id返回频道的第一个地址（MBN为最高画质）"""
+        channel = next((ch for ch in self.channels if key in (ch['name'], ch['tvg_id'])), None)
+        if channel is None:
+            return None
+        if self.cache.get_fresh(channel['name'], self.margin) is None:
+            future = self.refresh([channel]).get(channel['name'])
+            entry = self.cache.entries.get(channel['name'])
+            if future and (not entry or entry['expires_at'] <= time.time()):
+                try:
+                    future.result(timeout=self.resolve_timeout)
+                except FutureTimeoutError:
+                    pass
+        entry = self.cache.entries.get(channel['name'])
+        entries = entry['channels'] if entry else get_fallback_channels(channel)
+        return next((ch['url'] for ch in entries if ch.get('url')), None)
+
+class PlaylistRequestHandler(BaseHTTPRequestHandler):
+    """按需播放列表服务的请求处理（server.service 为 PlaylistService 实例）
+
+    /korean_tv.m3u                  标准版播放列表（支持 ETag/If-None-Match 和 gzip）
+    /korean_tv_china_optimized.m3u  中国优化版播放列表
+    /channel/<名称或tvg-id>         302跳转到频道当前的地址
+    """
+    
+    protocol_version = 'HTTP/1.1'
+    PLAYLISTS = {'/korean_tv.m3u': 'standard', '/korean_tv_china_optimized.m3u': 'china'}
+    
+    def log_message(self, format, *args):
+        pass
+    
+    def do_HEAD(self):
+        self.handle_request(head=True)
+    
+    def do_GET(self):
+        self.handle_request(head=False)
+    
+    def reply(self, status: int, body: bytes = b'', headers: Optional[Dict[str, str]] = None, head: bool = False):
+        self.send_response(status)
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        if body and not head:
+            self.wfile.write(body)
+    
+    def handle_request(self, head: bool):
+        service = self.server.service
+        path = unquote(urlparse(self.path).path)
+        with service.lock:
+            service.stats['requests'] += 1
+        try:
+            if path in self.PLAYLISTS:
+                etag, body, gzipped = service.playlist(self.PLAYLISTS[path])
+                headers = {'ETag': etag, 'Cache-Control': 'no-cache', 'Vary': 'Accept-Encoding',
+                           'Content-Type': 'audio/x-mpegurl; charset=utf-8'}
+                if etag in [tag.strip() for tag in self.headers.get('If-None-Match', '').split(',')]:
+                    with service.lock:
+                        service.stats['not_modified'] += 1
+                    return self.reply(304, headers=headers, head=head)
+                if 'gzip' in self.headers.get('Accept-Encoding', ''):
+                    headers['Content-Encoding'] = 'gzip'
+                    body = gzipped
+                return self.reply(200, body, headers, head)
+            if path.startswith('/channel/'):
+                url = service.channel_url(path[len('/channel/'):])
+                if url is None:
+                    return self.reply(404, b'unknown channel', {'Content-Type': 'text/plain'}, head)
+                return self.reply(302, headers={'Location': url, 'Cache-Control': 'no-cache'}, head=head)
+            if path == '/stats':
+                body = json.dumps({**service.stats, 'inflight': sorted(service.inflight)}, ensure_ascii=False)
+                return self.reply(200, body.encode('utf-8'), {'Content-Type': 'application/json'}, head)
+            self.reply(404, b'not found', {'Content-Type': 'text/plain'}, head)
+        except Exception as e:
+            print(f"⚠️ 处理 {self.path[:100]} 失败: {e}")
+            self.reply(500, str(e).encode('utf-8'), {'Content-Type': 'text/plain'}, head)
+
+def start_playlist_server(service: PlaylistService, host: str = SERVE_HOST,
+                          port: int = SERVE_PORT) -> ThreadingHTTPServer:
+    """在后台线程启动按需播放列表服务（port 为0时使用随机端口），返回服务器对象"""
+    server = ThreadingHTTPServer((host, port), PlaylistRequestHandler)
+    server.daemon_threads = True
+    server.service = service
+    threading.Thread(target=server.serve_forever, name='playlist-server', daemon=True).start()
+    return server
+
+def run_serve():
+    """按需服务模式：请求到来时返回最新的播放列表，过期的频道在请求时才重新解析"""
+    service = PlaylistService(CHANNELS, SignedUrlCache(URL_CACHE_FILE))
+    server = start_playlist_server(service)
+    stop_event = threading.Event()
+    
+    def handle_stop(signum, frame):
+        print("🛑 收到停止信号，关闭播放列表服务...")
+        stop_event.set()
+    
+    signal.signal(signal.SIGTERM, handle_stop)
+    signal.signal(signal.SIGINT, handle_stop)
+    print(f"🌍 播放列表服务已启动: http://{SERVE_HOST}:{server.server_port}/korean_tv.m3u")
+    stop_event.wait()
+    server.shutdown()
+
+def parse_args(argv=None):
+    """解析命令行参数"""
+    parser = argparse.ArgumentParser(description="自动抓取韩国电视台M3U8源并生成播放列表")
+    mode = parser.add_mutually_exclusive_group()
+    mode.add_argument('--from-cache', action='store_true',
+                      help='只用缓存中的地址重新生成播放列表（不联网、不启动浏览器）')
+    mode.add_argument('--static-only', action='store_true',
+                      help='只输出静态频道（不联网、不启动浏览器）')
+    mode.add_argument('--daemon', action='store_true',
+                      help='常驻模式：按Token过期时间只刷新即将过期的频道并增量更新播放列表')
+    mode.add_argument('--serve', action='store_true',
+                      help='按需服务模式：HTTP提供播放列表和频道跳转，过期的频道在请求时才重新解析')
+    mode.add_argument('--relay', action='store_true',
+                      help='中转模式：读取 --output 播放列表，改写为指向本机的地址，分片只从上游下载一次')
+    parser.add_argument('--output', default='korean_tv.m3u',
+                        help='播放列表输出路径（默认 korean_tv.m3u）')
+    parser.add_argument('--china-output', default=CHINA_PLAYLIST_FILE,
+                        help=f'中国优化版输出路径（默认 {CHINA_PLAYLIST_FILE}）')
+    parser.add_argument('--health-check', choices=['off', 'demote', 'drop'],
+                        help='直播源健康检查模式（完整运行默认使用 HEALTH_CHECK_MODE，'
+                             '--from-cache/--static-only 默认不检查）')
+    return parser.parse_args(argv)
+
+def main(argv=None):
+    """主函数"""
+    args = parse_args(argv)
+    if args.daemon:
+        run_daemon(args.output)
+        return
+    if args.serve:
+        run_serve()
+        return
+    if args.relay:
+        run_relay(args.output)
+        return
+    
+    start_time = time.time()
+    mode = 'static-only' if args.static_only else 'from-cache' if args.from_cache else 'full'
+    TRACER.reset()
+    print("🎬 开始获取M3U8链接...")
+    print(f"📺 计划获取 {len(CHANNELS)} 个频道")
+    
+    try:
+        cache = SignedUrlCache(URL_CACHE_FILE)
+        if args.static_only:
+            print("📡 仅输出静态频道")
+            dynamic_channels = []
+        elif args.from_cache:
+            print("♻️ 仅使用缓存地址生成播放列表")
+            dynamic_channels = load_cached_channels(CHANNELS, cache)
+        else:
+            try:
+                with TRACER.span('resolve'):
+                    dynamic_channels = resolve_channels(CHANNELS, cache)
+            except Exception as e:
+                # 已完成的频道都在结果日志中，用目前最好的结果生成播放列表，下次运行从日志继续
+                print(f"❌ 解析频道时出错，使用已完成的结果和缓存生成播放列表: {e}")
+                dynamic_channels = load_cached_channels(CHANNELS, cache)
+        
+        # 健康检查（无浏览器模式默认不联网，除非显式指定）
+        health_mode = args.health_check or ('off' if args.static_only or args.from_cache else HEALTH_CHECK_MODE)
+        with TRACER.span('health_check', mode=health_mode):
+            dynamic_channels, static_lines = apply_health_check(dynamic_channels, STATIC_CHANNELS, health_mode)
         
         print(f"\n{'='*50}")
         # 生成标准版播放列表
-        standard_playlist = generate_playlist(dynamic_channels)
+        standard_playlist = generate_playlist(dynamic_channels, static_lines)
         print("✅ 播放列表生成完成!")
 
-        # 更新GitHub仓库
-        # update_stable_repository(standard_playlist)
+        # 保存到本地文件（条目没有变化时不改动文件，避免无意义的提交和推送）
+        standard_report = write_playlist_if_changed(args.output, standard_playlist)
 
-        # 保存到本地文件
-        with open('korean_tv.m3u', 'w', encoding='utf-8') as f:
-            f.write(standard_playlist)
+        # 中国优化版：多线路按测速结果排序（无浏览器模式不联网测速）
+        rankings = {}
+        if ROUTE_PROBE and not (args.static_only or args.from_cache):
+            with TRACER.span('route_probe'):
+                previous = previous_route_orders(args.china_output)
+                rankings = rank_routes([ch['url'] for ch in dynamic_channels if ch.get('url')],
+                                       previous={ch['url']: previous[ch['name']] for ch in dynamic_channels
+                                                 if ch.get('url') and ch['name'] in previous})
+        china_playlist = generate_china_playlist(dynamic_channels, static_lines, rankings)
+        china_report = write_playlist_if_changed(args.china_output, china_playlist)
 
-        print("💾 播放列表已保存:")
-        print("  📁 korean_tv.m3u - 标准版")
+        # 更新GitHub仓库（两个播放列表合并为一次提交）
+        # update_stable_repository({
+        #     'korean_tv.m3u': standard_playlist,
+        #     'korean_tv_china_optimized.m3u': china_playlist
+        # })
+        
+        # 在GitHub Actions中输出是否有变化，后续步骤可据此跳过提交
+        github_output = os.getenv('GITHUB_OUTPUT')
+        if github_output:
+            with open(github_output, 'a', encoding='utf-8') as f:
+                f.write(f"playlist_changed={str(standard_report['changed'] or china_report['changed']).lower()}\n")
         
         # 打印统计
         successful_channels = [ch for ch in dynamic_channels if ch.get('url')]
@@ -838,22 +3665,19 @@ def main():
         print("  📡 JTBC - 使用静态链接（需要在韩国网络环境播放）")
         print("  📡 其他静态频道 - 可以直接播放")
         
+        report_next_refresh(cache)
+        
     except Exception as e:
         print(f"❌ 执行过程中出错: {str(e)}")
         import traceback
         traceback.print_exc()
         
     finally:
-        if driver:
-            try:
-                print("🔚 关闭浏览器驱动...")
-                driver.quit()
-            except Exception as e:
-                print(f"⚠️ 关闭浏览器驱动时出现警告: {e}")
-        
         # 计算总执行时间
         end_time = time.time()
         total_time = end_time - start_time
+        TRACER.print_summary()
+        TRACER.flush(mode)
         print(f"⏱️ 总执行时间: {total_time:.2f}秒")
 
 if __name__ == "__main__":